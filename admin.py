@@ -0,0 +1,268 @@
+"""
+API administrativa de orçamentos.
+
+Todas as rotas exigem ``Authorization: Bearer <ADMIN_TOKEN>``. A listagem usa
+paginação por chave (keyset) em ``(data_criacao, id)``, do mais novo para o
+mais antigo, apoiada pelos índices compostos de ``Orcamento``: o custo de
+uma página não depende de quantas páginas vieram antes. A exportação aceita
+os mesmos filtros e envia o arquivo em streaming (ver ``exportacao``). As
+estatísticas vêm da tabela de agregados diários (ver ``estatisticas``) e a
+busca textual, do índice FTS5 (ver ``busca``). O histórico de um cliente
+pagina do mesmo jeito pelo índice ``(cliente_id, data_criacao, id)``. Um
+orçamento consultado pelo id é procurado também no arquivo (ver ``arquivo``).
+"""
+import base64
+import binascii
+import hmac
+import json
+from datetime import date, datetime, timezone
+from functools import wraps
+from typing import Optional, Tuple
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import Select, func, select, tuple_
+
+from arquivo import ler_arquivado
+from busca import MINIMO_LETRAS, buscar, disponivel as busca_disponivel, expressao_fts
+from clientes import chave_email
+from estatisticas import DIMENSOES, consultar as consultar_estatisticas
+from exportacao import FORMATOS, exportar
+from models import db, Cliente, Orcamento, OrcamentoArquivado
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+
+
+class FiltroInvalido(ValueError):
+    """Parâmetro de consulta inválido"""
+
+
+def exigir_token(funcao):
+    """Exige o token administrativo configurado em ADMIN_TOKEN"""
+    @wraps(funcao)
+    def envoltorio(*args, **kwargs):
+        esperado = current_app.config.get('ADMIN_TOKEN')
+        if not esperado:
+            return jsonify({'success': False, 'message': 'Acesso administrativo não configurado'}), 403
+        recebido = request.headers.get('Authorization', '')
+        if not recebido.startswith('Bearer ') or not hmac.compare_digest(recebido[7:].encode(), esperado.encode()):
+            return jsonify({'success': False, 'message': 'Não autorizado'}), 401
+        return funcao(*args, **kwargs)
+    return envoltorio
+
+
+def _data(valor: str, campo: str) -> datetime:
+    """Converte ISO 8601 para o UTC sem fuso usado nas colunas DateTime"""
+    try:
+        data = datetime.fromisoformat(valor)
+    except ValueError:
+        raise FiltroInvalido(f"Data inválida em '{campo}': use o formato ISO 8601")
+    if data.tzinfo is not None:
+        data = data.astimezone(timezone.utc).replace(tzinfo=None)
+    return data
+
+
+def filtrar_orcamentos(args) -> Select:
+    """
+    Monta a consulta de orçamentos a partir dos filtros da requisição.
+
+    Filtros aceitos: ``status``, ``produto``, ``uf``, ``de`` e ``ate`` (intervalo
+    de ``data_criacao``, ISO 8601, ``de`` inclusivo e ``ate`` exclusivo).
+    """
+    consulta = select(Orcamento)
+    if args.get('status'):
+        consulta = consulta.where(Orcamento.status == args['status'])
+    if args.get('produto'):
+        consulta = consulta.where(Orcamento.produto == args['produto'])
+    if args.get('uf'):
+        consulta = consulta.where(Orcamento.uf == args['uf'].upper())
+    if args.get('de'):
+        consulta = consulta.where(Orcamento.data_criacao >= _data(args['de'], 'de'))
+    if args.get('ate'):
+        consulta = consulta.where(Orcamento.data_criacao < _data(args['ate'], 'ate'))
+    return consulta
+
+
+def codificar_cursor(orcamento: Orcamento) -> str:
+    bruto = json.dumps([orcamento.data_criacao.isoformat(), orcamento.id]).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data, orcamento_id = json.loads(bruto)
+        return datetime.fromisoformat(data), int(orcamento_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise FiltroInvalido('Cursor inválido')
+
+
+def _limite(valor: Optional[str]) -> int:
+    if not valor:
+        return LIMITE_PADRAO
+    try:
+        limite = int(valor)
+    except ValueError:
+        raise FiltroInvalido("'limite' deve ser um número inteiro")
+    return max(1, min(LIMITE_MAXIMO, limite))
+
+
+@admin_bp.errorhandler(FiltroInvalido)
+def filtro_invalido(erro):
+    return jsonify({'success': False, 'message': str(erro)}), 400
+
+
+def _pagina(consulta: Select) -> Tuple[list, Optional[str]]:
+    """Página da consulta, do mais novo para o mais antigo, a partir de ``cursor`` e com ``limite`` itens"""
+    limite = _limite(request.args.get('limite'))
+    if request.args.get('cursor'):
+        data, orcamento_id = decodificar_cursor(request.args['cursor'])
+        consulta = consulta.where(tuple_(Orcamento.data_criacao, Orcamento.id) < (data, orcamento_id))
+
+    # Busca um a mais para saber se existe próxima página
+    orcamentos = db.session.scalars(
+        consulta.order_by(Orcamento.data_criacao.desc(), Orcamento.id.desc()).limit(limite + 1)
+    ).all()
+    proximo = codificar_cursor(orcamentos[limite - 1]) if len(orcamentos) > limite else None
+    return [orcamento.to_dict() for orcamento in orcamentos[:limite]], proximo
+
+
+@admin_bp.route('/orcamentos')
+@exigir_token
+def listar_orcamentos():
+    """Lista orçamentos filtrados, em páginas por cursor"""
+    consulta = filtrar_orcamentos(request.args)
+    orcamentos, proximo = _pagina(consulta)
+
+    return jsonify({
+        'success': True,
+        'orcamentos': orcamentos,
+        'proximo_cursor': proximo
+    })
+
+
+@admin_bp.route('/orcamentos/<int:orcamento_id>')
+@exigir_token
+def obter_orcamento(orcamento_id: int):
+    """Um orçamento pelo id; os arquivados vêm do arquivo compactado com ``arquivado: true``"""
+    orcamento = db.session.get(Orcamento, orcamento_id)
+    if orcamento is not None:
+        return jsonify({'success': True, 'arquivado': False, 'orcamento': orcamento.to_dict()})
+    registro = ler_arquivado(current_app.config['ARQUIVO_PASTA'], orcamento_id)
+    if registro is None:
+        return jsonify({'success': False, 'message': 'Orçamento não encontrado'}), 404
+    for campo in ('ip_cliente', 'email_entregavel'):
+        registro.pop(campo, None)
+    return jsonify({'success': True, 'arquivado': True, 'orcamento': registro})
+
+
+@admin_bp.route('/orcamentos/exportar')
+@exigir_token
+def exportar_orcamentos():
+    """Exporta os orçamentos filtrados em CSV ou NDJSON, sem carregar tudo na memória"""
+    formato = request.args.get('formato', 'csv')
+    if formato not in FORMATOS:
+        raise FiltroInvalido(f"'formato' deve ser um de: {', '.join(FORMATOS)}")
+    consulta = filtrar_orcamentos(request.args)
+
+    nome = f"orcamentos-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{formato}"
+    resposta = Response(stream_with_context(exportar(consulta, formato)),
+                        mimetype=FORMATOS[formato])
+    resposta.headers['Content-Disposition'] = f'attachment; filename="{nome}"'
+    resposta.headers['Cache-Control'] = 'no-store'
+    return resposta
+
+
+@admin_bp.route('/busca')
+@exigir_token
+def buscar_orcamentos():
+    """
+    Busca por nome, e-mail, cidade, estampa ou observações.
+
+    ``q`` é o texto buscado: cada palavra casa como prefixo, sem diferenciar
+    acentos nem maiúsculas, e todas precisam aparecer. Aceita os filtros da
+    listagem e ``limite``. ``ordem`` indica se o resultado veio por relevância
+    ou, para termos muito genéricos, dos mais recentes (ver ``busca``).
+    """
+    termo = request.args.get('q', '')
+    if not expressao_fts(termo):
+        raise FiltroInvalido(f"'q' deve ter ao menos uma palavra com {MINIMO_LETRAS} letras ou mais")
+    if not busca_disponivel():
+        return jsonify({'success': False, 'message': 'Busca textual indisponível neste banco'}), 501
+    limite = _limite(request.args.get('limite'))
+    consulta = filtrar_orcamentos(request.args)
+
+    consulta, ordem = buscar(consulta, termo)
+    return jsonify({
+        'success': True,
+        'ordem': ordem,
+        'orcamentos': [orcamento.to_dict() for orcamento in db.session.scalars(consulta.limit(limite))]
+    })
+
+
+def _dia(valor: str, campo: str) -> date:
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise FiltroInvalido(f"Data inválida em '{campo}': use AAAA-MM-DD")
+
+
+@admin_bp.route('/estatisticas')
+@exigir_token
+def estatisticas():
+    """
+    Orçamentos e unidades por dia e dimensão.
+
+    ``agrupar``: dimensões separadas por vírgula entre dia, produto, status, uf
+    e cor (padrão: dia). ``de`` (inclusivo) e ``ate`` (exclusivo) são dias
+    AAAA-MM-DD; ``produto``, ``status``, ``uf`` e ``cor`` filtram por igualdade.
+    """
+    agrupar = [dimensao for dimensao in request.args.get('agrupar', 'dia').split(',') if dimensao]
+    invalidas = [dimensao for dimensao in agrupar if dimensao not in DIMENSOES]
+    if invalidas:
+        raise FiltroInvalido(f"'agrupar' aceita: {', '.join(DIMENSOES)}")
+    filtros = {campo: request.args[campo] for campo in ('produto', 'status', 'uf', 'cor') if request.args.get(campo)}
+    if 'uf' in filtros:
+        filtros['uf'] = filtros['uf'].upper()
+    de = _dia(request.args['de'], 'de') if request.args.get('de') else None
+    ate = _dia(request.args['ate'], 'ate') if request.args.get('ate') else None
+
+    return jsonify({
+        'success': True,
+        'estatisticas': consultar_estatisticas(list(dict.fromkeys(agrupar)), de, ate, filtros)
+    })
+
+
+def _historico(cliente: Optional[Cliente]):
+    if cliente is None:
+        return jsonify({'success': False, 'message': 'Cliente não encontrado'}), 404
+    total = db.session.scalar(select(func.count()).where(Orcamento.cliente_id == cliente.id))
+    arquivados = db.session.scalar(select(func.count()).where(OrcamentoArquivado.cliente_id == cliente.id))
+    orcamentos, proximo = _pagina(select(Orcamento).where(Orcamento.cliente_id == cliente.id))
+    return jsonify({
+        'success': True,
+        'cliente': cliente.to_dict(),
+        'total_orcamentos': total,
+        'total_arquivados': arquivados,
+        'orcamentos': orcamentos,
+        'proximo_cursor': proximo
+    })
+
+
+@admin_bp.route('/clientes')
+@exigir_token
+def buscar_cliente():
+    """Cliente pelo e-mail (``?email=``, sem diferenciar maiúsculas) e o seu histórico de orçamentos"""
+    email = request.args.get('email', '')
+    if not email.strip():
+        raise FiltroInvalido("Informe o 'email' do cliente")
+    return _historico(db.session.scalar(select(Cliente).where(Cliente.email == chave_email(email))))
+
+
+@admin_bp.route('/clientes/<int:cliente_id>')
+@exigir_token
+def historico_cliente(cliente_id: int):
+    """Cliente e o seu histórico de orçamentos, em páginas por cursor"""
+    return _historico(db.session.get(Cliente, cliente_id))
@@ -1,174 +1,601 @@
-import logging
 import os
-import smtplib
-from datetime import datetime, timezone
+import time
+from datetime import datetime, timedelta, timezone
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from logging.handlers import RotatingFileHandler
-from typing import Union, List
+from email.message import Message
+from typing import Union, List, Dict, Optional, Tuple
 
+import click
+from sqlalchemy.exc import IntegrityError
 from dotenv import load_dotenv
-from flask import Flask, render_template, request, jsonify
+from flask import Blueprint, Flask, current_app, request, jsonify
+from flask.cli import AppGroup, with_appcontext
 from flask_mail import Mail
 from flask_wtf.csrf import CSRFProtect
 
-from models import db, Orcamento
-
-# Carrega variáveis de ambiente
-load_dotenv()
+from admin import FiltroInvalido, admin_bp, filtrar_orcamentos
+from arquivo import TAMANHO_LOTE as TAMANHO_LOTE_ARQUIVO, arquivar
+from ativos import ARQUIVO_MANIFESTO as MANIFESTO_ATIVOS, ARQUIVO_SWEETALERT, PASTA_DIST, AtivosPagina, \
+    baixar_sweetalert, construir_ativos
+from banco import PERFIS_SQLITE, configurar_engine, normalizar_url, opcoes_engine, transacao_escrita
+from busca import BuscaIndisponivel, reindexar as reindexar_busca
+from cep import conferir_endereco, construir_indice, indice_cep, ler_faixas, numero_cep
+from cache_pagina import CachePagina
+from estatisticas import reconstruir as reconstruir_estatisticas
+from estaticos import ARQUIVO_MANIFESTO as MANIFESTO_ESTATICOS, ServidorEstaticos, comprimir_estaticos
+from exportacao import FORMATOS as FORMATOS_EXPORTACAO, exportar
+from imagens import ARQUIVO_MANIFESTO as MANIFESTO_IMAGENS, PASTA_VARIANTES, ImagensResponsivas, LARGURAS_PADRAO, \
+    gerar_variantes
+from importacao import importar
+from limites import LimitadorTaxa
+from models import db, Orcamento, EmailPendente, ChaveIdempotencia
+from monitor_smtp import MonitorSMTP
+from smtp_pool import PoolSMTP
+from template_email import compilar_template
+from validacao import campos_faltantes, validar_quantidade
+from validacao_email import MODOS_VERIFICACAO, cache_dominios, verificador_assincrono
+from outbox import MODOS_ENVIO, OutboxWorker, enfileirar_email, reenfileirar_falhas
+from metricas import FALHAS_VALIDACAO, FASE_BANCO, FASE_EMAILS, FASE_REQUISICAO, FASE_SMTP_ENVIO, FASE_VALIDACAO, \
+    ORCAMENTOS, cronometrar, registro_metricas
+from registro import FORMATOS_LOG, configurar_registro
+
+# Extensões e componentes compartilhados, ligados à aplicação em create_app()
+csrf = CSRFProtect()
+mail = Mail()
+site_bp = Blueprint('site', __name__)
+
+
+def configurar(app: Flask) -> None:
+    """Lê a configuração das variáveis de ambiente"""
+    # Configuração do banco de dados
+    app.config['SQLALCHEMY_DATABASE_URI'] = normalizar_url(os.getenv('DATABASE_URL', 'sqlite:///orcamentos.db'))
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', '25101951')
+    app.config['UPLOAD_FOLDER'] = 'static/uploads'
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
+    app.config['ADMIN_TOKEN'] = os.getenv('ADMIN_TOKEN')  # Sem token a API administrativa fica fechada
+
+    # Configuração de email atualizada para Gmail com autenticação segura
+    app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
+    app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', '587'))
+    app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'true').lower() == 'true'
+    app.config['MAIL_USE_SSL'] = False
+    app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
+    app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
+    app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER')
+    app.config['MAIL_TIMEOUT'] = 30
+
+    # Configuração do pool de conexões SMTP (por worker)
+    app.config['SMTP_POOL_MAX_CONEXOES'] = int(os.getenv('SMTP_POOL_MAX_CONEXOES', '2'))
+    app.config['SMTP_POOL_MAX_OCIOSIDADE'] = float(os.getenv('SMTP_POOL_MAX_OCIOSIDADE', '240'))
+
+    # Verificação de entregabilidade dos e-mails: 'sincrona', 'assincrona' ou 'desligada'
+    app.config['EMAIL_VERIFICACAO_DNS'] = os.getenv('EMAIL_VERIFICACAO_DNS', 'sincrona').lower()
+    app.config['EMAIL_CACHE_DOMINIOS_TAMANHO'] = int(os.getenv('EMAIL_CACHE_DOMINIOS_TAMANHO', '10000'))
+    app.config['EMAIL_CACHE_DOMINIOS_TTL'] = float(os.getenv('EMAIL_CACHE_DOMINIOS_TTL', '86400'))
+    app.config['EMAIL_CACHE_DOMINIOS_TTL_NEGATIVO'] = float(os.getenv('EMAIL_CACHE_DOMINIOS_TTL_NEGATIVO', '3600'))
+
+    # Índice local de faixas de CEP (gerado por `flask cep carregar`): preenchimento do
+    # endereço no formulário e conferência de cidade/UF no envio
+    app.config['CEP_INDICE'] = os.getenv('CEP_INDICE', os.path.join(app.instance_path, 'cep.idx'))
+    app.config['CEP_CONFERIR'] = os.getenv('CEP_CONFERIR', 'true').lower() == 'true'
+
+    # Cache da página inicial em memória (sempre desligado em modo debug)
+    app.config['CACHE_PAGINA'] = os.getenv('CACHE_PAGINA', 'true').lower() == 'true'
+
+    # Limite de envios de orçamento por IP (token bucket). Com LIMITE_SQLITE o limite
+    # é compartilhado entre os workers do gunicorn por um arquivo SQLite.
+    app.config['LIMITE_ORCAMENTOS_CAPACIDADE'] = float(os.getenv('LIMITE_ORCAMENTOS_CAPACIDADE', '5'))
+    app.config['LIMITE_ORCAMENTOS_POR_HORA'] = float(os.getenv('LIMITE_ORCAMENTOS_POR_HORA', '20'))
+    app.config['LIMITE_SQLITE'] = os.getenv('LIMITE_SQLITE', 'false').lower() == 'true'
+    app.config['LIMITE_SQLITE_CAMINHO'] = os.getenv('LIMITE_SQLITE_CAMINHO', os.path.join(app.instance_path, 'limites.db'))
+    app.config['IDEMPOTENCIA_DIAS'] = int(os.getenv('IDEMPOTENCIA_DIAS', '7'))
+
+    # Arquivamento dos orçamentos finalizados (`flask orcamentos arquivar`)
+    app.config['ARQUIVO_PASTA'] = os.getenv('ARQUIVO_PASTA', os.path.join(app.instance_path, 'arquivo'))
+    app.config['ARQUIVO_DIAS'] = int(os.getenv('ARQUIVO_DIAS', '180'))
+
+    # Configuração da fila de saída de e-mails
+    app.config['EMAIL_OUTBOX_WORKER'] = os.getenv('EMAIL_OUTBOX_WORKER', 'true').lower() == 'true'
+    app.config['EMAIL_OUTBOX_INTERVALO'] = float(os.getenv('EMAIL_OUTBOX_INTERVALO', '15'))
+    app.config['EMAIL_OUTBOX_MAX_TENTATIVAS'] = int(os.getenv('EMAIL_OUTBOX_MAX_TENTATIVAS', '6'))
+
+    # Verificação do SMTP em segundo plano, lida por /test_smtp e antes de cada envio
+    app.config['SMTP_MONITOR'] = os.getenv('SMTP_MONITOR', 'true').lower() == 'true'
+    app.config['SMTP_MONITOR_INTERVALO'] = float(os.getenv('SMTP_MONITOR_INTERVALO', '60'))
+    app.config['SMTP_MONITOR_JITTER'] = float(os.getenv('SMTP_MONITOR_JITTER', '0.2'))
+    app.config['SMTP_MONITOR_TIMEOUT'] = float(os.getenv('SMTP_MONITOR_TIMEOUT', '5'))
+
+    # Envio dos e-mails do orçamento: 'fila' (pelo worker, fora da requisição) ou 'direto'
+    # (na requisição, os dois ao mesmo tempo, esperando no máximo EMAIL_ENVIO_TIMEOUT segundos)
+    app.config['EMAIL_ENVIO'] = os.getenv('EMAIL_ENVIO', 'fila').lower()
+    app.config['EMAIL_ENVIO_TIMEOUT'] = float(os.getenv('EMAIL_ENVIO_TIMEOUT', '10'))
+    app.config['EMAIL_ENVIO_THREADS'] = int(os.getenv('EMAIL_ENVIO_THREADS', '4'))
+
+    # Banco: perfil concorrente do SQLite para vários workers, pool dimensionado no PostgreSQL
+    app.config['SQLITE_PERFIL'] = os.getenv('SQLITE_PERFIL', 'concorrente').lower()
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    app.config['SQLITE_CACHE_MB'] = int(os.getenv('SQLITE_CACHE_MB', '16'))
+    app.config['SQLITE_MMAP_MB'] = int(os.getenv('SQLITE_MMAP_MB', '128'))
+    app.config['DB_POOL_TAMANHO'] = int(os.getenv('DB_POOL_TAMANHO', '5'))
+    app.config['DB_POOL_EXCEDENTE'] = int(os.getenv('DB_POOL_EXCEDENTE', '5'))
+    app.config['DB_POOL_TIMEOUT'] = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+    app.config['DB_POOL_RECICLAR'] = int(os.getenv('DB_POOL_RECICLAR', '1800'))
+
+    # Logging gravado por uma thread de fundo: 'texto' ou 'json' (uma linha JSON por registro)
+    app.config['LOG_PASTA'] = os.getenv('LOG_PASTA', 'logs')
+    app.config['LOG_FORMATO'] = os.getenv('LOG_FORMATO', 'texto').lower()
+    app.config['LOG_MAX_MB'] = float(os.getenv('LOG_MAX_MB', '10'))
+    app.config['LOG_ARQUIVOS'] = int(os.getenv('LOG_ARQUIVOS', '5'))
+    # Erros de validação do formulário: registra 1 a cada N (1 registra todos)
+    app.config['LOG_AMOSTRA_VALIDACAO'] = int(os.getenv('LOG_AMOSTRA_VALIDACAO', '10'))
+
+    # Métricas em /metrics: instantâneos por worker somados na coleta (sem token, /metrics é público)
+    app.config['METRICAS_PASTA'] = os.getenv('METRICAS_PASTA', os.path.join(app.instance_path, 'metricas'))
+    app.config['METRICAS_INTERVALO'] = float(os.getenv('METRICAS_INTERVALO', '5'))
+    app.config['METRICAS_TOKEN'] = os.getenv('METRICAS_TOKEN')
+
+
+# Templates disponíveis para a fila de saída (templates/email_<nome>.html)
+TEMPLATES_EMAIL = ('cliente', 'admin')
+_fontes_templates: Dict[str, str] = {}
+
+
+def template_email(nome: str) -> str:
+    """Fonte do template de e-mail, lida do disco no primeiro uso"""
+    fonte = _fontes_templates.get(nome)
+    if fonte is None:
+        if nome not in TEMPLATES_EMAIL:
+            raise KeyError(f"Template de e-mail desconhecido: {nome}")
+        caminho = os.path.join(current_app.root_path, 'templates', f'email_{nome}.html')
+        with open(caminho, 'r', encoding='utf-8') as arquivo:
+            fonte = arquivo.read()
+        _fontes_templates[nome] = fonte
+    return fonte
+
+
+_pool_smtp: Optional[PoolSMTP] = None
+
+
+def obter_pool_smtp() -> PoolSMTP:
+    """Retorna o pool SMTP do processo, criando-o no primeiro uso"""
+    global _pool_smtp
+    if _pool_smtp is None:
+        email_remetente = os.getenv("MAIL_GMAIL")
+        email_password = os.getenv("MAIL_PASSWORD")
 
-app = Flask(__name__)
+        if not email_remetente or not email_password:
+            raise ValueError("Credenciais de e-mail não configuradas")
 
-# Carrega o template
-with open('templates/email_cliente.html', 'r', encoding='utf-8') as file:
-    template_cliente = file.read()
+        _pool_smtp = PoolSMTP(
+            current_app.config['MAIL_SERVER'],
+            current_app.config['MAIL_PORT'],
+            usuario=email_remetente,
+            senha=email_password,
+            usar_tls=current_app.config['MAIL_USE_TLS'],
+            max_conexoes=current_app.config['SMTP_POOL_MAX_CONEXOES'],
+            timeout=current_app.config['MAIL_TIMEOUT'],
+            max_ociosidade=current_app.config['SMTP_POOL_MAX_OCIOSIDADE']
+        )
+    return _pool_smtp
 
-# Carrega o template
-with open('templates/email_admin.html', 'r', encoding='utf-8') as file:
-    template_admin = file.read()
 
-# Configuração do CSRF
-csrf = CSRFProtect(app)
+def _verificar_smtp() -> None:
+    """Verificação do monitor: sessão à parte do pool, com SMTP_MONITOR_TIMEOUT"""
+    obter_pool_smtp().verificar(current_app.config['SMTP_MONITOR_TIMEOUT'])
 
-# Configuração do banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///orcamentos.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', '25101951')
-app.config['UPLOAD_FOLDER'] = 'static/uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
 
-# Configuração de email atualizada para Gmail com autenticação segura
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USE_SSL'] = False
-app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
-app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
-app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER')
-app.config['MAIL_TIMEOUT'] = 30
+monitor_smtp = MonitorSMTP(verificar=_verificar_smtp)
 
-# Inicializa extensões
-mail = Mail(app)
-db.init_app(app)
 
+def montar_email(destinatario: Union[str, List[str]], assunto: str, template: str, **kwargs) -> Message:
+    """
+    Monta a mensagem MIME de um e-mail com template HTML
 
-# Configuração de logging melhorada
-def configure_logging():
-    if not os.path.exists('logs'):
-        os.mkdir('logs')
+    Args:
+        destinatario: E-mail ou lista de e-mails
+        assunto: Assunto do e-mail
+        template: Template HTML como string com {{var}} ou {var}
+        **kwargs: Variáveis para substituição (ex: nome="João")
 
-    file_handler = RotatingFileHandler(
-        'logs/orcamentos.log',
-        maxBytes=10240,
-        backupCount=10,
-        encoding='utf-8'
-    )
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-    ))
-    file_handler.setLevel(logging.INFO)
+    Returns:
+        Message: Mensagem pronta para envio
+    """
+    # 1. Renderiza o template compilado (para {{var}} e {var}), HTML e texto simples
+    compilado = compilar_template(template)
+    html = compilado.renderizar(**kwargs)
+    texto = compilado.renderizar_texto(**kwargs)
 
-    app.logger.addHandler(file_handler)
-    app.logger.setLevel(logging.INFO)
-    app.logger.info('Aplicação de orçamentos iniciada')
+    # 2. Remetente configurado
+    email_remetente = os.getenv("MAIL_GMAIL")
 
+    if not email_remetente:
+        raise ValueError("Credenciais de e-mail não configuradas")
 
-configure_logging()
+    # 3. Cria mensagem MIME
+    msg = MIMEMultipart('alternative')
+    msg['From'] = email_remetente
+    msg['To'] = ', '.join([destinatario] if isinstance(destinatario, str) else destinatario)
+    msg['Subject'] = assunto
 
-# Cria as tabelas do banco de dados
-with app.app_context():
-    db.create_all()
+    # 4. Adiciona partes (texto e HTML)
+    part1 = MIMEText(texto, 'plain', 'utf-8')
+    part2 = MIMEText(html, 'html', 'utf-8')
+    msg.attach(part1)
+    msg.attach(part2)
+    return msg
 
 
-def enviar_email(destinatario: Union[str, List[str]], assunto: str, template: str, **kwargs) -> bool:
+def entregar_email(destinatario: Union[str, List[str]], assunto: str, template: str, **kwargs) -> None:
     """
-    Função completa para envio de e-mails com template HTML
+    Monta e envia um e-mail pelo pool SMTP, levantando exceção em caso de falha
 
     Args:
         destinatario: E-mail ou lista de e-mails
         assunto: Assunto do e-mail
         template: Template HTML como string com {{var}} ou {var}
         **kwargs: Variáveis para substituição (ex: nome="João")
-
-    Returns:
-        bool: True se enviado com sucesso
     """
+    monitor_smtp.exigir_disponivel()
+    mensagem = montar_email(destinatario, assunto, template, **kwargs)
+    with FASE_SMTP_ENVIO.cronometro():
+        obter_pool_smtp().enviar(mensagem)
+
+
+def _entregar_da_fila(destinatarios: List[str], assunto: str, template: str, contexto: Dict[str, str]) -> None:
+    """Entrega uma mensagem da fila de saída usando o template registrado"""
+    entregar_email(destinatarios, assunto, template_email(template), **contexto)
+
+
+def _entregar_lote_da_fila(itens: List[Tuple[List[str], str, str, Dict[str, str]]]) -> List[Optional[Exception]]:
+    """Entrega um lote da fila de saída reaproveitando uma única sessão SMTP"""
+    resultados: List[Optional[Exception]] = [None] * len(itens)
+    mensagens, indices = [], []
+    for i, (destinatarios, assunto, template, contexto) in enumerate(itens):
+        try:
+            mensagens.append(montar_email(destinatarios, assunto, template_email(template), **contexto))
+            indices.append(i)
+        except Exception as e:
+            resultados[i] = e
+    if mensagens:
+        try:
+            monitor_smtp.exigir_disponivel()
+            with FASE_SMTP_ENVIO.cronometro():
+                enviados = obter_pool_smtp().enviar_lote(mensagens)
+        except Exception as e:
+            enviados = [e] * len(mensagens)
+        for i, erro in zip(indices, enviados):
+            resultados[i] = erro
+    return resultados
+
+
+outbox_worker = OutboxWorker(enviar=_entregar_da_fila, enviar_lote=_entregar_lote_da_fila,
+                             smtp_disponivel=monitor_smtp.permite_envio)
+
+
+@site_bp.before_app_request
+def iniciar_outbox_worker():
+    """Garante as threads da fila de e-mails e do monitor SMTP em cada worker do gunicorn"""
+    if current_app.config['EMAIL_OUTBOX_WORKER']:
+        outbox_worker.iniciar()
+    if current_app.config['SMTP_MONITOR']:
+        monitor_smtp.iniciar()
+
+
+@click.group(cls=AppGroup)
+def outbox():
+    """Comandos da fila de saída de e-mails"""
+
+
+@outbox.command('processar')
+def outbox_processar():
+    """Envia todas as mensagens pendentes e termina (uso via cron)"""
+    total = 0
+    while True:
+        processadas = outbox_worker.processar_pendentes()
+        total += processadas
+        if processadas < outbox_worker.lote:
+            break
+    click.echo(f"{total} mensagem(ns) processada(s)")
+
+
+@outbox.command('reenfileirar')
+def outbox_reenfileirar():
+    """Devolve à fila as mensagens que esgotaram as tentativas"""
+    click.echo(f"{reenfileirar_falhas()} mensagem(ns) reenfileirada(s)")
+
+
+@outbox.command('status')
+def outbox_status():
+    """Mostra a quantidade de mensagens por status"""
+    contagem = db.session.execute(
+        db.select(EmailPendente.status, db.func.count()).group_by(EmailPendente.status)
+    ).all()
+    for status, quantidade in contagem:
+        click.echo(f"{status}: {quantidade}")
+
+
+# Arquivos estáticos pré-comprimidos, com ETag forte e cache imutável para URLs com hash
+servidor_estaticos = ServidorEstaticos()
+
+
+@click.group(cls=AppGroup)
+def estaticos():
+    """Comandos dos arquivos estáticos"""
+
+
+@estaticos.command('comprimir')
+def estaticos_comprimir():
+    """Gera as versões gzip/brotli e o manifesto de hashes de static/"""
+    manifesto = comprimir_estaticos(current_app.static_folder, click.echo)
+    click.echo(f"{len(manifesto)} arquivo(s) no manifesto")
+
+
+@click.group(cls=AppGroup)
+def ativos():
+    """Comandos do CSS e JavaScript da página inicial"""
+
+
+@ativos.command('construir')
+def ativos_construir():
+    """Minifica o CSS/JS, grava as versões com hash em static/dist/ e extrai o CSS crítico"""
+    html, _, _ = current_app.jinja_loader.get_source(current_app.jinja_env, 'index.html')
+    manifesto = construir_ativos(current_app.static_folder, html, click.echo)
+    click.echo(f"{len(manifesto['arquivos'])} arquivo(s) no manifesto; rode `flask estaticos comprimir` em seguida")
+
+
+@ativos.command('sweetalert')
+@click.option('--versao', default='11', show_default=True, help='Versão do pacote sweetalert2 no npm')
+def ativos_sweetalert(versao):
+    """Baixa o SweetAlert2 para static/vendor/ (versione o arquivo no git)"""
     try:
-        # 1. Substitui variáveis no template (para {{var}} e {var})
-        html = template
-        for key, value in kwargs.items():
-            html = html.replace(f'{{{{{key}}}}}', str(value))  # Para {{var}}
-            html = html.replace(f'{{{key}}}', str(value))  # Para {var}
+        caminho, tamanho = baixar_sweetalert(current_app.static_folder, versao)
+    except OSError as e:
+        raise click.ClickException(f"Falha ao baixar o SweetAlert2: {e}")
+    click.echo(f"{caminho}: {tamanho} bytes")
 
-        # 2. Configurações do Gmail
-        email_remetente = os.getenv("MAIL_GMAIL")
-        email_password = os.getenv("MAIL_PASSWORD")
 
-        if not email_remetente or not email_password:
-            raise ValueError("Credenciais de e-mail não configuradas")
+@click.group(cls=AppGroup)
+def imagens():
+    """Comandos das variantes responsivas das imagens"""
 
-        # 3. Cria mensagem MIME
-        msg = MIMEMultipart('alternative')
-        msg['From'] = email_remetente
-        msg['To'] = ', '.join([destinatario] if isinstance(destinatario, str) else destinatario)
-        msg['Subject'] = assunto
 
-        # 4. Adiciona partes (texto e HTML)
-        part1 = MIMEText("Versão em texto simples para clientes que não suportam HTML", 'plain', 'utf-8')
-        part2 = MIMEText(html, 'html', 'utf-8')
-        msg.attach(part1)
-        msg.attach(part2)
+@imagens.command('gerar')
+@click.option('--largura', 'larguras', type=int, multiple=True, help='Largura das variantes (repetível)')
+@click.option('--qualidade', type=int, default=80, show_default=True)
+@click.option('--forcar', is_flag=True, help='Regera todas as variantes')
+def imagens_gerar(larguras, qualidade, forcar):
+    """Gera as variantes WebP/JPEG que faltam ou estão desatualizadas"""
+    manifesto = gerar_variantes(current_app.static_folder, larguras or LARGURAS_PADRAO, qualidade, forcar, click.echo)
+    click.echo(f"{len(manifesto)} imagem(ns) no manifesto")
 
-        # 5. Envia usando SMTP (método que evita problema ASCII)
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(email_remetente, email_password)
-            server.send_message(msg)  # Usando send_message em vez de sendmail
 
-        return True
+@click.group(cls=AppGroup)
+def cep():
+    """Comandos do índice local de CEP"""
 
-    except Exception as e:
-        app.logger.error(f"Erro ao enviar e-mail: {str(e)}", exc_info=True)
-        return False
 
+@cep.command('carregar')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--destino', help='Arquivo do índice (padrão: CEP_INDICE)')
+def cep_carregar(arquivo, destino):
+    """Gera o índice a partir de um CSV de faixas de CEP (uf, cidade, cep_inicio, cep_fim) ou de CEPs"""
+    inicio = time.perf_counter()
+    try:
+        resultado = construir_indice(ler_faixas(arquivo), destino or current_app.config['CEP_INDICE'])
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"{resultado.faixas} faixa(s) de {resultado.localidades} localidade(s), "
+               f"{resultado.bytes / 1024:.0f} KiB, em {time.perf_counter() - inicio:.1f}s")
+    if resultado.conflitos:
+        click.echo(f"{resultado.conflitos} faixa(s) sobreposta(s) a outra localidade descartada(s)", err=True)
+
+
+@cep.command('consultar')
+@click.argument('numero')
+def cep_consultar(numero):
+    """Mostra a localidade de um CEP no índice"""
+    if not indice_cep.disponivel:
+        raise click.ClickException(f"Índice de CEP não encontrado em {current_app.config['CEP_INDICE']}")
+    localidade = indice_cep.consultar(numero)
+    if localidade is None:
+        raise click.ClickException('CEP não encontrado no índice')
+    click.echo(f"{localidade.cidade}/{localidade.uf}")
+
+
+@site_bp.route('/cep/<numero>')
+def consultar_cep(numero):
+    """Cidade e UF do CEP, para o preenchimento do formulário"""
+    valor = numero_cep(numero)
+    if valor is None:
+        return jsonify({'success': False, 'message': 'CEP deve ter 8 dígitos'}), 400
+    if not indice_cep.disponivel:
+        return jsonify({'success': False, 'message': 'Consulta de CEP indisponível'}), 503
+    localidade = indice_cep.consultar(valor)
+    if localidade is None:
+        return jsonify({'success': False, 'message': 'CEP não encontrado'}), 404
+    digitos = f"{valor:08d}"
+    resposta = jsonify({'success': True, 'cep': f"{digitos[:5]}-{digitos[5:]}",
+                        'cidade': localidade.cidade, 'uf': localidade.uf})
+    resposta.headers['Cache-Control'] = 'public, max-age=86400'
+    return resposta
+
+
+# A página inicial não tem dados por requisição: é renderizada uma vez por worker
+cache_pagina = CachePagina()
+
+
+def dependencias_index() -> Tuple[str, ...]:
+    """Arquivos cujas mudanças alteram as URLs com hash ou o CSS inline da página inicial"""
+    return (
+        os.path.join(current_app.static_folder, PASTA_VARIANTES, MANIFESTO_IMAGENS),
+        os.path.join(current_app.static_folder, MANIFESTO_ESTATICOS),
+        os.path.join(current_app.static_folder, PASTA_DIST, MANIFESTO_ATIVOS),
+        os.path.join(current_app.static_folder, ARQUIVO_SWEETALERT),
+    )
 
-@app.route('/')
+
+@site_bp.route('/')
 def index():
     """Rota principal que renderiza o template HTML"""
-    return render_template('index.html')
+    return cache_pagina.responder('index.html', dependencias_index())
+
+
+# Parâmetros definitivos aplicados em create_app()
+limitador_orcamentos = LimitadorTaxa(5, 20 / 3600)
 
 
-@app.route('/enviar_orcamento', methods=['POST'])
+@click.command('limpar-idempotencia')
+@with_appcontext
+@click.option('--dias', type=int, default=None, help='Idade mínima das chaves removidas')
+def limpar_idempotencia(dias):
+    """Remove chaves de idempotência antigas e baldes parados do limite compartilhado"""
+    dias = dias if dias is not None else current_app.config['IDEMPOTENCIA_DIAS']
+    limite = datetime.now(timezone.utc) - timedelta(days=dias)
+    resultado = db.session.execute(db.delete(ChaveIdempotencia).where(ChaveIdempotencia.data_criacao < limite))
+    db.session.commit()
+    click.echo(f"{resultado.rowcount} chave(s) removida(s)")
+    if limitador_orcamentos.compartilhado is not None:
+        click.echo(f"{limitador_orcamentos.compartilhado.limpar_antigos()} balde(s) de limite removido(s)")
+
+
+@click.group(cls=AppGroup)
+def banco():
+    """Comandos do banco de dados"""
+
+
+@banco.command('criar')
+def banco_criar():
+    """Cria as tabelas que ainda não existem (bancos novos; em produção use `flask db upgrade`)"""
+    db.create_all()
+    click.echo("Tabelas criadas")
+
+
+@click.group(cls=AppGroup)
+def orcamentos():
+    """Comandos dos orçamentos"""
+
+
+@orcamentos.command('exportar')
+@click.option('--formato', type=click.Choice(list(FORMATOS_EXPORTACAO)), default='csv', show_default=True)
+@click.option('--saida', type=click.File('w', encoding='utf-8', lazy=True), default='-',
+              help='Arquivo de destino (padrão: saída padrão)')
+@click.option('--status')
+@click.option('--produto')
+@click.option('--uf')
+@click.option('--de', help='Data inicial (ISO 8601, inclusiva)')
+@click.option('--ate', help='Data final (ISO 8601, exclusiva)')
+def orcamentos_exportar(formato, saida, **filtros):
+    """Exporta orçamentos em CSV ou NDJSON, em lotes e com memória constante"""
+    try:
+        consulta = filtrar_orcamentos(filtros)
+    except FiltroInvalido as e:
+        raise click.BadParameter(str(e))
+    for pedaco in exportar(consulta, formato):
+        saida.write(pedaco)
+
+
+@orcamentos.command('importar')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--formato', type=click.Choice(['csv', 'jsonl']), help='Padrão: deduzido da extensão')
+@click.option('--lote', type=int, default=1000, show_default=True, help='Linhas por transação')
+@click.option('--verificar-dns', is_flag=True,
+              help='Consulta o DNS dos domínios fora do cache (por padrão só o cache é usado)')
+def orcamentos_importar(arquivo, formato, lote, verificar_dns):
+    """Importa orçamentos de um arquivo CSV ou JSONL em lotes"""
+    inicio = time.perf_counter()
+    resultado = importar(arquivo, formato, lote, verificar_dns,
+                         progresso=lambda total: click.echo(f"{total} importado(s)...", err=True))
+    for numero, mensagem in sorted(resultado.falhas):
+        click.echo(f"Linha {numero}: {mensagem}", err=True)
+    click.echo(f"{resultado.importados} orçamento(s) importado(s) e {len(resultado.falhas)} linha(s) com erro "
+               f"em {time.perf_counter() - inicio:.1f}s")
+    if resultado.falhas:
+        raise SystemExit(1)
+
+
+@orcamentos.command('reconstruir-estatisticas')
+def orcamentos_reconstruir_estatisticas():
+    """Recalcula as estatísticas diárias a partir da tabela de orçamentos"""
+    inicio = time.perf_counter()
+    total = reconstruir_estatisticas()
+    click.echo(f"{total} linha(s) de estatística em {time.perf_counter() - inicio:.1f}s")
+
+
+@orcamentos.command('reindexar-busca')
+def orcamentos_reindexar_busca():
+    """Reconstrói o índice de busca textual (FTS5) a partir da tabela de orçamentos"""
+    inicio = time.perf_counter()
+    try:
+        total = reindexar_busca()
+    except BuscaIndisponivel as e:
+        raise click.ClickException(str(e))
+    click.echo(f"{total} orçamento(s) indexado(s) em {time.perf_counter() - inicio:.1f}s")
+
+
+@orcamentos.command('arquivar')
+@click.option('--dias', type=int, default=None, help='Idade mínima dos orçamentos (padrão: ARQUIVO_DIAS)')
+@click.option('--lote', type=int, default=TAMANHO_LOTE_ARQUIVO, show_default=True, help='Orçamentos por transação')
+@click.option('--sem-vacuum', is_flag=True, help='Não compacta o banco SQLite no final')
+def orcamentos_arquivar(dias, lote, sem_vacuum):
+    """Move os orçamentos concluídos ou cancelados antigos para o arquivo compactado"""
+    dias = dias if dias is not None else current_app.config['ARQUIVO_DIAS']
+    inicio = time.perf_counter()
+    resultado = arquivar(current_app.config['ARQUIVO_PASTA'], dias, lote, not sem_vacuum,
+                         progresso=lambda total: click.echo(f"{total} arquivado(s)...", err=True))
+    click.echo(f"{resultado.arquivados} orçamento(s) arquivado(s) em {time.perf_counter() - inicio:.1f}s")
+    for nome in resultado.arquivos:
+        click.echo(f"  {os.path.join(current_app.config['ARQUIVO_PASTA'], nome)}")
+    if resultado.bytes_antes is not None:
+        click.echo(f"Banco: {resultado.bytes_antes / 1048576:.1f} MiB -> {resultado.bytes_depois / 1048576:.1f} MiB")
+
+
+def _resposta_orcamento_enviado(orcamento_id: int):
+    return jsonify({
+        'success': True,
+        'message': 'Orçamento enviado com sucesso!',
+        'orcamento_id': orcamento_id
+    })
+
+
+def _orcamento_da_chave(chave: Optional[str]) -> Optional[int]:
+    """Orçamento já criado com esta chave de idempotência, se houver"""
+    if not chave:
+        return None
+    existente = db.session.get(ChaveIdempotencia, chave)
+    return existente.orcamento_id if existente is not None else None
+
+
+@site_bp.route('/enviar_orcamento', methods=['POST'])
 @csrf.exempt  # Remova em produção!
+@cronometrar(FASE_REQUISICAO)
 def enviar_orcamento():
     """Endpoint para processar o formulário de orçamento"""
     if request.method == 'POST':
+        chave_idempotencia = (request.headers.get('Idempotency-Key') or
+                              request.form.get('idempotency_key', '')).strip()[:64] or None
         try:
-            app.logger.info(f"Dados recebidos: {request.form}")
+            # Reenvio do mesmo formulário: devolve o orçamento original sem refazer nada
+            orcamento_existente = _orcamento_da_chave(chave_idempotencia)
+            if orcamento_existente is not None:
+                current_app.logger.info('Reenvio do orçamento %s (chave de idempotência)', orcamento_existente)
+                ORCAMENTOS.incrementar('reenvio')
+                return _resposta_orcamento_enviado(orcamento_existente)
+
+            # O limite por IP vale só para orçamentos novos: o reenvio acima não gasta token
+            recusa = limitador_orcamentos.recusar(request.remote_addr or 'desconhecido')
+            if recusa is not None:
+                return recusa
 
             # Validação dos campos obrigatórios
-            campos_obrigatorios = {
-                'nome': 'Nome completo',
-                'email': 'Email',
-                'telefone': 'Telefone',
-                'rua': 'Rua',
-                'numero': 'Número',
-                'bairro': 'Bairro',
-                'cidade': 'Cidade',
-                'uf': 'UF',
-                'cep': 'CEP',
-                'produto': 'Produto',
-                'quantidade': 'Quantidade',
-                'estampa': 'Estampa'
-            }
-
-            faltantes = [
-                nome_amigavel for campo, nome_amigavel in campos_obrigatorios.items()
-                if campo not in request.form or not request.form[campo].strip()
-            ]
+            faltantes = campos_faltantes(request.form)
 
             if faltantes:
-                app.logger.warning(f"Campos obrigatórios faltando: {faltantes}")
+                current_app.logger.warning('Campos obrigatórios faltando: %s', faltantes,
+                                           extra={'amostra': 'validacao'})
+                ORCAMENTOS.incrementar('invalido')
+                FALHAS_VALIDACAO.incrementar('obrigatorios')
                 return jsonify({
                     'success': False,
                     'message': 'Preencha todos os campos obrigatórios: ' + ', '.join(faltantes)
@@ -191,7 +618,7 @@ def enviar_orcamento():
                                  request.form.get('tipo_caderno', '')).strip(),
                 'cor': request.form.get('cor_caneca', '').strip(),
                 'quantidade_paginas': request.form.get('quantidade_de_paginas'),
-                'quantidade': int(request.form['quantidade']),
+                'quantidade': validar_quantidade(request.form['quantidade']),
                 'estampa': request.form['estampa'].strip(),
                 'observacoes': request.form.get('obs', '').strip(),
                 'data_criacao': datetime.now(timezone.utc),
@@ -199,82 +626,224 @@ def enviar_orcamento():
                 'status': 'pendente'
             }
 
-            # Cria e salva o orçamento
-            novo_orcamento = Orcamento(**dados_orcamento)
-            db.session.add(novo_orcamento)
+            # Os hooks do modelo validam os campos (com a consulta DNS no modo síncrono) e o
+            # CEP é conferido com a cidade e a UF no índice local
+            inicio_validacao = time.perf_counter()
+            try:
+                novo_orcamento = Orcamento(**dados_orcamento)
+                if current_app.config['CEP_CONFERIR']:
+                    conferir_endereco(novo_orcamento.cep, novo_orcamento.cidade, novo_orcamento.uf)
+            finally:
+                FASE_VALIDACAO.observar(time.perf_counter() - inicio_validacao)
+
+            # Cria o orçamento e enfileira os e-mails na mesma transação, que pega o
+            # bloqueio de escrita no BEGIN (a leitura da chave acima foi à parte)
+            inicio_banco = time.perf_counter()
             db.session.commit()
+            transacao_escrita(db.session)
+            db.session.add(novo_orcamento)
+            db.session.flush()
 
-            email_cliente_ok = enviar_email(
+            if chave_idempotencia:
+                db.session.add(ChaveIdempotencia(chave=chave_idempotencia, orcamento_id=novo_orcamento.id))
+
+            # No envio direto as mensagens ficam reservadas para esta requisição
+            envio_direto = current_app.config['EMAIL_ENVIO'] == 'direto'
+            reservar_por = outbox_worker.tempo_trava if envio_direto else None
+
+            email_cliente = enfileirar_email(
                 [dados_orcamento['email']],
                 "Recebemos seu orçamento - Micheli Personalizados",
-                template_cliente,
+                'cliente',
+                orcamento_id=novo_orcamento.id,
+                reservar_por=reservar_por,
                 **dados_orcamento
             )
 
-            email_adm_ok = enviar_email(
+            email_adm = enfileirar_email(
                 [os.getenv("MAIL_GMAIL")],
                 "Recebemos seu orçamento - Micheli Personalizados",
-                template_admin,
+                'admin',
+                orcamento_id=novo_orcamento.id,
+                reservar_por=reservar_por,
                 **dados_orcamento
             )
 
-            if not all([email_adm_ok, email_cliente_ok]):
-                app.logger.warning(f"Orçamento {novo_orcamento.id} salvo, mas emails falharam parcialmente")
-
+            db.session.flush()
+            mensagens = {'cliente': email_cliente.id, 'admin': email_adm.id}
+            db.session.commit()
+            FASE_BANCO.observar(time.perf_counter() - inicio_banco)
+            ORCAMENTOS.incrementar('criado')
+
+            if envio_direto:
+                inicio_emails = time.perf_counter()
+                erros = outbox_worker.enviar_agora(list(mensagens.values()),
+                                                   current_app.config['EMAIL_ENVIO_TIMEOUT'])
+                FASE_EMAILS.observar(time.perf_counter() - inicio_emails)
+                falhas = [f"{nome}: {type(erro).__name__}" for nome, erro in zip(mensagens, erros) if erro]
+                if falhas:
+                    current_app.logger.warning(
+                        f"Orçamento {novo_orcamento.id} salvo, mas emails falharam parcialmente "
+                        f"({', '.join(falhas)}); ficam na fila para nova tentativa")
+            else:
+                outbox_worker.acordar()
+            current_app.logger.info('Orçamento %s criado', novo_orcamento.id,
+                                    extra={'orcamento_id': novo_orcamento.id, 'produto': novo_orcamento.produto,
+                                           'quantidade': novo_orcamento.quantidade})
+
+            # Domínio fora do cache: a consulta DNS roda depois e marca o orçamento
+            if current_app.config['EMAIL_VERIFICACAO_DNS'] == 'assincrona' and novo_orcamento.email_entregavel is None:
+                verificador_assincrono.agendar(current_app._get_current_object(), novo_orcamento.id, novo_orcamento.email)
+
+            return _resposta_orcamento_enviado(novo_orcamento.id)
+
+        except IntegrityError:
+            # Dois envios simultâneos com a mesma chave: o outro venceu a corrida
+            db.session.rollback()
+            orcamento_existente = _orcamento_da_chave(chave_idempotencia)
+            if orcamento_existente is not None:
+                ORCAMENTOS.incrementar('reenvio')
+                return _resposta_orcamento_enviado(orcamento_existente)
+            ORCAMENTOS.incrementar('erro')
+            current_app.logger.error("Erro de integridade ao salvar orçamento", exc_info=True)
             return jsonify({
-                'success': True,
-                'message': 'Orçamento enviado com sucesso!',
-                'orcamento_id': novo_orcamento.id
-            })
-
+                'success': False,
+                'message': 'Erro interno ao processar seu orçamento.'
+            }), 500
         except ValueError as e:
             db.session.rollback()
-            app.logger.error(f"Erro de validação: {str(e)}")
+            current_app.logger.warning('Erro de validação: %s', e, extra={'amostra': 'validacao'})
+            ORCAMENTOS.incrementar('invalido')
+            FALHAS_VALIDACAO.incrementar(getattr(e, 'campo', 'desconhecido'))
             return jsonify({
                 'success': False,
                 'message': str(e)
             }), 400
         except Exception as e:
             db.session.rollback()
-            app.logger.error(f"Erro ao processar orçamento: {str(e)}", exc_info=True)
+            ORCAMENTOS.incrementar('erro')
+            current_app.logger.error(f"Erro ao processar orçamento: {str(e)}", exc_info=True)
             return jsonify({
                 'success': False,
                 'message': 'Erro interno ao processar seu orçamento.'
             }), 500
 
 
-@app.route('/test_smtp')
+@site_bp.route('/test_smtp')
 def test_smtp():
-    """Rota para testar conexão SMTP"""
-    try:
-        with smtplib.SMTP(app.config['MAIL_SERVER'], app.config['MAIL_PORT']) as server:
-            server.ehlo()
-            if app.config['MAIL_USE_TLS']:
-                server.starttls()
-                server.ehlo()
-            server.set_debuglevel(1)  # Ativa logs detalhados
-            server.login(app.config['MAIL_USERNAME'], app.config['MAIL_PASSWORD'])
-            return jsonify({
-                'success': True,
-                'message': 'Conexão SMTP bem-sucedida!'
-            }), 200
-    except smtplib.SMTPAuthenticationError as e:
-        app.logger.error(f"Falha de autenticação SMTP: {str(e)}")
-        return jsonify({
-            'success': False,
-            'message': 'Falha na autenticação SMTP. Verifique: '
-                       '1. Se a senha de aplicativo está correta '
-                       '2. Se a autenticação de dois fatores está ativada '
-                       '3. Se o acesso de aplicativos menos seguros está ativado (não recomendado)'
-        }), 401
-    except Exception as e:
-        app.logger.error(f"Erro SMTP: {str(e)}")
-        return jsonify({
-            'success': False,
-            'message': f"Erro na conexão SMTP: {str(e)}"
-        }), 500
+    """Estado do SMTP segundo a última verificação do monitor, sem abrir conexão"""
+    estado = monitor_smtp.consultar()
+    if estado.disponivel:
+        mensagem = 'Conexão SMTP bem-sucedida!'
+    elif estado.disponivel is None:
+        mensagem = 'SMTP ainda não verificado'
+    else:
+        mensagem = f"Erro na conexão SMTP: {estado.erro}"
+    resposta = jsonify({
+        'success': bool(estado.disponivel),
+        'message': mensagem,
+        'smtp': estado.to_dict()
+    })
+    resposta.headers['Cache-Control'] = 'no-store'
+    return resposta, 200 if estado.disponivel else 503
+
+
+def create_app(configuracao: Optional[Dict] = None) -> Flask:
+    """
+    Cria a aplicação. Não toca no banco nem lê templates: o esquema é criado
+    por `flask db upgrade` (ou `flask banco criar`) e os templates de e-mail
+    são lidos no primeiro envio.
+
+    Args:
+        configuracao: Valores que sobrepõem os lidos do ambiente
+    """
+    # Carrega variáveis de ambiente
+    load_dotenv()
+
+    app = Flask(__name__)
+    configurar(app)
+    if configuracao:
+        app.config.update(configuracao)
+
+    if app.config['EMAIL_VERIFICACAO_DNS'] not in MODOS_VERIFICACAO:
+        raise ValueError(f"EMAIL_VERIFICACAO_DNS deve ser um de {MODOS_VERIFICACAO}")
+    if app.config['SQLITE_PERFIL'] not in PERFIS_SQLITE:
+        raise ValueError(f"SQLITE_PERFIL deve ser um de {PERFIS_SQLITE}")
+    if app.config['EMAIL_ENVIO'] not in MODOS_ENVIO:
+        raise ValueError(f"EMAIL_ENVIO deve ser um de {MODOS_ENVIO}")
+    if app.config['LOG_FORMATO'] not in FORMATOS_LOG:
+        raise ValueError(f"LOG_FORMATO deve ser um de {FORMATOS_LOG}")
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes_engine(app.config)
+
+    # Inicializa extensões
+    csrf.init_app(app)
+    mail.init_app(app)
+    db.init_app(app)
+    with app.app_context():
+        configurar_engine(db.engine, app.config)
+
+    # O Flask-Migrate (e o alembic) só é usado pela linha de comando; os workers não pagam a importação
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    cache_dominios.configurar(
+        tamanho=app.config['EMAIL_CACHE_DOMINIOS_TAMANHO'],
+        ttl=app.config['EMAIL_CACHE_DOMINIOS_TTL'],
+        ttl_negativo=app.config['EMAIL_CACHE_DOMINIOS_TTL_NEGATIVO']
+    )
+    indice_cep.configurar(app.config['CEP_INDICE'])
+    outbox_worker.init_app(app)
+    monitor_smtp.init_app(app)
+    limitador_orcamentos.configurar(
+        app.config['LIMITE_ORCAMENTOS_CAPACIDADE'],
+        app.config['LIMITE_ORCAMENTOS_POR_HORA'] / 3600,
+        app.config['LIMITE_SQLITE_CAMINHO'] if app.config['LIMITE_SQLITE'] else None
+    )
+    servidor_estaticos.init_app(app)
+    cache_pagina.init_app(app)
+
+    # Variantes responsivas das imagens (geradas por `flask imagens gerar`)
+    imagens_responsivas = ImagensResponsivas(app.static_folder, app.static_url_path)
+    app.add_template_global(imagens_responsivas.imagem_responsiva, 'imagem_responsiva')
+    app.add_template_global(imagens_responsivas.url_variante, 'url_variante')
+
+    # CSS/JS minificados e CSS crítico (gerados por `flask ativos construir`)
+    ativos_pagina = AtivosPagina(app.static_folder, app.static_url_path)
+    app.add_template_global(ativos_pagina.url_ativo, 'url_ativo')
+    app.add_template_global(ativos_pagina.css_critico, 'css_critico')
+
+    app.register_blueprint(site_bp)
+    app.register_blueprint(admin_bp)
+    registro_metricas.init_app(app)
+
+    for comando in (outbox, estaticos, ativos, imagens, limpar_idempotencia, banco, orcamentos, cep):
+        app.cli.add_command(comando)
+
+    configurar_registro(app)
+    return app
+
+
+def aquecer(app: Flask) -> None:
+    """
+    Adianta o trabalho do primeiro acesso: compila os templates de e-mail,
+    renderiza a página inicial e abre o índice de CEP. Chamado no processo
+    mestre do gunicorn com --preload (ver gunicorn.conf.py), os workers já
+    nascem com tudo pronto.
+    """
+    indice_cep.carregar()
+    with app.app_context():
+        for nome in TEMPLATES_EMAIL:
+            compilar_template(template_email(nome))
+    with app.test_request_context('/'):
+        cache_pagina.responder('index.html', dependencias_index())
+
+
+app = create_app()
 
 
 if __name__ == '__main__':
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    with app.app_context():
+        db.create_all()
     app.run(host='0.0.0.0', port=5000, debug=os.getenv('FLASK_DEBUG', 'false').lower() == 'true')
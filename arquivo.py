@@ -0,0 +1,197 @@
+"""
+Arquivamento dos orçamentos finalizados em arquivos compactados.
+
+Orçamentos ``concluido`` ou ``cancelado`` criados há mais de ``ARQUIVO_DIAS``
+dias saem de ``orcamentos`` e vão para ``ARQUIVO_PASTA/AAAA-MM.ndjson.gz``
+(mês de criação), uma linha JSON por orçamento no formato de
+``Orcamento.to_dict()`` mais ``ip_cliente`` e ``email_entregavel``.
+
+Os arquivos só recebem acréscimos: cada lote vira um membro gzip novo no fim
+do arquivo do mês (membros concatenados continuam sendo um .gz válido, e
+``zcat`` lê tudo). ``orcamentos_arquivados`` guarda, por id, o arquivo e o
+deslocamento do membro; a consulta de um orçamento arquivado lê e
+descompacta só esse membro (até ``TAMANHO_LOTE`` linhas).
+
+Cada lote é uma transação: o membro é gravado e sincronizado no disco antes
+do DELETE. Se o processo parar no meio, o membro fica órfão no arquivo (o
+índice nunca aponta para ele) e os orçamentos continuam na tabela para a
+próxima execução. O DELETE é feito pelo Core, então as estatísticas diárias
+continuam contando os arquivados; a busca textual os remove pelos gatilhos.
+Orçamentos com e-mail ainda na fila ficam para depois; as chaves de
+idempotência são removidas e as mensagens já enviadas perdem a referência.
+
+Ao final o SQLite passa por VACUUM para devolver o espaço ao disco.
+Agendamento diário, por exemplo:
+    0 4 * * * cd /app && flask orcamentos arquivar
+"""
+import gzip
+import json
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import exists, func, insert, select, update
+
+from banco import transacao_escrita
+from busca import disponivel as busca_disponivel, otimizar as otimizar_busca
+from models import db, ChaveIdempotencia, EmailPendente, Orcamento, OrcamentoArquivado
+
+STATUS_FINALIZADOS = ('concluido', 'cancelado')
+TAMANHO_LOTE = 1000
+NIVEL_COMPRESSAO = 6
+
+
+class ResultadoArquivamento(NamedTuple):
+    arquivados: int
+    arquivos: List[str]
+    bytes_antes: Optional[int]
+    bytes_depois: Optional[int]
+
+
+def nome_arquivo(data: datetime) -> str:
+    return f"{data:%Y-%m}.ndjson.gz"
+
+
+def _registro(orcamento: Orcamento) -> Dict:
+    registro = orcamento.to_dict()
+    registro['ip_cliente'] = orcamento.ip_cliente
+    registro['email_entregavel'] = orcamento.email_entregavel
+    return registro
+
+
+def _acrescentar(caminho: str, linhas: List[Dict]) -> int:
+    """Grava as linhas como um membro gzip no fim do arquivo; retorna o deslocamento do membro"""
+    conteudo = ''.join(json.dumps(linha, ensure_ascii=False) + '\n' for linha in linhas).encode('utf-8')
+    with open(caminho, 'ab') as arquivo:
+        deslocamento = arquivo.tell()
+        arquivo.write(gzip.compress(conteudo, NIVEL_COMPRESSAO, mtime=0))
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    return deslocamento
+
+
+def _arquivar_lote(pasta: str, limite: datetime, tamanho_lote: int, arquivos: set) -> int:
+    """Arquiva até ``tamanho_lote`` orçamentos numa transação; retorna quantos"""
+    transacao_escrita(db.session)
+    email_na_fila = exists().where(
+        EmailPendente.orcamento_id == Orcamento.id,
+        EmailPendente.status.in_(('pendente', 'enviando'))
+    )
+    # O SQLite reaproveita o maior rowid se ele for apagado: o último orçamento nunca é arquivado
+    ultimo = select(func.max(Orcamento.id)).scalar_subquery()
+    orcamentos = db.session.scalars(
+        select(Orcamento)
+        .where(Orcamento.status.in_(STATUS_FINALIZADOS), Orcamento.data_criacao < limite,
+               Orcamento.id < ultimo, ~email_na_fila)
+        .order_by(Orcamento.id)
+        .limit(tamanho_lote)
+    ).all()
+    if not orcamentos:
+        db.session.rollback()
+        return 0
+
+    por_arquivo: Dict[str, List[Orcamento]] = {}
+    for orcamento in orcamentos:
+        por_arquivo.setdefault(nome_arquivo(orcamento.data_criacao), []).append(orcamento)
+
+    indice = []
+    for nome, grupo in por_arquivo.items():
+        deslocamento = _acrescentar(os.path.join(pasta, nome), [_registro(o) for o in grupo])
+        arquivos.add(nome)
+        indice.extend({
+            'id': o.id, 'cliente_id': o.cliente_id, 'data_criacao': o.data_criacao, 'produto': o.produto,
+            'status': o.status, 'uf': o.uf, 'cor': o.cor, 'quantidade': o.quantidade,
+            'arquivo': nome, 'deslocamento': deslocamento,
+            'data_arquivamento': datetime.now(timezone.utc),
+        } for o in grupo)
+
+    ids = [orcamento.id for orcamento in orcamentos]
+    db.session.execute(insert(OrcamentoArquivado), indice)
+    db.session.execute(ChaveIdempotencia.__table__.delete().where(ChaveIdempotencia.orcamento_id.in_(ids)))
+    db.session.execute(
+        update(EmailPendente.__table__).where(EmailPendente.orcamento_id.in_(ids)).values(orcamento_id=None)
+    )
+    # Pelo Core: sem os eventos do ORM, as estatísticas diárias não são descontadas
+    db.session.execute(Orcamento.__table__.delete().where(Orcamento.id.in_(ids)))
+    db.session.commit()
+    db.session.expunge_all()
+    return len(ids)
+
+
+def _tamanho_banco() -> Optional[int]:
+    caminho = db.engine.url.database
+    if db.engine.dialect.name != 'sqlite' or not caminho or caminho == ':memory:':
+        return None
+    return sum(os.path.getsize(caminho + sufixo) for sufixo in ('', '-wal') if os.path.exists(caminho + sufixo))
+
+
+def compactar_banco() -> None:
+    """VACUUM do SQLite (fora de transação) e truncamento do WAL; sem efeito em outros bancos"""
+    if db.engine.dialect.name != 'sqlite':
+        return
+    db.session.remove()
+    conexao = db.engine.raw_connection()
+    try:
+        cursor = conexao.cursor()
+        if conexao.driver_connection.in_transaction:
+            conexao.driver_connection.commit()
+        cursor.execute('VACUUM')
+        cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        cursor.close()
+    finally:
+        conexao.close()
+
+
+def arquivar(pasta: str, dias: int, tamanho_lote: int = TAMANHO_LOTE, compactar: bool = True,
+             progresso: Optional[Callable[[int], None]] = None) -> ResultadoArquivamento:
+    """
+    Move os orçamentos finalizados há mais de ``dias`` dias para os arquivos.
+
+    Args:
+        pasta: Pasta dos arquivos mensais
+        dias: Idade mínima (pela data de criação)
+        tamanho_lote: Orçamentos por transação e por membro gzip
+        compactar: Faz o VACUUM do SQLite no final
+        progresso: Chamado com o total arquivado após cada lote
+    """
+    os.makedirs(pasta, exist_ok=True)
+    limite = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=dias)
+    bytes_antes = _tamanho_banco()
+    arquivos: set = set()
+    total = 0
+    while True:
+        quantidade = _arquivar_lote(pasta, limite, tamanho_lote, arquivos)
+        if not quantidade:
+            break
+        total += quantidade
+        if progresso:
+            progresso(total)
+
+    if total:
+        if busca_disponivel():
+            otimizar_busca()
+        if compactar:
+            compactar_banco()
+    return ResultadoArquivamento(total, sorted(arquivos), bytes_antes, _tamanho_banco())
+
+
+def ler_arquivado(pasta: str, orcamento_id: int) -> Optional[Dict]:
+    """Registro de um orçamento arquivado (formato de ``to_dict()``), ou None"""
+    entrada = db.session.get(OrcamentoArquivado, orcamento_id)
+    if entrada is None:
+        return None
+    descompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)  # Um membro gzip
+    partes = []
+    with open(os.path.join(pasta, entrada.arquivo), 'rb') as arquivo:
+        arquivo.seek(entrada.deslocamento)
+        while not descompressor.eof:
+            bloco = arquivo.read(64 * 1024)
+            if not bloco:
+                break
+            partes.append(descompressor.decompress(bloco))
+    for linha in b''.join(partes).decode('utf-8').splitlines():
+        registro = json.loads(linha)
+        if registro['id'] == orcamento_id:
+            return registro
+    return None
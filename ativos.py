@@ -0,0 +1,406 @@
+"""
+Build do CSS e do JavaScript da página inicial.
+
+As fontes ficam em ``static/css/site.css`` e ``static/js/site.js``. O comando
+``flask ativos construir``:
+  - minifica as fontes (remove comentários e espaços, sem alterar strings,
+    template literals e expressões regulares);
+  - grava o resultado em ``static/dist/`` com o hash do conteúdo no nome, que
+    o ``ServidorEstaticos`` serve como ``immutable``;
+  - extrai o CSS crítico: as regras cujos seletores casam com elementos do
+    template antes do marcador ``{# dobra #}``. Ele vai inline no ``<head>`` e
+    a folha completa é carregada sem bloquear a renderização;
+  - copia o SweetAlert2 de ``static/vendor/`` (baixado uma vez com
+    ``flask ativos sweetalert`` e versionado no git) para ``static/dist/``.
+
+Nos templates, ``url_ativo()`` retorna a URL do arquivo construído e
+``css_critico()`` o CSS inline. Sem build, ``url_ativo()`` cai para a fonte
+(ou para a URL alternativa, como o CDN, se a fonte não existir) e
+``css_critico()`` retorna vazio, e a folha é carregada normalmente.
+Rode ``flask estaticos comprimir`` depois para gerar as versões gzip/brotli.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import urllib.request
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from markupsafe import Markup
+
+PASTA_DIST = 'dist'
+ARQUIVO_MANIFESTO = 'manifest.json'
+MARCADOR_DOBRA = '{# dobra #}'
+ARQUIVO_SWEETALERT = 'vendor/sweetalert2.all.min.js'
+# O pacote "all" já injeta o próprio CSS: não há folha separada
+URL_SWEETALERT = 'https://cdn.jsdelivr.net/npm/sweetalert2@{versao}/dist/sweetalert2.all.min.js'
+
+_ESPACOS = ' \t\r\n\f\v'
+# Depois destes caracteres (ou antes dos seguintes) uma quebra de linha não muda o JavaScript
+_QUEBRA_DISPENSAVEL_DEPOIS = set('{([,;:=?&|!<>*%~^')
+_QUEBRA_DISPENSAVEL_ANTES = set(')]},;:.?')
+_ANTES_DE_REGEX = set('(,=:[!&|?{};+-*%<>~^')
+_PALAVRAS_ANTES_DE_REGEX = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw',
+                            'case', 'do', 'else', 'yield', 'await'}
+_PSEUDO_CLASSES_ESTADO = re.compile(r':(hover|focus|focus-within|focus-visible|active|visited|checked|invalid)\b')
+
+
+def _caractere_palavra(c: str) -> bool:
+    return c.isalnum() or c in '_$\\' or ord(c) > 127
+
+
+def _precisa_espaco(anterior: str, seguinte: str) -> bool:
+    if _caractere_palavra(anterior) and _caractere_palavra(seguinte):
+        return True
+    # "a + +b", "a - -b" e "1 .toString()"
+    return (anterior == seguinte and anterior in '+-') or (anterior.isdigit() and seguinte == '.')
+
+
+def _fim_string(texto: str, i: int) -> int:
+    """Índice logo após a string que começa em ``i``"""
+    aspas = texto[i]
+    i += 1
+    while i < len(texto):
+        if texto[i] == '\\':
+            i += 2
+            continue
+        if texto[i] == aspas or texto[i] == '\n':
+            return i + 1
+        i += 1
+    return i
+
+
+def _fim_trecho_template(codigo: str, i: int) -> Tuple[int, bool]:
+    """Avança num template literal até o fim (False) ou até abrir um ``${`` (True)"""
+    while i < len(codigo):
+        c = codigo[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '`':
+            return i + 1, False
+        if c == '$' and codigo.startswith('{', i + 1):
+            return i + 2, True
+        i += 1
+    return i, False
+
+
+def _fim_regex(codigo: str, i: int) -> int:
+    i += 1
+    classe = False
+    while i < len(codigo):
+        c = codigo[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '\n':
+            break
+        if c == '[':
+            classe = True
+        elif c == ']':
+            classe = False
+        elif c == '/' and not classe:
+            i += 1
+            break
+        i += 1
+    while i < len(codigo) and codigo[i].isalpha():  # Flags
+        i += 1
+    return i
+
+
+def minificar_js(codigo: str) -> str:
+    """
+    Remove comentários, indentação e espaços desnecessários. Quebras de linha
+    só saem onde não dependem da inserção automática de ponto e vírgula.
+    """
+    saida: List[str] = []
+    pendente = ''  # Espaço (' ' ou '\n') entre o último token e o próximo
+    anterior = ''  # Último caractere emitido
+    palavra = ''  # Último token, se for uma palavra
+    expressoes: List[int] = []  # Chaves abertas dentro de cada ${ } de template literal
+    i, n = 0, len(codigo)
+    while i < n:
+        c = codigo[i]
+        if c in _ESPACOS:
+            j = i
+            while j < n and codigo[j] in _ESPACOS:
+                j += 1
+            pendente = '\n' if pendente == '\n' or '\n' in codigo[i:j] else ' '
+            i = j
+            continue
+        if codigo.startswith('//', i):
+            j = codigo.find('\n', i)
+            i = n if j < 0 else j
+            continue
+        if codigo.startswith('/*', i):
+            j = codigo.find('*/', i + 2)
+            fim = n if j < 0 else j + 2
+            pendente = '\n' if pendente == '\n' or '\n' in codigo[i:fim] else ' '
+            i = fim
+            continue
+
+        if c in '"\'':
+            fim = _fim_string(codigo, i)
+        elif c == '`' or (c == '}' and expressoes and expressoes[-1] == 0):
+            if c == '}':
+                expressoes.pop()
+            fim, abriu = _fim_trecho_template(codigo, i + 1)
+            if abriu:
+                expressoes.append(0)
+        elif c == '/' and (not anterior or anterior in _ANTES_DE_REGEX or palavra in _PALAVRAS_ANTES_DE_REGEX):
+            fim = _fim_regex(codigo, i)
+        elif _caractere_palavra(c):
+            fim = i + 1
+            while fim < n and _caractere_palavra(codigo[fim]):
+                fim += 1
+        else:
+            fim = i + 1
+            if expressoes and c in '{}':
+                expressoes[-1] += 1 if c == '{' else -1
+
+        token = codigo[i:fim]
+        if pendente and anterior:
+            if pendente == '\n' and anterior not in _QUEBRA_DISPENSAVEL_DEPOIS \
+                    and token[0] not in _QUEBRA_DISPENSAVEL_ANTES:
+                saida.append('\n')
+            elif _precisa_espaco(anterior, token[0]):
+                saida.append(' ')
+        saida.append(token)
+        pendente = ''
+        anterior = token[-1]
+        palavra = token if _caractere_palavra(c) else ''
+        i = fim
+    return ''.join(saida) + '\n'
+
+
+def minificar_css(css: str) -> str:
+    """Remove comentários, espaços em volta de ``{};,>`` e depois de ``:``, e o ``;`` antes de ``}``"""
+    tokens: List[str] = []
+    pendente = False
+    i, n = 0, len(css)
+    while i < n:
+        c = css[i]
+        if c in _ESPACOS or css.startswith('/*', i):
+            if c in _ESPACOS:
+                i += 1
+            else:
+                j = css.find('*/', i + 2)
+                i = n if j < 0 else j + 2
+            pendente = True
+            continue
+        fim = _fim_string(css, i) if c in '"\'' else i + 1
+        token = css[i:fim]
+        if pendente and tokens and tokens[-1][-1] not in '{};,>:' and token not in ('{', '}', ';', ',', '>'):
+            tokens.append(' ')
+        if token == '}' and tokens and tokens[-1] == ';':
+            tokens.pop()
+        tokens.append(token)
+        pendente = False
+        i = fim
+    return ''.join(tokens) + '\n'
+
+
+def _blocos(css: str) -> List[Tuple[str, Optional[str]]]:
+    """Divide CSS minificado em (prelúdio, corpo) de primeiro nível; ``@import`` e afins têm corpo None"""
+    blocos = []
+    i, n = 0, len(css)
+    while i < n:
+        inicio = i
+        while i < n and css[i] not in '{;':
+            i = _fim_string(css, i) if css[i] in '"\'' else i + 1
+        preludio = css[inicio:i].strip()
+        if i >= n or css[i] == ';':
+            if preludio:
+                blocos.append((preludio, None))
+            i += 1
+            continue
+        profundidade, i = 1, i + 1
+        corpo_inicio = i
+        while i < n and profundidade:
+            if css[i] in '"\'':
+                i = _fim_string(css, i)
+                continue
+            profundidade += {'{': 1, '}': -1}.get(css[i], 0)
+            i += 1
+        blocos.append((preludio, css[corpo_inicio:i - 1]))
+    return blocos
+
+
+class _ElementosVisiveis(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.tags: Set[str] = {'html', 'body'}
+        self.ids: Set[str] = set()
+        self.classes: Set[str] = set()
+
+    def handle_starttag(self, tag, atributos):
+        self.tags.add(tag)
+        for nome, valor in atributos:
+            if nome == 'id' and valor:
+                self.ids.add(valor)
+            elif nome == 'class' and valor:
+                self.classes.update(valor.split())
+
+
+def _composto_visivel(composto: str, elementos: _ElementosVisiveis) -> bool:
+    composto = re.sub(r'::?[\w-]+(\([^)]*\))?|\[[^\]]*\]', '', composto)
+    tag = re.match(r'[a-zA-Z][\w-]*|\*', composto)
+    if tag and tag.group() != '*' and tag.group().lower() not in elementos.tags:
+        return False
+    return set(re.findall(r'#([\w-]+)', composto)) <= elementos.ids \
+        and set(re.findall(r'\.([\w-]+)', composto)) <= elementos.classes
+
+
+def _seletor_visivel(seletor: str, elementos: _ElementosVisiveis) -> bool:
+    """Sem estado de interação e com cada parte (separada por combinadores) presente acima da dobra"""
+    if _PSEUDO_CLASSES_ESTADO.search(seletor):
+        return False
+    return all(_composto_visivel(composto, elementos)
+               for composto in re.split(r'\s*[>+~]\s*|\s+', seletor.strip()) if composto)
+
+
+def extrair_css_critico(css: str, html: str) -> str:
+    """
+    Regras do CSS (minificado) que se aplicam a elementos do HTML antes do
+    marcador de dobra. Estados como ``:hover`` e ``@keyframes`` ficam para a
+    folha completa; ``@media`` entra com as regras internas selecionadas.
+    """
+    elementos = _ElementosVisiveis()
+    elementos.feed(html.split(MARCADOR_DOBRA, 1)[0])
+
+    def selecionar(trecho: str) -> str:
+        saida = []
+        for preludio, corpo in _blocos(trecho):
+            if corpo is None:
+                saida.append(preludio + ';')
+            elif preludio.startswith(('@media', '@supports')):
+                interno = selecionar(corpo)
+                if interno:
+                    saida.append(f"{preludio}{{{interno}}}")
+            elif preludio.startswith('@font-face'):
+                saida.append(f"{preludio}{{{corpo}}}")
+            elif not preludio.startswith('@') \
+                    and any(_seletor_visivel(seletor, elementos) for seletor in preludio.split(',')):
+                saida.append(f"{preludio}{{{corpo}}}")
+        return ''.join(saida)
+
+    return selecionar(css)
+
+
+def _hash(conteudo: bytes) -> str:
+    return hashlib.sha256(conteudo).hexdigest()[:12]
+
+
+def _ler_manifesto(caminho: str) -> Dict:
+    try:
+        with open(caminho, 'r', encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+# Fonte em static/ -> minificador (None: já vem minificada)
+FONTES: Dict[str, Optional[Callable[[str], str]]] = {
+    'css/site.css': minificar_css,
+    'js/site.js': minificar_js,
+    ARQUIVO_SWEETALERT: None,
+}
+
+
+def construir_ativos(pasta_static: str, html: str, registrar=print) -> Dict:
+    """
+    Minifica as fontes, grava os arquivos com hash em ``static/dist/`` e o manifesto.
+
+    Args:
+        pasta_static: Pasta de arquivos estáticos da aplicação
+        html: Fonte do template da página, para o CSS crítico
+        registrar: Função usada para reportar os tamanhos
+
+    Returns:
+        Dict: Manifesto {'arquivos': {fonte: {...}}, 'css_critico': str}
+    """
+    destino = os.path.join(pasta_static, PASTA_DIST)
+    os.makedirs(destino, exist_ok=True)
+    manifesto: Dict = {'arquivos': {}, 'css_critico': ''}
+
+    for fonte, minificar in FONTES.items():
+        caminho = os.path.join(pasta_static, fonte)
+        if not os.path.isfile(caminho):
+            registrar(f"{fonte}: não encontrado, ignorado")
+            continue
+        with open(caminho, 'r', encoding='utf-8') as arquivo:
+            texto = arquivo.read()
+        resultado = minificar(texto) if minificar else texto
+        if fonte == 'css/site.css':
+            manifesto['css_critico'] = extrair_css_critico(resultado, html).strip()
+        conteudo = resultado.encode('utf-8')
+        base, extensao = os.path.splitext(os.path.basename(fonte))
+        nome = f"{base}.{_hash(conteudo)}{extensao}"
+        with open(os.path.join(destino, nome), 'wb') as arquivo:
+            arquivo.write(conteudo)
+        manifesto['arquivos'][fonte] = {'arquivo': nome, 'bytes': len(conteudo)}
+        registrar(f"{fonte}: {len(texto.encode('utf-8'))} -> {len(conteudo)} bytes "
+                  f"({len(gzip.compress(conteudo, compresslevel=9, mtime=0))} com gzip) em {PASTA_DIST}/{nome}")
+    critico = manifesto['css_critico'].encode('utf-8')
+    registrar(f"CSS crítico inline: {len(critico)} bytes ({len(gzip.compress(critico, mtime=0))} com gzip)")
+
+    # Remove builds anteriores (e as suas versões .gz/.br)
+    em_uso = {entrada['arquivo'] for entrada in manifesto['arquivos'].values()}
+    for arquivo in os.listdir(destino):
+        if arquivo != ARQUIVO_MANIFESTO and re.sub(r'\.(gz|br)$', '', arquivo) not in em_uso:
+            os.remove(os.path.join(destino, arquivo))
+
+    with open(os.path.join(destino, ARQUIVO_MANIFESTO), 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, indent=2, sort_keys=True, ensure_ascii=False)
+    return manifesto
+
+
+def baixar_sweetalert(pasta_static: str, versao: str = '11', tempo_limite: float = 30) -> Tuple[str, int]:
+    """Baixa o SweetAlert2 do CDN para ``static/vendor/``; retorna (caminho, bytes)"""
+    with urllib.request.urlopen(URL_SWEETALERT.format(versao=versao), timeout=tempo_limite) as resposta:
+        conteudo = resposta.read()
+    caminho = os.path.join(pasta_static, ARQUIVO_SWEETALERT)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, caminho)
+    return caminho, len(conteudo)
+
+
+class AtivosPagina:
+    """Lê o manifesto do build (recarregando se mudar) para os templates"""
+
+    def __init__(self, pasta_static: str, url_static: str = '/static'):
+        self.pasta_static = pasta_static
+        self.url_static = url_static.rstrip('/')
+        self.caminho_manifesto = os.path.join(pasta_static, PASTA_DIST, ARQUIVO_MANIFESTO)
+        self._manifesto: Dict = {}
+        self._mtime: Optional[float] = None
+
+    def manifesto(self) -> Dict:
+        try:
+            mtime = os.stat(self.caminho_manifesto).st_mtime
+        except FileNotFoundError:
+            self._manifesto, self._mtime = {}, None
+            return self._manifesto
+        if mtime != self._mtime:
+            self._manifesto, self._mtime = _ler_manifesto(self.caminho_manifesto), mtime
+        return self._manifesto
+
+    def url_ativo(self, fonte: str, alternativa: Optional[str] = None) -> str:
+        """
+        URL do arquivo construído; sem build, a da fonte. Se a fonte não
+        existir e houver ``alternativa`` (como um CDN), ela é usada.
+        """
+        entrada = self.manifesto().get('arquivos', {}).get(fonte)
+        if entrada is not None:
+            return f"{self.url_static}/{PASTA_DIST}/{entrada['arquivo']}"
+        if alternativa and not os.path.isfile(os.path.join(self.pasta_static, fonte)):
+            return alternativa
+        return f"{self.url_static}/{fonte}"
+
+    def css_critico(self) -> Markup:
+        return Markup(self.manifesto().get('css_critico', ''))
@@ -0,0 +1,121 @@
+"""
+Perfis de conexão do banco de dados.
+
+SQLite com vários workers do gunicorn (perfil ``concorrente``, o padrão):
+  - ``journal_mode=WAL``: leitores não bloqueiam o escritor e vice-versa;
+  - ``synchronous=NORMAL``: com WAL continua seguro contra corrupção e só
+    perde as últimas transações numa queda de energia, sem fsync a cada commit;
+  - ``busy_timeout``: quem encontra o banco ocupado espera em vez de falhar;
+  - ``cache_size`` e ``mmap_size`` por conexão;
+  - transações de escrita começam com ``BEGIN IMMEDIATE``. Uma transação
+    comum (``DEFERRED``) que lê e depois escreve precisa promover o bloqueio
+    no meio do caminho e, se outro worker escreveu nesse intervalo, o SQLite
+    responde ``database is locked`` na hora, sem respeitar o busy_timeout.
+    Com ``IMMEDIATE`` o bloqueio de escrita é pego no início e a espera
+    acontece dentro do timeout. Os caminhos que leem e depois gravam (envio
+    do orçamento, reserva da fila de e-mails, importação, arquivamento)
+    chamam ``transacao_escrita``; as demais transações ficam ``DEFERRED`` e
+    as leituras não disputam o bloqueio de escrita.
+
+O perfil ``padrao`` mantém o comportamento do driver sem ajustes.
+
+PostgreSQL (``DATABASE_URL``) recebe um pool dimensionado por worker, com
+pre-ping e reciclagem das conexões. Cada worker abre até
+``DB_POOL_TAMANHO + DB_POOL_EXCEDENTE`` conexões; multiplicado pelo número
+de workers, o total deve ficar abaixo do ``max_connections`` do servidor.
+"""
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import scoped_session
+
+PERFIS_SQLITE = ('concorrente', 'padrao')
+MODOS_BEGIN = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class BancoNaoSuportado(RuntimeError):
+    """O banco configurado não oferece um recurso de que a aplicação depende"""
+
+
+def normalizar_url(url: str) -> str:
+    """Aceita o esquema ``postgres://`` que alguns provedores ainda exportam"""
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def _eh_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == 'sqlite'
+
+
+def opcoes_engine(config) -> Dict:
+    """Valor de ``SQLALCHEMY_ENGINE_OPTIONS`` para o banco configurado"""
+    url = config['SQLALCHEMY_DATABASE_URI']
+    if _eh_sqlite(url):
+        return {}
+    return {
+        'pool_size': config['DB_POOL_TAMANHO'],
+        'max_overflow': config['DB_POOL_EXCEDENTE'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECICLAR'],
+        'pool_pre_ping': True,
+    }
+
+
+def pragmas_sqlite(config) -> list:
+    return [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_MB']) * 1024}",  # Negativo: em KiB
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_MB']) * 1024 * 1024}",
+        'PRAGMA temp_store=MEMORY',
+    ]
+
+
+def configurar_engine(engine: Engine, config) -> None:
+    """Registra os eventos do perfil SQLite no engine (sem efeito em outros bancos)"""
+    if engine.dialect.name != 'sqlite' or config['SQLITE_PERFIL'] == 'padrao':
+        return
+    pragmas = pragmas_sqlite(config)
+
+    @event.listens_for(engine, 'connect')
+    def _ao_conectar(conexao_dbapi, registro):
+        # Desliga o BEGIN implícito do pysqlite; o evento 'begin' abaixo emite o nosso
+        conexao_dbapi.isolation_level = None
+        cursor = conexao_dbapi.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def _ao_iniciar(conexao):
+        modo = conexao.get_execution_options().get('sqlite_begin', 'DEFERRED')
+        if modo not in MODOS_BEGIN:
+            raise ValueError(f"sqlite_begin inválido: {modo}")
+        conexao.exec_driver_sql(f'BEGIN {modo}')
+
+
+def transacao_escrita(sessao) -> None:
+    """
+    Faz a próxima transação da sessão começar com ``BEGIN IMMEDIATE``.
+
+    Deve ser chamada antes da primeira consulta; se a sessão já está em uma
+    transação, não faz nada. Em bancos que não são SQLite a opção é ignorada.
+    """
+    if isinstance(sessao, scoped_session):
+        sessao = sessao()
+    if not sessao.in_transaction():
+        sessao.connection(execution_options={'sqlite_begin': 'IMMEDIATE'})
+
+
+def insert_upsert(dialeto: str):
+    """``insert`` do dialeto, com ``on_conflict_do_update`` (SQLite e PostgreSQL)"""
+    if dialeto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialeto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise BancoNaoSuportado(f"UPSERT não suportado no banco {dialeto}; use SQLite ou PostgreSQL")
+    return insert
@@ -0,0 +1,65 @@
+"""
+Compara o envio com uma sessão SMTP nova por mensagem (comportamento antigo
+de ``enviar_email``) com o envio pelo ``PoolSMTP``.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_smtp_pool --mensagens 50 --latencia 0.01
+"""
+import argparse
+import smtplib
+import time
+from email.mime.text import MIMEText
+
+from benchmarks.smtp_falso import ServidorSMTPFalso
+from smtp_pool import PoolSMTP
+
+
+def _mensagem(i: int) -> MIMEText:
+    msg = MIMEText(f'Mensagem {i}', 'plain', 'utf-8')
+    msg['From'] = 'loja@example.com'
+    msg['To'] = 'cliente@example.com'
+    msg['Subject'] = f'Teste {i}'
+    return msg
+
+
+def sessao_por_mensagem(servidor: ServidorSMTPFalso, total: int) -> None:
+    for i in range(total):
+        with smtplib.SMTP(servidor.host, servidor.porta) as conexao:
+            conexao.login('loja@example.com', 'senha')
+            conexao.send_message(_mensagem(i))
+
+
+def pool_individual(servidor: ServidorSMTPFalso, total: int) -> None:
+    pool = PoolSMTP(servidor.host, servidor.porta, 'loja@example.com', 'senha', usar_tls=False)
+    for i in range(total):
+        pool.enviar(_mensagem(i))
+    pool.fechar()
+
+
+def pool_lote(servidor: ServidorSMTPFalso, total: int) -> None:
+    pool = PoolSMTP(servidor.host, servidor.porta, 'loja@example.com', 'senha', usar_tls=False)
+    erros = pool.enviar_lote([_mensagem(i) for i in range(total)])
+    assert not any(erros), erros
+    pool.fechar()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mensagens', type=int, default=50)
+    parser.add_argument('--latencia', type=float, default=0.005, help='latência simulada por comando SMTP')
+    args = parser.parse_args()
+
+    for nome, funcao in [('sessão por mensagem', sessao_por_mensagem),
+                         ('pool, envio individual', pool_individual),
+                         ('pool, envio em lote', pool_lote)]:
+        with ServidorSMTPFalso(latencia=args.latencia) as servidor:
+            inicio = time.perf_counter()
+            funcao(servidor, args.mensagens)
+            duracao = time.perf_counter() - inicio
+            c = servidor.contadores
+        print(f"{nome:<24} {duracao * 1000:9.1f} ms  {args.mensagens / duracao:8.1f} msg/s  "
+              f"conexões={c['conexoes']} logins={c['logins']} noops={c['noops']} mensagens={c['mensagens']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Compara a renderização antiga dos e-mails (duas passadas de ``str.replace``
+por variável) com o template compilado de ``template_email``.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_template_email --repeticoes 2000
+"""
+import argparse
+import timeit
+from datetime import datetime, timezone
+
+from template_email import TemplateEmail, compilar_template
+
+CONTEXTO = {
+    'nome': 'Maria da Silva', 'email': 'maria@example.com', 'telefone': '(11) 99999-8888',
+    'rua': 'Rua das Flores', 'numero': '123', 'complemento': 'Apto 4', 'bairro': 'Centro',
+    'cidade': 'São Paulo', 'uf': 'SP', 'cep': '01001-000', 'produto': 'caneca',
+    'tipo_produto': 'porcelana', 'cor': 'azul', 'quantidade_paginas': None, 'quantidade': 10,
+    'estampa': 'Astronauta', 'observacoes': 'Entregar à tarde\nObrigada!',
+    'data_criacao': datetime.now(timezone.utc), 'ip_cliente': '127.0.0.1', 'status': 'pendente',
+}
+
+
+def renderizar_replace(template: str, **kwargs) -> str:
+    """Implementação anterior de ``enviar_email``"""
+    html = template
+    for key, value in kwargs.items():
+        html = html.replace(f'{{{{{key}}}}}', str(value))
+        html = html.replace(f'{{{key}}}', str(value))
+    return html
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticoes', type=int, default=2000)
+    args = parser.parse_args()
+
+    for nome in ('email_cliente', 'email_admin'):
+        with open(f'templates/{nome}.html', 'r', encoding='utf-8') as arquivo:
+            fonte = arquivo.read()
+
+        compilacao = timeit.timeit(lambda: TemplateEmail(fonte), number=50) / 50
+        compilado = compilar_template(fonte)
+        medidas = {
+            'str.replace (antigo)': lambda: renderizar_replace(fonte, **CONTEXTO),
+            'compilado, só HTML': lambda: compilado.renderizar(**CONTEXTO),
+            'compilado, HTML + texto': lambda: (compilado.renderizar(**CONTEXTO),
+                                                compilado.renderizar_texto(**CONTEXTO)),
+        }
+        print(f"{nome} ({len(fonte)} caracteres, compilação única: {compilacao * 1e6:.0f} µs)")
+        for descricao, funcao in medidas.items():
+            media = min(timeit.repeat(funcao, number=args.repeticoes, repeat=5)) / args.repeticoes
+            print(f"  {descricao:<26} {media * 1e6:8.2f} µs/e-mail")
+
+
+if __name__ == '__main__':
+    main()
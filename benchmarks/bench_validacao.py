@@ -0,0 +1,143 @@
+"""
+Vazão da validação de orçamentos (``validacao``) em um registro e em lotes de
+10 mil e 100 mil registros, comparada com os hooks antigos do modelo (``re.sub``
+a cada chamada, lista de UFs recriada e percorrida, e-mail validado do zero).
+
+É uma suíte do pytest-benchmark, fora da coleta padrão do pytest:
+    pip install pytest pytest-benchmark
+    python -m pytest benchmarks/bench_validacao.py --benchmark-sort=mean
+
+Sem o plugin, roda com timeit:
+    python -m benchmarks.bench_validacao
+"""
+import re
+import timeit
+
+import pytest
+from email_validator import validate_email
+
+from validacao import validar_coluna, validar_lote, validar_registro
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    pytest_benchmark = None
+
+pytestmark = pytest.mark.skipif(pytest_benchmark is None, reason='requer o pytest-benchmark')
+
+REGISTRO = {
+    'nome': 'Maria da Silva', 'email': 'maria.silva@gmail.com', 'telefone': '11 99999-8888',
+    'rua': 'Rua das Flores', 'numero': '123', 'complemento': 'Apto 4', 'bairro': 'Centro',
+    'cidade': 'São Paulo', 'uf': 'sp', 'cep': '01001000', 'produto': 'caneca',
+    'quantidade': '10', 'estampa': 'Astronauta', 'status': 'pendente',
+}
+DOMINIOS = ('gmail.com', 'hotmail.com', 'yahoo.com.br', 'empresa.com.br', 'uol.com.br')
+
+
+def gerar_registros(quantidade: int):
+    """Registros distintos, com 1% inválidos, espalhados por alguns domínios"""
+    registros = []
+    for i in range(quantidade):
+        registro = dict(REGISTRO, email=f"cliente{i}@{DOMINIOS[i % len(DOMINIOS)]}", telefone=f"11 9{i:08d}"[:14])
+        if i % 100 == 99:
+            registro['uf'] = 'XX'
+        registros.append(registro)
+    return registros
+
+
+def validar_registro_antigo(dados):
+    """Mesmas regras dos hooks ``@validates`` anteriores, sem o log"""
+    resultado = dict(dados)
+    resultado['email'] = validate_email(dados['email'], check_deliverability=False).normalized
+    telefone = re.sub(r'[^\d]', '', dados['telefone'])
+    if len(telefone) not in [10, 11]:
+        raise ValueError('telefone')
+    resultado['telefone'] = telefone
+    cep = re.sub(r'[^\d]', '', dados['cep'])
+    if len(cep) != 8:
+        raise ValueError('cep')
+    resultado['cep'] = f"{cep[:5]}-{cep[5:]}"
+    if int(dados['quantidade']) <= 0:
+        raise ValueError('quantidade')
+    ufs_validas = ['AC', 'AL', 'AP', 'AM', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MT',
+                   'MS', 'MG', 'PA', 'PB', 'PR', 'PE', 'PI', 'RJ', 'RN', 'RS', 'RO',
+                   'RR', 'SC', 'SP', 'SE', 'TO']
+    if dados['uf'].upper() not in ufs_validas:
+        raise ValueError('uf')
+    return resultado
+
+
+def validar_lote_antigo(registros):
+    validos = []
+    for registro in registros:
+        try:
+            validos.append(validar_registro_antigo(registro))
+        except ValueError:
+            pass
+    return validos
+
+
+@pytest.fixture(scope='module')
+def lote_10k():
+    return gerar_registros(10_000)
+
+
+@pytest.fixture(scope='module')
+def lote_100k():
+    return gerar_registros(100_000)
+
+
+def test_registro_unico(benchmark):
+    benchmark(validar_registro, REGISTRO)
+
+
+def test_registro_unico_antigo(benchmark):
+    benchmark(validar_registro_antigo, REGISTRO)
+
+
+def test_lote_10k(benchmark, lote_10k):
+    validos, erros = benchmark(validar_lote, lote_10k)
+    assert len(erros) == 100
+
+
+def test_lote_10k_antigo(benchmark, lote_10k):
+    benchmark.pedantic(validar_lote_antigo, args=(lote_10k,), rounds=3)
+
+
+def test_lote_100k(benchmark, lote_100k):
+    validos, erros = benchmark.pedantic(validar_lote, args=(lote_100k,), rounds=3)
+    assert len(validos) == 99_000
+
+
+def test_coluna_uf_100k(benchmark, lote_100k):
+    ufs = [registro['uf'] for registro in lote_100k]
+    _, erros = benchmark(validar_coluna, 'uf', ufs)
+    assert len(erros) == 1000
+
+
+def test_coluna_email_100k(benchmark, lote_100k):
+    emails = [registro['email'] for registro in lote_100k]
+    benchmark.pedantic(validar_coluna, args=('email', emails), rounds=3)
+
+
+def main() -> None:
+    print(f"{'medida':<32} {'tempo':>12} {'registros/s':>14}")
+    medidas = [
+        ('registro único', 1, lambda: validar_registro(REGISTRO), 20000),
+        ('registro único (antigo)', 1, lambda: validar_registro_antigo(REGISTRO), 2000),
+    ]
+    for quantidade in (10_000, 100_000):
+        registros = gerar_registros(quantidade)
+        medidas.append((f"lote {quantidade}", quantidade, lambda r=registros: validar_lote(r), 1))
+        medidas.append((f"lote {quantidade} (antigo)", quantidade, lambda r=registros: validar_lote_antigo(r), 1))
+        ufs = [registro['uf'] for registro in registros]
+        medidas.append((f"coluna uf {quantidade}", quantidade, lambda u=ufs: validar_coluna('uf', u), 1))
+
+    for descricao, quantidade, funcao, repeticoes in medidas:
+        tempo = min(timeit.repeat(funcao, number=repeticoes, repeat=3)) / repeticoes
+        unidade = f"{tempo * 1e6:9.2f} µs" if tempo < 1e-2 else f"{tempo * 1e3:9.1f} ms"
+        print(f"{descricao:<32} {unidade:>12} {quantidade / tempo:14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+Teste de carga HTTP da aplicação, sem rede externa.
+
+Sobe o gunicorn com um banco SQLite temporário e o ``ServidorSMTPFalso``
+(latência e taxa de falhas configuráveis) no lugar do Gmail, espera a
+aplicação responder e dispara ``GET /`` e ``POST /enviar_orcamento`` com a
+concorrência pedida. Para cada concorrência mostra vazão, erros e latência
+p50/p95/p99 por rota e, ao final, o que chegou ao SMTP falso.
+
+Cada requisição tem chave de idempotência e e-mail próprios; o limite por IP
+é desligado. Os logs, as métricas e o banco ficam na pasta temporária.
+
+Com ``--salvar`` o resultado vai para um JSON; com ``--comparar`` a execução
+é comparada com um resultado salvo antes (por exemplo, da revisão anterior).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.carga --concorrencia 1 4 16 --duracao 10
+    python -m benchmarks.carga --latencia-smtp 0.05 --taxa-falha 0.1 --salvar base.json
+    python -m benchmarks.carga --comparar base.json
+    python -m benchmarks.carga --url http://127.0.0.1:5000   # servidor já rodando
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.smtp_falso import ServidorSMTPFalso
+
+FORMULARIO = {
+    'nome': 'Maria da Silva', 'telefone': '(11) 99999-8888', 'rua': 'Rua das Flores', 'numero': '123',
+    'bairro': 'Centro', 'cidade': 'São Paulo', 'uf': 'SP', 'cep': '01001-000', 'produto': 'caneca',
+    'tipo_caneca': 'Porcelana', 'cor_caneca': 'Branca', 'quantidade': '10', 'estampa': 'Astronauta',
+    'obs': 'Teste de carga',
+}
+ROTAS = ('GET /', 'POST /enviar_orcamento')
+
+
+def _porta_livre() -> int:
+    import socket
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class Servidor:
+    """gunicorn em subprocesso, com banco, logs e métricas numa pasta temporária"""
+
+    def __init__(self, smtp: ServidorSMTPFalso, workers: int, threads: int):
+        self.pasta = tempfile.mkdtemp(prefix='carga-')
+        self.porta = _porta_livre()
+        self.url = f"http://127.0.0.1:{self.porta}"
+        self.ambiente = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(self.pasta, 'carga.db')}",
+            MAIL_SERVER=smtp.host, MAIL_PORT=str(smtp.porta), MAIL_USE_TLS='false',
+            MAIL_GMAIL='loja@example.com', MAIL_PASSWORD='senha',
+            EMAIL_VERIFICACAO_DNS='desligada',
+            EMAIL_OUTBOX_INTERVALO='1',
+            LIMITE_ORCAMENTOS_CAPACIDADE='1000000000', LIMITE_ORCAMENTOS_POR_HORA='1000000000',
+            LOG_PASTA=os.path.join(self.pasta, 'logs'),
+            METRICAS_PASTA=os.path.join(self.pasta, 'metricas'),
+            FLASK_APP='app', PORT=str(self.porta), WEB_CONCURRENCY=str(workers),
+        )
+        self.threads = threads
+        self._processo: Optional[subprocess.Popen] = None
+
+    def iniciar(self) -> None:
+        subprocess.run([sys.executable, '-m', 'flask', 'banco', 'criar'], env=self.ambiente,
+                       check=True, capture_output=True)
+        self._log = open(os.path.join(self.pasta, 'gunicorn.log'), 'w')
+        self._processo = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'app:app', '--threads', str(self.threads)],
+            env=self.ambiente, stdout=self._log, stderr=subprocess.STDOUT
+        )
+        limite = time.time() + 30
+        while time.time() < limite:
+            if self._processo.poll() is not None:
+                raise RuntimeError(f"gunicorn terminou ao subir; veja {self._log.name}")
+            try:
+                conexao = http.client.HTTPConnection('127.0.0.1', self.porta, timeout=1)
+                conexao.request('GET', '/')
+                if conexao.getresponse().status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError('gunicorn não respondeu em 30s')
+
+    def parar(self) -> None:
+        if self._processo is not None:
+            self._processo.terminate()
+            self._processo.wait(timeout=30)
+            self._log.close()
+        shutil.rmtree(self.pasta, ignore_errors=True)
+
+
+def _corpo_orcamento() -> Tuple[bytes, Dict[str, str]]:
+    identificador = uuid.uuid4().hex
+    corpo = urlencode(dict(FORMULARIO, email=f"carga.{identificador[:12]}@gmail.com")).encode()
+    cabecalhos = {'Content-Type': 'application/x-www-form-urlencoded', 'Idempotency-Key': identificador}
+    return corpo, cabecalhos
+
+
+def _cliente(url: str, fim: float, proporcao_envio: float, resultados: List, semente: int) -> None:
+    partes = urlsplit(url)
+    aleatorio = random.Random(semente)
+    conexao = http.client.HTTPConnection(partes.hostname, partes.port, timeout=30)
+    locais = []
+    while time.time() < fim:
+        envio = aleatorio.random() < proporcao_envio
+        if envio:
+            corpo, cabecalhos = _corpo_orcamento()
+        inicio = time.perf_counter()
+        try:
+            if envio:
+                conexao.request('POST', '/enviar_orcamento', body=corpo, headers=cabecalhos)
+            else:
+                conexao.request('GET', '/', headers={'Accept-Encoding': 'gzip, br'})
+            resposta = conexao.getresponse()
+            resposta.read()
+            status = resposta.status
+            if resposta.getheader('Connection', '').lower() == 'close':
+                conexao.close()
+        except (OSError, http.client.HTTPException):
+            conexao.close()
+            status = 0
+        locais.append((ROTAS[envio], time.perf_counter() - inicio, status))
+    conexao.close()
+    resultados.extend(locais)
+
+
+def rodar(url: str, concorrencia: int, duracao: float, proporcao_envio: float) -> Dict[str, Dict]:
+    resultados: List[Tuple[str, float, int]] = []
+    fim = time.time() + duracao
+    clientes = [threading.Thread(target=_cliente, args=(url, fim, proporcao_envio, resultados, i))
+                for i in range(concorrencia)]
+    for cliente in clientes:
+        cliente.start()
+    for cliente in clientes:
+        cliente.join()
+
+    resumo = {}
+    for rota in ROTAS:
+        latencias = sorted(latencia for r, latencia, _ in resultados if r == rota)
+        erros = sum(1 for r, _, status in resultados if r == rota and not 200 <= status < 300)
+        if not latencias:
+            continue
+        quantis = statistics.quantiles(latencias, n=100) if len(latencias) >= 2 else latencias * 99
+        resumo[rota] = {
+            'requisicoes': len(latencias),
+            'por_segundo': len(latencias) / duracao,
+            'erros': erros,
+            'p50': quantis[49] * 1000,
+            'p95': quantis[94] * 1000,
+            'p99': quantis[98] * 1000,
+        }
+    return resumo
+
+
+def _imprimir(resultados: Dict[str, Dict[str, Dict]], base: Optional[Dict] = None) -> None:
+    print(f"{'conc.':>5} {'rota':<24} {'req/s':>9} {'erros':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for concorrencia, por_rota in resultados.items():
+        for rota, r in por_rota.items():
+            print(f"{concorrencia:>5} {rota:<24} {r['por_segundo']:>9.1f} {r['erros']:>6} "
+                  f"{r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f}")
+            anterior = (base or {}).get(concorrencia, {}).get(rota)
+            if anterior:
+                def variacao(chave):
+                    return (r[chave] / anterior[chave] - 1) * 100 if anterior[chave] else 0.0
+                print(f"{'':>5} {'  vs. base':<24} {variacao('por_segundo'):>+8.0f}% {'':>6} "
+                      f"{variacao('p50'):>+7.0f}% {variacao('p95'):>+7.0f}% {variacao('p99'):>+7.0f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concorrencia', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--duracao', type=float, default=10.0, help='Segundos por concorrência')
+    parser.add_argument('--proporcao-envio', type=float, default=0.2,
+                        help='Fração das requisições que são POST /enviar_orcamento')
+    parser.add_argument('--workers', type=int, default=2, help='Workers do gunicorn')
+    parser.add_argument('--threads', type=int, default=1, help='Threads por worker do gunicorn')
+    parser.add_argument('--latencia-smtp', type=float, default=0.01, help='Segundos por comando SMTP')
+    parser.add_argument('--taxa-falha', type=float, default=0.0, help='Fração de mensagens recusadas pelo SMTP')
+    parser.add_argument('--url', help='Usa um servidor já rodando em vez de subir o gunicorn')
+    parser.add_argument('--salvar', help='Grava o resultado neste arquivo JSON')
+    parser.add_argument('--comparar', help='Resultado JSON salvo antes, para comparação')
+    args = parser.parse_args()
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as arquivo:
+            base = json.load(arquivo)['resultados']
+
+    with ServidorSMTPFalso(latencia=args.latencia_smtp, taxa_falha=args.taxa_falha) as smtp:
+        servidor = None
+        url = args.url
+        if url is None:
+            servidor = Servidor(smtp, args.workers, args.threads)
+            servidor.iniciar()
+            url = servidor.url
+        try:
+            resultados = {}
+            for concorrencia in args.concorrencia:
+                resultados[str(concorrencia)] = rodar(url, concorrencia, args.duracao, args.proporcao_envio)
+            # Dá tempo à fila de saída de entregar o que foi enfileirado
+            time.sleep(3)
+        finally:
+            if servidor is not None:
+                servidor.parar()
+        contadores = dict(smtp.contadores)
+
+    _imprimir(resultados, base)
+    print(f"SMTP falso: {contadores['mensagens']} mensagem(ns) aceita(s), {contadores['falhas']} recusada(s), "
+          f"{contadores['conexoes']} conexão(ões), {contadores['logins']} login(s)")
+
+    if args.salvar:
+        with open(args.salvar, 'w', encoding='utf-8') as arquivo:
+            json.dump({'parametros': vars(args), 'resultados': resultados, 'smtp': contadores}, arquivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
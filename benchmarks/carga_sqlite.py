@@ -0,0 +1,120 @@
+"""
+Teste de carga de inserções concorrentes no SQLite, um processo por worker.
+
+Cada operação repete o que ``/enviar_orcamento`` faz no banco: procura a
+chave de idempotência, insere o orçamento e a chave e faz commit, tudo em
+uma transação. O teste roda com o perfil ``padrao`` (driver sem ajustes) e
+com o ``concorrente`` de ``banco.py`` para 1, 2, 4 e 8 workers e mostra
+vazão, latência e quantos ``database is locked`` aconteceram.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.carga_sqlite --workers 1 2 4 8 --duracao 5
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import OperationalError
+
+from banco import configurar_engine
+from models import db, Orcamento, ChaveIdempotencia
+
+CONFIG_BASE = {
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,
+    'SQLITE_CACHE_MB': 16,
+    'SQLITE_MMAP_MB': 128,
+}
+
+LINHA = {
+    'nome': 'Maria da Silva', 'email': 'maria@gmail.com', 'telefone': '(11) 99999-8888',
+    'rua': 'Rua das Flores', 'numero': '123', 'bairro': 'Centro', 'cidade': 'São Paulo',
+    'uf': 'SP', 'cep': '01001-000', 'produto': 'caneca', 'quantidade': 10, 'estampa': 'Astronauta',
+    'status': 'pendente',
+}
+
+
+def _worker(url: str, perfil: str, inicio: float, duracao: float, fila) -> None:
+    engine = create_engine(url)
+    configurar_engine(engine, dict(CONFIG_BASE, SQLITE_PERFIL=perfil))
+    tabela_orcamentos = Orcamento.__table__
+    tabela_chaves = ChaveIdempotencia.__table__
+
+    latencias, bloqueios, outros = [], 0, 0
+    while time.time() < inicio:
+        time.sleep(0.001)
+    fim = inicio + duracao
+    while time.time() < fim:
+        chave = uuid.uuid4().hex
+        t0 = time.perf_counter()
+        try:
+            with engine.begin() as conexao:
+                conexao.execute(select(tabela_chaves.c.orcamento_id).where(tabela_chaves.c.chave == chave)).first()
+                orcamento_id = conexao.execute(
+                    tabela_orcamentos.insert(), dict(LINHA, data_criacao=datetime.now(timezone.utc))
+                ).inserted_primary_key[0]
+                conexao.execute(tabela_chaves.insert(), {
+                    'chave': chave, 'orcamento_id': orcamento_id, 'data_criacao': datetime.now(timezone.utc)
+                })
+            latencias.append(time.perf_counter() - t0)
+        except OperationalError as e:
+            if 'locked' in str(e.orig) or 'busy' in str(e.orig):
+                bloqueios += 1
+            else:
+                outros += 1
+    engine.dispose()
+    fila.put((latencias, bloqueios, outros))
+
+
+def rodar(perfil: str, workers: int, duracao: float) -> dict:
+    with tempfile.TemporaryDirectory() as pasta:
+        url = f"sqlite:///{os.path.join(pasta, 'carga.db')}"
+        engine = create_engine(url)
+        configurar_engine(engine, dict(CONFIG_BASE, SQLITE_PERFIL=perfil))
+        db.metadata.create_all(engine, tables=[Orcamento.__table__, ChaveIdempotencia.__table__])
+        engine.dispose()
+
+        fila = multiprocessing.Queue()
+        inicio = time.time() + 0.5
+        processos = [multiprocessing.Process(target=_worker, args=(url, perfil, inicio, duracao, fila))
+                     for _ in range(workers)]
+        for processo in processos:
+            processo.start()
+        resultados = [fila.get() for _ in processos]
+        for processo in processos:
+            processo.join()
+
+    latencias = sorted(latencia for resultado in resultados for latencia in resultado[0])
+    quantis = statistics.quantiles(latencias, n=100) if len(latencias) >= 2 else [0.0] * 99
+    return {
+        'ok': len(latencias),
+        'por_segundo': len(latencias) / duracao,
+        'bloqueios': sum(resultado[1] for resultado in resultados),
+        'outros': sum(resultado[2] for resultado in resultados),
+        'p50': quantis[49] * 1000,
+        'p99': quantis[98] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--duracao', type=float, default=5.0, help='Segundos por medida')
+    parser.add_argument('--perfil', choices=['padrao', 'concorrente'], nargs='+', default=['padrao', 'concorrente'])
+    args = parser.parse_args()
+
+    print(f"{'perfil':<12} {'workers':>7} {'inserções/s':>12} {'locked':>8} {'outros':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for perfil in args.perfil:
+        for workers in args.workers:
+            r = rodar(perfil, workers, args.duracao)
+            print(f"{perfil:<12} {workers:>7} {r['por_segundo']:>12.0f} {r['bloqueios']:>8} {r['outros']:>7} "
+                  f"{r['p50']:>8.2f} {r['p99']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark do índice local de CEP.
+
+Gera faixas sintéticas (várias por localidade, como na base de faixas dos
+Correios), constrói o índice e mede:
+
+- construção: tempo e tamanho do arquivo;
+- abertura do arquivo (``mmap``) e a primeira consulta;
+- consultas por segundo do ``IndiceCEP`` com CEPs aleatórios (dentro e fora
+  das faixas), comparadas com ``bisect`` numa lista Python em memória e com
+  a mesma consulta numa tabela SQLite indexada;
+- ``conferir_endereco``, o custo somado à validação do formulário.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.cep
+    python -m benchmarks.cep --faixas 1000000 --consultas 500000
+"""
+import argparse
+import bisect
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from typing import Callable, List, Tuple
+
+from cep import IndiceCEP, conferir_endereco, construir_indice
+
+UFS = ('AC', 'AL', 'AP', 'AM', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MT', 'MS', 'MG', 'PA',
+       'PB', 'PR', 'PE', 'PI', 'RJ', 'RN', 'RS', 'RO', 'RR', 'SC', 'SP', 'SE', 'TO')
+
+
+def gerar_faixas(quantidade: int, localidades: int, semente: int = 1) -> List[Tuple[int, int, str, str]]:
+    """Faixas disjuntas cobrindo ~70% do espaço de CEPs, com lacunas entre elas"""
+    aleatorio = random.Random(semente)
+    passo = 100_000_000 // quantidade
+    nomes = [(f"Município {i} de Açaí", UFS[i % len(UFS)]) for i in range(localidades)]
+    faixas = []
+    for i in range(quantidade):
+        inicio = i * passo
+        cidade, uf = nomes[aleatorio.randrange(localidades)]
+        faixas.append((inicio, inicio + max(0, int(passo * 0.7) - 1), cidade, uf))
+    return faixas
+
+
+def medir(nome: str, funcao: Callable, argumentos: List) -> float:
+    inicio = time.perf_counter()
+    for argumento in argumentos:
+        funcao(argumento)
+    decorrido = time.perf_counter() - inicio
+    print(f"  {nome:<34} {len(argumentos) / decorrido:>12,.0f} consultas/s  "
+          f"{decorrido / len(argumentos) * 1e9:>8,.0f} ns/consulta")
+    return decorrido
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--faixas', type=int, default=50_000)
+    parser.add_argument('--localidades', type=int, default=5_570, help='Padrão: municípios do Brasil')
+    parser.add_argument('--consultas', type=int, default=200_000)
+    args = parser.parse_args()
+
+    faixas = gerar_faixas(args.faixas, args.localidades)
+    aleatorio = random.Random(2)
+    ceps = [aleatorio.randrange(100_000_000) for _ in range(args.consultas)]
+    textos = [f"{cep:08d}"[:5] + '-' + f"{cep:08d}"[5:] for cep in ceps]
+
+    with tempfile.TemporaryDirectory(prefix='cep-') as pasta:
+        caminho = os.path.join(pasta, 'cep.idx')
+        inicio = time.perf_counter()
+        resultado = construir_indice(faixas, caminho)
+        print(f"Construção: {resultado.faixas:,} faixas, {resultado.localidades:,} localidades, "
+              f"{resultado.bytes / 1024:,.0f} KiB em {time.perf_counter() - inicio:.2f}s")
+
+        indice = IndiceCEP(caminho)
+        inicio = time.perf_counter()
+        indice.consultar('01001-000')
+        print(f"Abertura + primeira consulta: {(time.perf_counter() - inicio) * 1000:.2f} ms")
+        encontrados = sum(indice.consultar(cep) is not None for cep in ceps)
+        print(f"{args.consultas:,} CEPs aleatórios, {encontrados / args.consultas:.0%} dentro de alguma faixa")
+
+        print("Consultas:")
+        medir('IndiceCEP (mmap, inteiro)', indice.consultar, ceps)
+        medir('IndiceCEP (mmap, texto XXXXX-XXX)', indice.consultar, textos)
+
+        inicios = [faixa[0] for faixa in faixas]
+        fins = [faixa[1] for faixa in faixas]
+
+        def lista_python(cep):
+            posicao = bisect.bisect_right(inicios, cep) - 1
+            return faixas[posicao][2] if posicao >= 0 and cep <= fins[posicao] else None
+        medir('bisect em listas Python', lista_python, ceps)
+
+        banco = sqlite3.connect(os.path.join(pasta, 'cep.db'))
+        banco.execute('CREATE TABLE faixas (inicio INTEGER PRIMARY KEY, fim INTEGER, cidade TEXT, uf TEXT)')
+        banco.executemany('INSERT INTO faixas VALUES (?, ?, ?, ?)', faixas)
+        banco.commit()
+
+        def sqlite_indexado(cep):
+            linha = banco.execute('SELECT fim, cidade, uf FROM faixas WHERE inicio <= ? ORDER BY inicio DESC LIMIT 1',
+                                  (cep,)).fetchone()
+            return linha if linha and cep <= linha[0] else None
+        medir('SQLite (chave primária)', sqlite_indexado, ceps)
+        banco.close()
+
+        print("Conferência do formulário:")
+        amostra = [(texto, indice.consultar(texto)) for texto in textos[:50_000]]
+        amostra = [(texto, localidade) for texto, localidade in amostra if localidade is not None]
+        medir('conferir_endereco (cidade correta)',
+              lambda item: conferir_endereco(item[0], item[1].cidade.upper(), item[1].uf, indice), amostra)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Mede o custo de subir um worker: importar ``app`` (criando a aplicação) e
+atender a primeira requisição a ``/``. Cada medida roda em um processo novo.
+
+A medida roda em uma cópia da árvore numa pasta temporária, para não tocar
+no banco e nos logs do projeto. Com ``--revisao`` a cópia vem de uma revisão
+anterior do git (``git archive``), para comparar antes/depois.
+Quando a aplicação tem ``aquecer()``, também é medida a primeira requisição
+de um worker que nasce de um pai já aquecido (``gunicorn --preload``).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.inicializacao --repeticoes 7
+    python -m benchmarks.inicializacao --revisao HEAD~1
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+CODIGO_MEDIDA = r'''
+import json, os, sys, time
+t0 = time.perf_counter()
+import app as modulo
+aplicacao = modulo.app
+t1 = time.perf_counter()
+aplicacao.test_client().get('/')
+t2 = time.perf_counter()
+resultado = {'importacao': t1 - t0, 'primeira_requisicao': t2 - t1}
+if hasattr(modulo, 'aquecer'):
+    modulo.aquecer(aplicacao)
+    pid = os.fork()
+    if pid == 0:
+        t3 = time.perf_counter()
+        aplicacao.test_client().get('/')
+        os.write(1, json.dumps({'primeira_requisicao_preload': time.perf_counter() - t3}).encode() + b'\n')
+        os._exit(0)
+    os.waitpid(pid, 0)
+print(json.dumps(resultado))
+'''
+
+
+def _copiar_arvore(revisao, destino: str) -> None:
+    if revisao is None:
+        shutil.copytree('.', destino, dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns('.git', 'logs', 'instance', '__pycache__'))
+        return
+    arquivo = subprocess.run(['git', 'archive', revisao], check=True, capture_output=True).stdout
+    subprocess.run(['tar', '-x', '-C', destino], input=arquivo, check=True)
+    # Estáticos gerados (variantes, manifestos) não estão no git
+    shutil.rmtree(os.path.join(destino, 'static'), ignore_errors=True)
+    shutil.copytree('static', os.path.join(destino, 'static'))
+
+
+def medir(pasta: str, repeticoes: int) -> dict:
+    ambiente = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(pasta, 'medida.db')}",
+                    EMAIL_OUTBOX_WORKER='false')
+    medidas: dict = {}
+    # A primeira execução compila os .pyc e cria o banco; não entra na conta
+    for i in range(repeticoes + 1):
+        saida = subprocess.run([sys.executable, '-c', CODIGO_MEDIDA], cwd=pasta, env=ambiente,
+                               check=True, capture_output=True, text=True).stdout
+        if i == 0:
+            continue
+        for linha in saida.splitlines():
+            if linha.startswith('{'):
+                for chave, valor in json.loads(linha).items():
+                    medidas.setdefault(chave, []).append(valor)
+    return {chave: statistics.median(valores) for chave, valores in medidas.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticoes', type=int, default=7)
+    parser.add_argument('--revisao', help='Revisão do git a medir no lugar da árvore atual')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        _copiar_arvore(args.revisao, pasta)
+        medidas = medir(pasta, args.repeticoes)
+
+    print(f"{args.revisao or 'árvore atual'} (mediana de {args.repeticoes} processos)")
+    for chave, valor in medidas.items():
+        print(f"  {chave:<30} {valor * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
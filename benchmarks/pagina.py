@@ -0,0 +1,146 @@
+"""
+Peso da página inicial: requisições e bytes transferidos no primeiro acesso.
+
+Renderiza ``/`` e lê no HTML as folhas de estilo, scripts e imagens que o
+navegador pediria, separando:
+  - o que bloqueia a renderização (CSS e scripts síncronos no ``<head>``);
+  - a carga inicial (tudo, menos as imagens com ``loading="lazy"``);
+  - as imagens carregadas sob demanda, ao rolar a página.
+
+Os arquivos locais são pedidos com ``Accept-Encoding: br, gzip`` e contados
+pelo tamanho transferido; os externos (CDN) só entram na contagem de
+requisições. Conteúdo dentro de ``<noscript>`` é ignorado. De cada
+``<picture>`` conta o ``src`` do ``<img>``.
+
+Como em ``benchmarks.inicializacao``, a medida roda numa cópia da árvore, após
+os comandos de build que a revisão tiver (``imagens gerar``, ``ativos
+construir``, ``estaticos comprimir``). Com ``--revisao`` mede também uma
+revisão anterior do git, para comparar antes/depois.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.pagina
+    python -m benchmarks.pagina --revisao HEAD~1 --detalhes
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.inicializacao import _copiar_arvore
+
+COMANDOS_BUILD = (('imagens', 'gerar'), ('ativos', 'construir'), ('estaticos', 'comprimir'))
+
+CODIGO_MEDIDA = r'''
+import json
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+import app as modulo
+
+cliente = modulo.app.test_client()
+CABECALHOS = {'Accept-Encoding': 'br, gzip'}
+
+
+class Recursos(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.recursos = []
+        self.no_head = False
+        self.no_noscript = False
+
+    def handle_starttag(self, tag, atributos):
+        atributos = dict(atributos)
+        if tag in ('head', 'noscript'):
+            setattr(self, 'no_' + tag, True)
+            return
+        if self.no_noscript:
+            return
+        rel = (atributos.get('rel') or '').lower()
+        if tag == 'link' and rel in ('stylesheet', 'preload') and atributos.get('href'):
+            self.recursos.append(('css', atributos['href'], self.no_head and rel == 'stylesheet', False))
+        elif tag == 'script' and atributos.get('src'):
+            sincrono = 'defer' not in atributos and 'async' not in atributos
+            self.recursos.append(('js', atributos['src'], self.no_head and sincrono, False))
+        elif tag == 'img' and atributos.get('src'):
+            self.recursos.append(('img', atributos['src'], False, atributos.get('loading') == 'lazy'))
+
+    def handle_endtag(self, tag):
+        if tag in ('head', 'noscript'):
+            setattr(self, 'no_' + tag, False)
+
+
+pagina = cliente.get('/', headers=CABECALHOS)
+html = cliente.get('/').get_data(as_text=True)
+leitor = Recursos()
+leitor.feed(html)
+recursos = []
+for tipo, url, bloqueia, preguicoso in leitor.recursos:
+    partes = urlsplit(url)
+    tamanho = None
+    if not partes.netloc:
+        resposta = cliente.get(partes.path, query_string=partes.query, headers=CABECALHOS)
+        tamanho = len(resposta.data) if resposta.status_code == 200 else None
+    recursos.append({'tipo': tipo, 'url': url, 'bloqueia': bloqueia, 'preguicoso': preguicoso,
+                     'externo': bool(partes.netloc), 'bytes': tamanho})
+print(json.dumps({'html': len(pagina.data), 'html_sem_compressao': len(html.encode('utf-8')),
+                  'recursos': recursos}))
+'''
+
+
+def medir(pasta: str) -> dict:
+    ambiente = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(pasta, 'medida.db')}",
+                    EMAIL_OUTBOX_WORKER='false', FLASK_APP='app', CACHE_PAGINA='true')
+    for comando in COMANDOS_BUILD:
+        # Revisões antigas podem não ter todos os comandos
+        subprocess.run([sys.executable, '-m', 'flask', *comando], cwd=pasta, env=ambiente,
+                       capture_output=True, check=False)
+    saida = subprocess.run([sys.executable, '-c', CODIGO_MEDIDA], cwd=pasta, env=ambiente,
+                           capture_output=True, text=True, check=True).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def resumo(medida: dict) -> dict:
+    iniciais = [r for r in medida['recursos'] if not r['preguicoso']]
+    preguicosos = [r for r in medida['recursos'] if r['preguicoso']]
+    return {
+        'HTML (transferido)': f"{medida['html'] / 1024:.1f} KiB",
+        'HTML (sem compressão)': f"{medida['html_sem_compressao'] / 1024:.1f} KiB",
+        'Requisições na carga inicial': 1 + len(iniciais),
+        '  externas (CDN)': sum(r['externo'] for r in iniciais),
+        '  bloqueando a renderização': sum(r['bloqueia'] for r in iniciais),
+        'Bytes locais na carga inicial': f"{(medida['html'] + sum(r['bytes'] or 0 for r in iniciais)) / 1024:.1f} KiB",
+        'Imagens sob demanda': len(preguicosos),
+        '  bytes se todas carregarem': f"{sum(r['bytes'] or 0 for r in preguicosos) / 1024:.1f} KiB",
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--revisao', help='Revisão do git a comparar com a árvore atual')
+    parser.add_argument('--detalhes', action='store_true', help='Lista cada recurso')
+    args = parser.parse_args()
+
+    medidas = {}
+    for nome, revisao in ([(args.revisao, args.revisao)] if args.revisao else []) + [('atual', None)]:
+        with tempfile.TemporaryDirectory(prefix='pagina-') as pasta:
+            _copiar_arvore(revisao, pasta)
+            medidas[nome] = medir(pasta)
+
+    resumos = {nome: resumo(medida) for nome, medida in medidas.items()}
+    print(f"{'':<34}" + ''.join(f"{nome:>14}" for nome in resumos))
+    for chave in next(iter(resumos.values())):
+        print(f"{chave:<34}" + ''.join(f"{str(valores[chave]):>14}" for valores in resumos.values()))
+
+    if args.detalhes:
+        for nome, medida in medidas.items():
+            print(f"\n{nome}:")
+            for recurso in medida['recursos']:
+                tamanho = 'externo' if recurso['externo'] else f"{(recurso['bytes'] or 0) / 1024:.1f} KiB"
+                marcas = ' bloqueia' if recurso['bloqueia'] else ' sob demanda' if recurso['preguicoso'] else ''
+                print(f"  {recurso['tipo']:<4} {tamanho:>10}{marcas:<12} {recurso['url']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Servidor SMTP local para testes e benchmarks, sem rede externa.
+
+Implementa só o necessário para o ``smtplib``: EHLO/HELO, AUTH PLAIN, MAIL,
+RCPT, DATA, RSET, NOOP e QUIT. Pode simular latência por comando e uma taxa
+de falhas na entrega. Não suporta STARTTLS; use ``usar_tls=False`` no cliente.
+
+Uso:
+    with ServidorSMTPFalso(latencia=0.05) as servidor:
+        pool = PoolSMTP('127.0.0.1', servidor.porta, 'u', 's', usar_tls=False)
+"""
+import random
+import socketserver
+import sys
+import threading
+import time
+from typing import List
+
+
+class _Manipulador(socketserver.StreamRequestHandler):
+    def _responder(self, linha: str) -> None:
+        self.wfile.write((linha + '\r\n').encode('ascii'))
+
+    def handle(self) -> None:
+        servidor: 'ServidorSMTPFalso' = self.server.falso
+        servidor._contar('conexoes')
+        self._responder('220 smtp-falso pronto')
+        while True:
+            bruto = self.rfile.readline()
+            if not bruto:
+                return
+            comando = bruto.decode('utf-8', 'replace').strip()
+            verbo = comando.split(' ', 1)[0].upper()
+            if servidor.latencia:
+                time.sleep(servidor.latencia)
+
+            if verbo in ('EHLO', 'HELO'):
+                self.wfile.write(b'250-smtp-falso\r\n250-AUTH PLAIN\r\n250 8BITMIME\r\n')
+            elif verbo == 'AUTH':
+                servidor._contar('logins')
+                self._responder('235 autenticado')
+            elif verbo == 'NOOP':
+                servidor._contar('noops')
+                self._responder('250 ok')
+            elif verbo in ('MAIL', 'RCPT', 'RSET'):
+                self._responder('250 ok')
+            elif verbo == 'DATA':
+                self._responder('354 termine com .')
+                linhas = []
+                while True:
+                    linha = self.rfile.readline()
+                    if not linha or linha in (b'.\r\n', b'.\n'):
+                        break
+                    linhas.append(linha)
+                if random.random() < servidor.taxa_falha:
+                    servidor._contar('falhas')
+                    self._responder('451 falha simulada')
+                else:
+                    servidor._registrar(b''.join(linhas))
+                    self._responder('250 mensagem aceita')
+            elif verbo == 'QUIT':
+                self._responder('221 tchau')
+                return
+            else:
+                self._responder('502 comando nao implementado')
+
+
+class _ServidorTCP(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def handle_error(self, request, client_address) -> None:
+        # Cliente que encerra sem QUIT (worker do gunicorn parado) não é erro do servidor
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class ServidorSMTPFalso:
+    """Servidor SMTP em thread, com contadores de conexões, logins e mensagens"""
+
+    def __init__(self, host: str = '127.0.0.1', porta: int = 0, latencia: float = 0.0,
+                 taxa_falha: float = 0.0, guardar_mensagens: bool = False):
+        self.latencia = latencia
+        self.taxa_falha = taxa_falha
+        self.guardar_mensagens = guardar_mensagens
+        self.mensagens: List[bytes] = []
+        self.contadores = {'conexoes': 0, 'logins': 0, 'noops': 0, 'mensagens': 0, 'falhas': 0}
+        self._lock = threading.Lock()
+        self._tcp = _ServidorTCP((host, porta), _Manipulador)
+        self._tcp.falso = self
+        self.host, self.porta = self._tcp.server_address[:2]
+        self._thread = None
+
+    def _contar(self, nome: str) -> None:
+        with self._lock:
+            self.contadores[nome] += 1
+
+    def _registrar(self, mensagem: bytes) -> None:
+        with self._lock:
+            self.contadores['mensagens'] += 1
+            if self.guardar_mensagens:
+                self.mensagens.append(mensagem)
+
+    def iniciar(self) -> 'ServidorSMTPFalso':
+        self._thread = threading.Thread(target=self._tcp.serve_forever, name='smtp-falso', daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self) -> None:
+        self._tcp.shutdown()
+        self._tcp.server_close()
+
+    def __enter__(self) -> 'ServidorSMTPFalso':
+        return self.iniciar()
+
+    def __exit__(self, *args) -> None:
+        self.parar()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Servidor SMTP falso para testes locais')
+    parser.add_argument('--porta', type=int, default=2525)
+    parser.add_argument('--latencia', type=float, default=0.0, help='segundos por comando')
+    parser.add_argument('--taxa-falha', type=float, default=0.0, help='fração de mensagens recusadas')
+    args = parser.parse_args()
+
+    servidor = ServidorSMTPFalso(porta=args.porta, latencia=args.latencia, taxa_falha=args.taxa_falha)
+    print(f"SMTP falso em {servidor.host}:{servidor.porta} (Ctrl+C para sair)")
+    servidor._tcp.serve_forever()
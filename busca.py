@@ -0,0 +1,129 @@
+"""
+Busca textual de orçamentos com FTS5 (SQLite).
+
+``orcamentos_busca`` é uma tabela virtual FTS5 de conteúdo externo: guarda só
+o índice invertido de nome, e-mail, cidade, estampa e observações, e lê o
+texto da própria ``orcamentos``. Gatilhos no banco a mantêm em dia em todo
+INSERT, DELETE e UPDATE dessas colunas, venham do ORM, da importação em lote
+pelo Core ou do SQL direto.
+
+- ``unicode61 remove_diacritics 2``: "conceicao" encontra "Conceição";
+- ``prefix='2 3'``: índices de prefixo de 2 e 3 letras, para que "ma*" não
+  precise varrer o vocabulário;
+- cada palavra digitada vira um prefixo entre aspas ("mar" "silv") e todas
+  precisam aparecer.
+
+O bm25 precisa pontuar todos os resultados antes do LIMIT: com 1 milhão de
+orçamentos, um termo genérico como "silva" casa com centenas de milhares de
+linhas e a ordenação passa de 300 ms. Por isso a busca primeiro conta até
+``LIMITE_RELEVANCIA`` resultados (poucos ms); abaixo disso ordena por bm25,
+com peso maior no nome e no e-mail, e acima devolve os mais recentes, que o
+FTS5 entrega direto do índice, na ordem do rowid.
+
+``flask orcamentos reindexar-busca`` reconstrói o índice a partir da tabela.
+Em outros bancos a busca não está disponível.
+"""
+import re
+from typing import Tuple
+
+from sqlalchemy import DDL, Select, column, event, func, literal_column, select, table, text
+
+from models import db, Orcamento
+
+TABELA = 'orcamentos_busca'
+COLUNAS = ('nome', 'email', 'cidade', 'estampa', 'observacoes')
+# Pesos do bm25, na ordem de COLUNAS
+PESOS = (10.0, 5.0, 2.0, 1.0, 1.0)
+MINIMO_LETRAS = 2
+LIMITE_RELEVANCIA = 2000
+
+_lista = ', '.join(COLUNAS)
+_novos = ', '.join(f'new.{coluna}' for coluna in COLUNAS)
+_antigos = ', '.join(f'old.{coluna}' for coluna in COLUNAS)
+
+COMANDOS_CRIACAO = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA} USING fts5("
+    f"{_lista}, content='orcamentos', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {TABELA}_ai AFTER INSERT ON orcamentos BEGIN "
+    f"INSERT INTO {TABELA}(rowid, {_lista}) VALUES (new.id, {_novos}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABELA}_ad AFTER DELETE ON orcamentos BEGIN "
+    f"INSERT INTO {TABELA}({TABELA}, rowid, {_lista}) VALUES ('delete', old.id, {_antigos}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABELA}_au AFTER UPDATE OF {_lista} ON orcamentos BEGIN "
+    f"INSERT INTO {TABELA}({TABELA}, rowid, {_lista}) VALUES ('delete', old.id, {_antigos}); "
+    f"INSERT INTO {TABELA}(rowid, {_lista}) VALUES (new.id, {_novos}); END",
+)
+COMANDOS_REMOCAO = (
+    f"DROP TRIGGER IF EXISTS {TABELA}_au",
+    f"DROP TRIGGER IF EXISTS {TABELA}_ad",
+    f"DROP TRIGGER IF EXISTS {TABELA}_ai",
+    f"DROP TABLE IF EXISTS {TABELA}",
+)
+
+# db.create_all / drop_all (flask banco criar) também criam e removem o índice
+for _comando in COMANDOS_CRIACAO:
+    event.listen(Orcamento.__table__, 'after_create', DDL(_comando).execute_if(dialect='sqlite'))
+for _comando in COMANDOS_REMOCAO:
+    event.listen(Orcamento.__table__, 'before_drop', DDL(_comando).execute_if(dialect='sqlite'))
+
+
+class BuscaIndisponivel(RuntimeError):
+    """O banco configurado não tem FTS5"""
+
+
+_busca = table(TABELA, column('rowid'), column(TABELA))
+_PALAVRA = re.compile(r'\w+')
+
+
+def disponivel() -> bool:
+    return db.session.get_bind().dialect.name == 'sqlite'
+
+
+def expressao_fts(termo: str) -> str:
+    """
+    Converte o texto digitado numa consulta FTS5 segura.
+
+    Só as palavras são usadas (operadores e aspas do FTS5 são descartados);
+    palavras com menos de ``MINIMO_LETRAS`` letras são ignoradas. Retorna ''
+    se não sobrar nenhuma.
+    """
+    palavras = [palavra for palavra in _PALAVRA.findall(termo) if len(palavra) >= MINIMO_LETRAS]
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+def buscar(consulta: Select, termo: str) -> Tuple[Select, str]:
+    """
+    Restringe ``consulta`` (um ``select(Orcamento)``) aos orçamentos que
+    contêm ``termo``.
+
+    Retorna a consulta e a ordem aplicada: 'relevancia' ou 'recentes'.
+    """
+    if not disponivel():
+        raise BuscaIndisponivel('A busca textual exige SQLite com FTS5')
+    correspondencia = _busca.c[TABELA].op('MATCH')(expressao_fts(termo))
+    amostra = select(_busca.c.rowid).where(correspondencia).limit(LIMITE_RELEVANCIA + 1).subquery()
+    encontrados = db.session.scalar(select(func.count()).select_from(amostra))
+
+    consulta = consulta.join(_busca, _busca.c.rowid == Orcamento.id).where(correspondencia)
+    if encontrados > LIMITE_RELEVANCIA:
+        return consulta.order_by(_busca.c.rowid.desc()), 'recentes'
+    return consulta.order_by(func.bm25(literal_column(TABELA), *PESOS), Orcamento.id.desc()), 'relevancia'
+
+
+def reindexar() -> int:
+    """Recria o índice (e a tabela e os gatilhos, se faltarem). Retorna os orçamentos indexados."""
+    if not disponivel():
+        raise BuscaIndisponivel('A busca textual exige SQLite com FTS5')
+    for comando in COMANDOS_CRIACAO:
+        db.session.execute(text(comando))
+    db.session.execute(text(f"INSERT INTO {TABELA}({TABELA}) VALUES ('rebuild')"))
+    otimizar()
+    total = db.session.scalar(text(f"SELECT count(*) FROM {TABELA}"))
+    db.session.commit()
+    return total
+
+
+def otimizar() -> None:
+    """Funde os segmentos do índice e descarta as entradas removidas (depois de muitos DELETEs)"""
+    db.session.execute(text(f"INSERT INTO {TABELA}({TABELA}) VALUES ('optimize')"))
+    db.session.commit()
@@ -0,0 +1,135 @@
+"""
+Cache em memória de páginas sem dados por requisição.
+
+A página é renderizada uma vez por worker e guardada já comprimida (gzip e,
+se disponível, brotli). Ela é renderizada de novo quando o arquivo do template
+ou algum arquivo de dependência (como os manifestos de imagens e estáticos,
+que mudam as URLs com hash) tem o mtime alterado. As respostas levam ETag e
+Last-Modified e respeitam GET condicional.
+"""
+import gzip
+import hashlib
+import os
+import threading
+import time
+from email.utils import formatdate
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import Response, render_template, request
+
+from estaticos import brotli, codificacoes_aceitas
+
+
+class _PaginaCacheada:
+    __slots__ = ('chave', 'corpos', 'etag', 'ultima_modificacao', 'verificado_em')
+
+    def __init__(self, chave: Tuple, corpos: Dict[Optional[str], bytes], etag: str, ultima_modificacao: float):
+        self.chave = chave
+        self.corpos = corpos
+        self.etag = etag
+        self.ultima_modificacao = ultima_modificacao
+        self.verificado_em = time.monotonic()
+
+
+class CachePagina:
+    """Renderiza e comprime páginas estáticas uma vez por worker"""
+
+    def __init__(self, app=None, intervalo_verificacao: float = 1.0):
+        """
+        Args:
+            app: Aplicação Flask
+            intervalo_verificacao: Segundos entre as checagens de mtime dos arquivos
+        """
+        self.app = app
+        self.intervalo_verificacao = intervalo_verificacao
+        self._paginas: Dict[str, _PaginaCacheada] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        self.app = app
+        self.limpar()
+
+    def ativo(self) -> bool:
+        """Desligado em modo debug ou com CACHE_PAGINA=false"""
+        return self.app.config.get('CACHE_PAGINA', True) and not self.app.debug
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._paginas.clear()
+
+    def _arquivos(self, template: str, dependencias: Iterable[str]) -> List[str]:
+        _, arquivo_template, _ = self.app.jinja_loader.get_source(self.app.jinja_env, template)
+        return [arquivo_template, *dependencias]
+
+    @staticmethod
+    def _chave(arquivos: List[str]) -> Tuple:
+        chave = []
+        for arquivo in arquivos:
+            try:
+                chave.append(os.stat(arquivo).st_mtime_ns)
+            except OSError:
+                chave.append(None)
+        return tuple(chave)
+
+    def _renderizar(self, template: str, chave: Tuple) -> _PaginaCacheada:
+        html = render_template(template).encode('utf-8')
+        corpos: Dict[Optional[str], bytes] = {None: html, 'gzip': gzip.compress(html, compresslevel=9)}
+        if brotli is not None:
+            corpos['br'] = brotli.compress(html, quality=11)
+        etag = hashlib.sha256(html).hexdigest()[:16]
+        ultima_modificacao = max((mtime for mtime in chave if mtime is not None), default=0) / 1e9
+        return _PaginaCacheada(chave, corpos, etag, ultima_modificacao)
+
+    def _obter(self, template: str, dependencias: Iterable[str]) -> _PaginaCacheada:
+        pagina = self._paginas.get(template)
+        agora = time.monotonic()
+        if pagina is not None and agora - pagina.verificado_em < self.intervalo_verificacao:
+            return pagina
+
+        chave = self._chave(self._arquivos(template, dependencias))
+        if pagina is not None and pagina.chave == chave:
+            pagina.verificado_em = agora
+            return pagina
+
+        with self._lock:
+            pagina = self._paginas.get(template)
+            if pagina is None or pagina.chave != chave:
+                pagina = self._renderizar(template, chave)
+                self._paginas[template] = pagina
+                self.app.logger.info(f"Página {template} renderizada para o cache")
+        return pagina
+
+    def responder(self, template: str, dependencias: Iterable[str] = ()) -> Response:
+        """
+        Responde com a página cacheada, negociando a compressão e tratando GET condicional.
+
+        Args:
+            template: Nome do template, que não pode depender de dados da requisição
+            dependencias: Arquivos cujo mtime também invalida o cache
+        """
+        if not self.ativo():
+            return Response(render_template(template), mimetype='text/html')
+
+        pagina = self._obter(template, dependencias)
+        aceitas = codificacoes_aceitas(request.headers.get('Accept-Encoding', ''))
+        codificacao = next((c for c in ('br', 'gzip') if c in pagina.corpos
+                            and aceitas.get(c, aceitas.get('*', 0.0)) > 0), None)
+        etag = pagina.etag if codificacao is None else f"{pagina.etag}-{codificacao}"
+
+        if request.if_none_match:
+            nao_modificado = etag in request.if_none_match
+        else:
+            nao_modificado = request.if_modified_since is not None \
+                and request.if_modified_since.timestamp() >= int(pagina.ultima_modificacao)
+
+        if nao_modificado:
+            resposta = Response(status=304)
+        else:
+            resposta = Response(pagina.corpos[codificacao], mimetype='text/html')
+            if codificacao is not None:
+                resposta.headers['Content-Encoding'] = codificacao
+        resposta.set_etag(etag)
+        resposta.headers['Last-Modified'] = formatdate(pagina.ultima_modificacao, usegmt=True)
+        resposta.headers['Cache-Control'] = 'public, no-cache'
+        resposta.vary.add('Accept-Encoding')
+        return resposta
@@ -0,0 +1,279 @@
+"""
+Índice local de faixas de CEP, sem API externa.
+
+O índice é construído a partir de um CSV (faixas de CEP por localidade, ou um
+CEP por linha) e gravado num arquivo binário compacto:
+
+    cabeçalho  '<8sII': assinatura, número de faixas, bytes da tabela de localidades
+    inicios    uint32[n]  primeiro CEP de cada faixa, em ordem crescente
+    fins       uint32[n]  último CEP de cada faixa
+    ids        uint32[n]  posição da localidade na tabela
+    tabela     JSON [[cidade, uf], ...]
+
+Os vetores são little-endian. O arquivo é aberto com ``mmap`` e os vetores são
+lidos por ``memoryview`` sem cópia: a consulta é uma busca binária (``bisect``)
+nos inícios, sem carregar nada para objetos Python além da tabela de
+localidades. Com o ``--preload`` do gunicorn as páginas do arquivo são
+compartilhadas pelos workers.
+
+``flask cep carregar ARQUIVO`` grava o índice de forma atômica; os workers
+percebem o arquivo novo em até ``INTERVALO_VERIFICACAO`` segundos.
+"""
+import bisect
+import csv
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from validacao import ErroValidacao
+
+ASSINATURA = b'CEPIDX01'
+CABECALHO = struct.Struct('<8sII')
+INTERVALO_VERIFICACAO = 5.0
+
+# Nomes de coluna aceitos no CSV
+COLUNAS_CIDADE = ('cidade', 'localidade', 'municipio', 'município')
+COLUNAS_INICIO = ('cep_inicio', 'cep_inicial', 'inicio')
+COLUNAS_FIM = ('cep_fim', 'cep_final', 'fim')
+
+_NAO_DIGITOS = re.compile(r'\D')
+_SEPARADORES = re.compile(r'[^0-9a-z]+')
+
+
+class Localidade(NamedTuple):
+    cidade: str
+    uf: str
+
+
+def numero_cep(cep) -> Optional[int]:
+    """CEP como inteiro (01001-000 -> 1001000), ou None se não tiver 8 dígitos"""
+    digitos = _NAO_DIGITOS.sub('', str(cep))
+    return int(digitos) if len(digitos) == 8 else None
+
+
+def normalizar_cidade(nome: str) -> str:
+    """Forma comparável do nome: sem acentos, minúsculas e só letras e dígitos"""
+    sem_acentos = unicodedata.normalize('NFKD', nome).encode('ascii', 'ignore').decode('ascii')
+    return _SEPARADORES.sub(' ', sem_acentos.lower().replace("'", '')).strip()
+
+
+# ---------------------------------------------------------------------------
+# Construção
+# ---------------------------------------------------------------------------
+
+def _coluna(campos: List[str], opcoes: Tuple[str, ...]) -> Optional[str]:
+    for opcao in opcoes:
+        if opcao in campos:
+            return opcao
+    return None
+
+
+def ler_faixas(caminho: str) -> Iterator[Tuple[int, int, str, str]]:
+    """
+    Gera (início, fim, cidade, uf) a partir de um CSV com cabeçalho.
+
+    Colunas: ``uf``, ``cidade`` (ou ``localidade``/``municipio``) e
+    ``cep_inicio``/``cep_fim`` ou um único ``cep``. O separador (vírgula,
+    ponto e vírgula ou tabulação) é detectado.
+
+    Raises:
+        ValueError: Colunas ausentes ou CEP inválido (com o número da linha)
+    """
+    with open(caminho, 'r', encoding='utf-8-sig', newline='') as arquivo:
+        dialeto = csv.Sniffer().sniff(arquivo.read(4096), delimiters=',;\t')
+        arquivo.seek(0)
+        leitor = csv.DictReader(arquivo, dialect=dialeto)
+        campos = [campo.strip().lower() for campo in leitor.fieldnames or []]
+        leitor.fieldnames = campos
+        cidade = _coluna(campos, COLUNAS_CIDADE)
+        inicio = _coluna(campos, COLUNAS_INICIO) or ('cep' if 'cep' in campos else None)
+        fim = _coluna(campos, COLUNAS_FIM) or inicio
+        if cidade is None or inicio is None or 'uf' not in campos:
+            raise ValueError("O CSV precisa das colunas uf, cidade e cep (ou cep_inicio e cep_fim)")
+
+        for numero, linha in enumerate(leitor, start=2):
+            primeiro, ultimo = numero_cep(linha[inicio]), numero_cep(linha[fim])
+            if primeiro is None or ultimo is None or ultimo < primeiro:
+                raise ValueError(f"Linha {numero}: faixa de CEP inválida")
+            yield primeiro, ultimo, linha[cidade].strip(), linha['uf'].strip().upper()
+
+
+class ResultadoConstrucao(NamedTuple):
+    faixas: int
+    localidades: int
+    conflitos: int
+    bytes: int
+
+
+def construir_indice(faixas: Iterable[Tuple[int, int, str, str]], destino: str) -> ResultadoConstrucao:
+    """
+    Ordena e funde as faixas e grava o índice em ``destino`` (troca atômica).
+
+    Faixas contíguas ou sobrepostas da mesma localidade viram uma só. Uma
+    faixa que se sobrepõe a outra de localidade diferente é descartada e
+    contada em ``conflitos``.
+    """
+    codigos: Dict[Localidade, int] = {}
+    inicios, fins, ids = array('I'), array('I'), array('I')
+    conflitos = 0
+
+    for primeiro, ultimo, cidade, uf in sorted(faixas):
+        codigo = codigos.setdefault(Localidade(cidade, uf), len(codigos))
+        if inicios and primeiro <= fins[-1] + 1:
+            if ids[-1] == codigo:
+                fins[-1] = max(fins[-1], ultimo)
+                continue
+            if primeiro <= fins[-1]:
+                conflitos += 1
+                continue
+        inicios.append(primeiro)
+        fins.append(ultimo)
+        ids.append(codigo)
+
+    tabela = json.dumps([list(localidade) for localidade in codigos], ensure_ascii=False).encode('utf-8')
+    if sys.byteorder != 'little':
+        for vetor in (inicios, fins, ids):
+            vetor.byteswap()
+
+    pasta = os.path.dirname(os.path.abspath(destino))
+    os.makedirs(pasta, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=pasta, prefix='.cep-', suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as arquivo:
+            arquivo.write(CABECALHO.pack(ASSINATURA, len(inicios), len(tabela)))
+            for vetor in (inicios, fins, ids):
+                vetor.tofile(arquivo)
+            arquivo.write(tabela)
+        os.replace(temporario, destino)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+    return ResultadoConstrucao(len(inicios), len(codigos), conflitos, os.path.getsize(destino))
+
+
+# ---------------------------------------------------------------------------
+# Consulta
+# ---------------------------------------------------------------------------
+
+class _Dados(NamedTuple):
+    inicios: object
+    fins: object
+    ids: object
+    localidades: List[Localidade]
+    assinatura_arquivo: Tuple[int, int]
+
+
+def _abrir(caminho: str) -> _Dados:
+    with open(caminho, 'rb') as arquivo:
+        estado = os.fstat(arquivo.fileno())
+        mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+    assinatura, quantidade, tamanho_tabela = CABECALHO.unpack_from(mapa)
+    if assinatura != ASSINATURA:
+        raise ValueError(f"{caminho} não é um índice de CEP")
+    bruto = memoryview(mapa)
+    posicao = CABECALHO.size
+    vetores = []
+    for _ in range(3):
+        fatia = bruto[posicao:posicao + 4 * quantidade]
+        if sys.byteorder == 'little':
+            vetores.append(fatia.cast('I'))
+        else:
+            vetor = array('I', fatia)
+            vetor.byteswap()
+            vetores.append(vetor)
+        posicao += 4 * quantidade
+    tabela = json.loads(bytes(bruto[posicao:posicao + tamanho_tabela]).decode('utf-8'))
+    # O mmap continua vivo enquanto as memoryviews existirem
+    return _Dados(*vetores, [Localidade(*item) for item in tabela], (estado.st_mtime_ns, estado.st_size))
+
+
+class IndiceCEP:
+    """
+    Consulta ao índice de CEP, aberto no primeiro uso.
+
+    Sem arquivo configurado ou existente, ``consultar`` devolve None e a
+    conferência do formulário não é feita.
+    """
+
+    def __init__(self, caminho: Optional[str] = None, intervalo_verificacao: float = INTERVALO_VERIFICACAO):
+        self.caminho = caminho
+        self.intervalo_verificacao = intervalo_verificacao
+        self._dados: Optional[_Dados] = None
+        self._proxima_verificacao = 0.0
+        self._lock = threading.Lock()
+
+    def configurar(self, caminho: Optional[str]) -> None:
+        with self._lock:
+            self.caminho = caminho
+            self._dados = None
+            self._proxima_verificacao = 0.0
+
+    def carregar(self) -> Optional[_Dados]:
+        """Abre o índice, ou reabre se o arquivo mudou desde a última verificação"""
+        agora = time.monotonic()
+        if agora < self._proxima_verificacao:
+            return self._dados
+        with self._lock:
+            if agora < self._proxima_verificacao:
+                return self._dados
+            self._proxima_verificacao = agora + self.intervalo_verificacao
+            try:
+                estado = os.stat(self.caminho) if self.caminho else None
+            except FileNotFoundError:
+                estado = None
+            if estado is None:
+                self._dados = None
+            elif self._dados is None or self._dados.assinatura_arquivo != (estado.st_mtime_ns, estado.st_size):
+                # O mapa antigo é liberado quando a última consulta em andamento terminar
+                self._dados = _abrir(self.caminho)
+            return self._dados
+
+    @property
+    def disponivel(self) -> bool:
+        return self.carregar() is not None
+
+    def __len__(self) -> int:
+        dados = self.carregar()
+        return len(dados.inicios) if dados is not None else 0
+
+    def consultar(self, cep) -> Optional[Localidade]:
+        """Localidade do CEP (texto ou inteiro), ou None se desconhecido"""
+        dados = self.carregar()
+        numero = cep if isinstance(cep, int) else numero_cep(cep)
+        if dados is None or numero is None:
+            return None
+        posicao = bisect.bisect_right(dados.inicios, numero) - 1
+        if posicao >= 0 and numero <= dados.fins[posicao]:
+            return dados.localidades[dados.ids[posicao]]
+        return None
+
+
+indice_cep = IndiceCEP()
+
+
+def conferir_endereco(cep: str, cidade: str, uf: str, indice: IndiceCEP = indice_cep) -> Optional[Localidade]:
+    """
+    Confere cidade e UF com a localidade do CEP.
+
+    CEP fora do índice (ou índice ausente) não é recusado: a base pode estar
+    desatualizada. Retorna a localidade encontrada.
+
+    Raises:
+        ErroValidacao: Cidade ou UF diferentes das do CEP
+    """
+    localidade = indice.consultar(cep)
+    if localidade is None:
+        return None
+    if uf.upper() != localidade.uf or normalizar_cidade(cidade) != normalizar_cidade(localidade.cidade):
+        raise ErroValidacao(
+            'cep', f"O CEP {cep} é de {localidade.cidade}/{localidade.uf}; confira a cidade e a UF", cep)
+    return localidade
@@ -0,0 +1,100 @@
+"""
+Cadastro de clientes a partir dos orçamentos.
+
+Cada e-mail normalizado (minúsculas) é um ``Cliente``. Ao gravar um
+orçamento o cliente é criado ou atualizado com um UPSERT no índice único do
+e-mail e o orçamento recebe o ``cliente_id``:
+
+- pelo ORM, no evento ``before_flush`` da sessão, para todo orçamento novo
+  sem cliente (a rota do formulário e qualquer outro código);
+- pela importação em lote, que grava pelo Core, com ``vincular_clientes``.
+
+Nome, telefone e endereço do cliente só são sobrescritos por um orçamento
+mais recente que o da última atualização, então reimportar dados antigos não
+desfaz o cadastro atual. O histórico do cliente é lido pelo índice
+``(cliente_id, data_criacao, id)`` em vez de varrer a coluna de e-mail.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List
+
+from sqlalchemy import event, select
+
+from banco import insert_upsert
+from models import db, Cliente, Orcamento
+
+# Colunas do cliente copiadas do orçamento
+CAMPOS = ('nome', 'telefone', 'rua', 'numero', 'complemento', 'bairro', 'cidade', 'uf', 'cep')
+
+
+def chave_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def _utc(data: datetime) -> datetime:
+    # As colunas DateTime guardam UTC sem fuso; a rota usa datetime com fuso
+    return data.astimezone(timezone.utc).replace(tzinfo=None) if data.tzinfo is not None else data
+
+
+def _linha_cliente(dados: Dict) -> Dict:
+    linha = {campo: dados.get(campo) for campo in CAMPOS}
+    linha['email'] = chave_email(dados['email'])
+    linha['data_criacao'] = linha['data_atualizacao'] = _utc(dados['data_criacao'])
+    return linha
+
+
+def _upsert(conexao, linhas: List[Dict]) -> None:
+    tabela = Cliente.__table__
+    comando = insert_upsert(conexao.dialect.name)(tabela)
+    atualizacao = {campo: comando.excluded[campo] for campo in CAMPOS + ('data_atualizacao',)}
+    comando = comando.on_conflict_do_update(
+        index_elements=['email'],
+        set_=atualizacao,
+        where=tabela.c.data_atualizacao <= comando.excluded.data_atualizacao
+    )
+    conexao.execute(comando, linhas)
+
+
+def vincular_clientes(conexao, linhas: Iterable[Dict]) -> None:
+    """
+    Cria ou atualiza os clientes das linhas de orçamento (valores das colunas,
+    como no INSERT) e preenche ``cliente_id`` em cada uma.
+    """
+    linhas = list(linhas)
+    if not linhas:
+        return
+    # Um UPSERT por e-mail, com os dados do orçamento mais recente do lote
+    por_email: Dict[str, Dict] = {}
+    for linha in linhas:
+        cliente = _linha_cliente(linha)
+        anterior = por_email.get(cliente['email'])
+        if anterior is None or anterior['data_atualizacao'] <= cliente['data_atualizacao']:
+            if anterior is not None:
+                cliente['data_criacao'] = min(anterior['data_criacao'], cliente['data_criacao'])
+            por_email[cliente['email']] = cliente
+        else:
+            anterior['data_criacao'] = min(anterior['data_criacao'], cliente['data_criacao'])
+    _upsert(conexao, list(por_email.values()))
+
+    ids = dict(conexao.execute(
+        select(Cliente.email, Cliente.id).where(Cliente.email.in_(list(por_email)))
+    ).all())
+    for linha in linhas:
+        linha['cliente_id'] = ids[chave_email(linha['email'])]
+
+
+def _antes_do_flush(sessao, contexto, instancias) -> None:
+    novos = [objeto for objeto in sessao.new if isinstance(objeto, Orcamento) and objeto.cliente_id is None]
+    if not novos:
+        return
+    linhas = []
+    for orcamento in novos:
+        linha = {campo: getattr(orcamento, campo) for campo in CAMPOS + ('email', 'data_criacao')}
+        if linha['data_criacao'] is None:
+            orcamento.data_criacao = linha['data_criacao'] = datetime.now(timezone.utc)
+        linhas.append(linha)
+    vincular_clientes(sessao.connection(), linhas)
+    for orcamento, linha in zip(novos, linhas):
+        orcamento.cliente_id = linha['cliente_id']
+
+
+event.listen(db.session, 'before_flush', _antes_do_flush)
@@ -0,0 +1,224 @@
+"""
+Servidor de arquivos estáticos com pré-compressão e cache HTTP.
+
+O comando ``flask estaticos comprimir`` gera, no build, as versões ``.gz`` e
+``.br`` (esta se o pacote ``brotli`` estiver instalado) dos arquivos de texto
+de ``static/`` e um manifesto com o hash do conteúdo de cada arquivo.
+
+Em tempo de execução a rota ``static`` do Flask é substituída por uma que:
+  - escolhe a variante comprimida de acordo com ``Accept-Encoding``;
+  - envia ETags fortes derivadas do hash do conteúdo e responde 304 a ``If-None-Match``;
+  - marca como ``immutable`` por um ano as URLs com hash (variantes de imagem
+    e URLs geradas por ``url_estatico()``); as demais são revalidadas pela ETag.
+
+Funciona direto no ``gunicorn app:app``, sem proxy reverso.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+from typing import Dict, Optional, Tuple
+
+from flask import Response, abort, request, send_file, url_for
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # Brotli é opcional; sem ele só há gzip
+    brotli = None
+
+EXTENSOES_COMPRIMIVEIS = ('.css', '.js', '.html', '.htm', '.svg', '.json', '.txt', '.xml', '.ico', '.map',
+                          '.woff', '.ttf', '.eot')
+ARQUIVO_MANIFESTO = '.estaticos.json'
+TAMANHO_MINIMO = 256  # Abaixo disso a compressão não compensa
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+CACHE_REVALIDAR = 'public, no-cache'
+
+mimetypes.add_type('image/webp', '.webp')
+
+# Nome com hash de conteúdo, como "astronauta-160w.1801339f94df.webp"
+_PADRAO_NOME_COM_HASH = re.compile(r'\.[0-9a-f]{8,}\.[A-Za-z0-9]+$')
+
+
+def _hash_arquivo(caminho: str) -> str:
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 16), b''):
+            sha.update(bloco)
+    return sha.hexdigest()[:16]
+
+
+def comprimir_estaticos(pasta_static: str, registrar=print) -> Dict[str, Dict]:
+    """
+    Gera as variantes .gz/.br que faltam ou estão velhas e grava o manifesto de hashes.
+
+    Returns:
+        Dict: Manifesto {caminho relativo: {'hash', 'gz', 'br'}}
+    """
+    manifesto = {}
+    for raiz, _, arquivos in os.walk(pasta_static):
+        for nome in sorted(arquivos):
+            if nome.endswith(('.gz', '.br')) or nome == ARQUIVO_MANIFESTO:
+                continue
+            caminho = os.path.join(raiz, nome)
+            relativo = os.path.relpath(caminho, pasta_static).replace(os.sep, '/')
+            entrada = {'hash': _hash_arquivo(caminho), 'gz': False, 'br': False}
+
+            if nome.lower().endswith(EXTENSOES_COMPRIMIVEIS) and os.path.getsize(caminho) >= TAMANHO_MINIMO:
+                mtime = os.path.getmtime(caminho)
+                with open(caminho, 'rb') as arquivo:
+                    conteudo = arquivo.read()
+
+                compressores = [('gz', lambda dados: gzip.compress(dados, compresslevel=9, mtime=0))]
+                if brotli is not None:
+                    compressores.append(('br', lambda dados: brotli.compress(dados, quality=11)))
+
+                for sufixo, comprimir in compressores:
+                    destino = f"{caminho}.{sufixo}"
+                    if not os.path.exists(destino) or os.path.getmtime(destino) < mtime:
+                        comprimido = comprimir(conteudo)
+                        if len(comprimido) >= len(conteudo):
+                            continue
+                        with open(destino, 'wb') as arquivo:
+                            arquivo.write(comprimido)
+                        registrar(f"{relativo}.{sufixo}: {len(conteudo)} -> {len(comprimido)} bytes")
+                    entrada[sufixo] = True
+            manifesto[relativo] = entrada
+
+    with open(os.path.join(pasta_static, ARQUIVO_MANIFESTO), 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, indent=2, sort_keys=True)
+    return manifesto
+
+
+def codificacoes_aceitas(cabecalho: str) -> Dict[str, float]:
+    """Interpreta Accept-Encoding em {codificação: q}"""
+    aceitas = {}
+    for item in cabecalho.split(','):
+        partes = item.strip().split(';')
+        nome = partes[0].strip().lower()
+        if not nome:
+            continue
+        q = 1.0
+        for parametro in partes[1:]:
+            chave, _, valor = parametro.strip().partition('=')
+            if chave.strip() == 'q':
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        aceitas[nome] = q
+    return aceitas
+
+
+class ServidorEstaticos:
+    """Substitui a rota ``static`` do Flask"""
+
+    def __init__(self, app=None):
+        self.pasta = None
+        self._manifesto: Dict[str, Dict] = {}
+        self._mtime_manifesto: Optional[float] = None
+        # Hashes calculados sob demanda para arquivos fora do manifesto: caminho -> (mtime_ns, tamanho, hash)
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        self.pasta = app.static_folder
+        app.view_functions['static'] = self.servir
+        app.add_template_global(self.url_estatico, 'url_estatico')
+
+    def _entrada_manifesto(self, relativo: str) -> Optional[Dict]:
+        caminho = os.path.join(self.pasta, ARQUIVO_MANIFESTO)
+        try:
+            mtime = os.path.getmtime(caminho)
+        except OSError:
+            return None
+        if mtime != self._mtime_manifesto:
+            with self._lock:
+                try:
+                    with open(caminho, 'r', encoding='utf-8') as arquivo:
+                        self._manifesto = json.load(arquivo)
+                except ValueError:
+                    self._manifesto = {}
+                self._mtime_manifesto = mtime
+        return self._manifesto.get(relativo)
+
+    def hash_arquivo(self, relativo: str, caminho: str, estado: os.stat_result) -> str:
+        """Hash do conteúdo: do manifesto se o arquivo não mudou depois dele, senão calculado e memorizado"""
+        entrada = self._entrada_manifesto(relativo)
+        if entrada is not None and self._mtime_manifesto is not None \
+                and estado.st_mtime <= self._mtime_manifesto:
+            return entrada['hash']
+        chave = (estado.st_mtime_ns, estado.st_size)
+        memorizado = self._hashes.get(caminho)
+        if memorizado is not None and memorizado[:2] == chave:
+            return memorizado[2]
+        valor = _hash_arquivo(caminho)
+        self._hashes[caminho] = (*chave, valor)
+        return valor
+
+    def url_estatico(self, arquivo: str) -> str:
+        """URL do arquivo com ``?v=<hash>``, que pode ser cacheada como imutável"""
+        caminho = safe_join(self.pasta, arquivo)
+        if caminho is None or not os.path.isfile(caminho):
+            return url_for('static', filename=arquivo)
+        return url_for('static', filename=arquivo, v=self.hash_arquivo(arquivo, caminho, os.stat(caminho)))
+
+    def _escolher_variante(self, caminho: str, estado: os.stat_result) -> Tuple[str, Optional[str], bool]:
+        """Retorna (arquivo a enviar, Content-Encoding, existe variante comprimida)"""
+        variantes = []
+        for codificacao, sufixo in (('br', '.br'), ('gzip', '.gz')):
+            alternativo = caminho + sufixo
+            try:
+                # Variante mais velha que o original está desatualizada
+                if os.stat(alternativo).st_mtime >= estado.st_mtime:
+                    variantes.append((codificacao, alternativo))
+            except OSError:
+                pass
+        if not variantes:
+            return caminho, None, False
+
+        aceitas = codificacoes_aceitas(request.headers.get('Accept-Encoding', ''))
+        for codificacao, alternativo in variantes:
+            if aceitas.get(codificacao, aceitas.get('*', 0.0)) > 0:
+                return alternativo, codificacao, True
+        return caminho, None, True
+
+    def servir(self, filename: str) -> Response:
+        caminho = safe_join(self.pasta, filename)
+        if caminho is None or filename.endswith(('.gz', '.br')) or os.path.basename(filename) == ARQUIVO_MANIFESTO:
+            abort(404)
+        try:
+            estado = os.stat(caminho)
+        except OSError:
+            abort(404)
+        if not os.path.isfile(caminho):
+            abort(404)
+
+        relativo = filename.replace(os.sep, '/')
+        hash_conteudo = self.hash_arquivo(relativo, caminho, estado)
+        enviar, codificacao, tem_variantes = self._escolher_variante(caminho, estado)
+
+        # ETag forte por representação: a versão comprimida tem bytes diferentes
+        etag = hash_conteudo if codificacao is None else f"{hash_conteudo}-{codificacao}"
+        imutavel = bool(_PADRAO_NOME_COM_HASH.search(filename)) or request.args.get('v') == hash_conteudo
+        cache_control = CACHE_IMUTAVEL if imutavel else CACHE_REVALIDAR
+
+        if etag in request.if_none_match:
+            resposta = Response(status=304)
+        else:
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            resposta = send_file(enviar, mimetype=mimetype, download_name=os.path.basename(filename),
+                                 conditional=False, etag=False, last_modified=estado.st_mtime, max_age=None)
+            if codificacao is not None:
+                resposta.headers['Content-Encoding'] = codificacao
+
+        resposta.set_etag(etag)
+        resposta.headers['Cache-Control'] = cache_control
+        if tem_variantes:
+            resposta.vary.add('Accept-Encoding')
+        return resposta
@@ -0,0 +1,188 @@
+"""
+Estatísticas diárias de orçamentos mantidas de forma incremental.
+
+A tabela ``estatisticas_diarias`` guarda, por dia de criação, produto,
+status, UF e cor, quantos orçamentos e quantas unidades existem. Ela é
+ajustada na mesma transação que grava o orçamento:
+
+- pelo ORM, no evento ``after_flush`` da sessão: +1 para cada orçamento novo,
+  a contagem passa da chave antiga para a nova quando status, produto, UF,
+  cor, quantidade ou data mudam, e os removidos são subtraídos;
+- pelo Core (importação em lote, UPDATE/DELETE em massa), que não dispara os
+  eventos do ORM: quem grava chama ``registrar_insercoes`` ou ``ajustar``.
+
+O painel lê O(dias × dimensões) linhas, nunca a tabela de orçamentos.
+``reconstruir`` recalcula tudo com um GROUP BY
+(``flask orcamentos reconstruir-estatisticas``). Orçamentos arquivados saem
+da tabela sem descontar as estatísticas e entram no recálculo pelo índice do
+arquivo. Orçamentos sem ``data_criacao`` (registros antigos) não são contados.
+"""
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Date, cast, delete, event, func, insert, select, union_all
+from sqlalchemy.orm import attributes
+
+from banco import insert_upsert
+from models import db, EstatisticaDiaria, Orcamento, OrcamentoArquivado
+
+DIMENSOES = ('dia', 'produto', 'status', 'uf', 'cor')
+# Atributos do orçamento que mudam a chave ou as unidades contadas
+CAMPOS = ('data_criacao', 'produto', 'status', 'uf', 'cor', 'quantidade')
+
+Chave = Tuple[date, str, str, str, str]
+# Chave -> [orçamentos, unidades]
+Deltas = Dict[Chave, List[int]]
+
+
+def _dia(valor) -> date:
+    return valor.date() if isinstance(valor, datetime) else valor
+
+
+def _chave(valores: Dict) -> Chave:
+    return (_dia(valores['data_criacao']), valores['produto'], valores['status'], valores['uf'],
+            valores.get('cor') or '')
+
+
+def _acumular(deltas: Deltas, valores: Dict, sinal: int) -> None:
+    if valores['data_criacao'] is None:
+        return
+    acumulado = deltas.setdefault(_chave(valores), [0, 0])
+    acumulado[0] += sinal
+    acumulado[1] += sinal * valores['quantidade']
+
+
+def ajustar(conexao, deltas: Deltas) -> None:
+    """Soma os deltas às linhas de ``estatisticas_diarias`` (UPSERT), na transação de ``conexao``"""
+    linhas = [
+        {'dia': dia, 'produto': produto, 'status': status, 'uf': uf, 'cor': cor,
+         'orcamentos': orcamentos, 'unidades': unidades}
+        for (dia, produto, status, uf, cor), (orcamentos, unidades) in deltas.items()
+        if orcamentos or unidades
+    ]
+    if not linhas:
+        return
+    tabela = EstatisticaDiaria.__table__
+    comando = insert_upsert(conexao.dialect.name)(tabela)
+    comando = comando.on_conflict_do_update(
+        index_elements=[coluna.name for coluna in tabela.primary_key.columns],
+        set_={
+            'orcamentos': tabela.c.orcamentos + comando.excluded.orcamentos,
+            'unidades': tabela.c.unidades + comando.excluded.unidades,
+        }
+    )
+    conexao.execute(comando, linhas)
+
+
+def registrar_insercoes(conexao, linhas: Iterable[Dict]) -> None:
+    """Conta orçamentos gravados pelo Core (valores das colunas, como no INSERT)"""
+    deltas: Deltas = {}
+    for linha in linhas:
+        _acumular(deltas, linha, 1)
+    ajustar(conexao, deltas)
+
+
+def _valores(orcamento: Orcamento, anteriores: bool) -> Dict:
+    valores = {}
+    for campo in CAMPOS:
+        if anteriores:
+            historico = attributes.get_history(orcamento, campo)
+            if historico.deleted:
+                valores[campo] = historico.deleted[0]
+                continue
+        valores[campo] = getattr(orcamento, campo)
+    return valores
+
+
+def _apos_flush(sessao, contexto) -> None:
+    deltas: Deltas = {}
+    for objeto in sessao.new:
+        if isinstance(objeto, Orcamento):
+            _acumular(deltas, _valores(objeto, False), 1)
+    for objeto in sessao.dirty:
+        if isinstance(objeto, Orcamento) and sessao.is_modified(objeto, include_collections=False):
+            anteriores, atuais = _valores(objeto, True), _valores(objeto, False)
+            if anteriores != atuais:
+                _acumular(deltas, anteriores, -1)
+                _acumular(deltas, atuais, 1)
+    for objeto in sessao.deleted:
+        if isinstance(objeto, Orcamento):
+            _acumular(deltas, _valores(objeto, True), -1)
+    if deltas:
+        ajustar(sessao.connection(), deltas)
+
+
+event.listen(db.session, 'after_flush', _apos_flush)
+
+
+def _expressao_dia(dialeto: str, data_criacao):
+    # No SQLite o Date é texto 'AAAA-MM-DD', o mesmo que date() devolve
+    if dialeto == 'sqlite':
+        return func.date(data_criacao)
+    return cast(data_criacao, Date)
+
+
+def reconstruir() -> int:
+    """
+    Recalcula ``estatisticas_diarias`` a partir dos orçamentos, inclusive os
+    arquivados (ver ``arquivo``). Retorna o número de linhas.
+    """
+    colunas = ('data_criacao', 'produto', 'status', 'uf', 'cor', 'quantidade')
+    todos = union_all(
+        select(*(getattr(Orcamento, coluna) for coluna in colunas)),
+        select(*(getattr(OrcamentoArquivado, coluna) for coluna in colunas)),
+    ).subquery()
+    dia = _expressao_dia(db.session.get_bind().dialect.name, todos.c.data_criacao)
+    cor = func.coalesce(todos.c.cor, '')
+    agrupamento = (
+        select(dia, todos.c.produto, todos.c.status, todos.c.uf, cor,
+               func.count(), func.sum(todos.c.quantidade))
+        .where(todos.c.data_criacao.is_not(None))
+        .group_by(dia, todos.c.produto, todos.c.status, todos.c.uf, cor)
+    )
+    db.session.execute(delete(EstatisticaDiaria))
+    db.session.execute(
+        insert(EstatisticaDiaria).from_select(
+            ['dia', 'produto', 'status', 'uf', 'cor', 'orcamentos', 'unidades'], agrupamento)
+    )
+    total = db.session.scalar(select(func.count()).select_from(EstatisticaDiaria))
+    db.session.commit()
+    return total
+
+
+def consultar(agrupar: Sequence[str] = ('dia',), de: Optional[date] = None, ate: Optional[date] = None,
+              filtros: Optional[Dict[str, str]] = None) -> List[Dict]:
+    """
+    Soma orçamentos e unidades por ``agrupar`` (subconjunto de ``DIMENSOES``).
+
+    Args:
+        agrupar: Dimensões das linhas do resultado; vazio dá o total do período
+        de: Primeiro dia (inclusivo)
+        ate: Último dia (exclusivo)
+        filtros: Igualdade por produto, status, uf ou cor
+    """
+    colunas = [getattr(EstatisticaDiaria, dimensao) for dimensao in agrupar]
+    consulta = select(*colunas,
+                      func.sum(EstatisticaDiaria.orcamentos).label('orcamentos'),
+                      func.sum(EstatisticaDiaria.unidades).label('unidades'))
+    if de is not None:
+        consulta = consulta.where(EstatisticaDiaria.dia >= de)
+    if ate is not None:
+        consulta = consulta.where(EstatisticaDiaria.dia < ate)
+    for campo, valor in (filtros or {}).items():
+        consulta = consulta.where(getattr(EstatisticaDiaria, campo) == valor)
+    consulta = consulta.group_by(*colunas).order_by(*colunas)
+
+    resultado = []
+    for linha in db.session.execute(consulta):
+        item = {}
+        for dimensao, valor in zip(agrupar, linha):
+            if dimensao == 'dia':
+                valor = valor.isoformat()
+            elif dimensao == 'cor':
+                valor = valor or None
+            item[dimensao] = valor
+        item['orcamentos'] = linha.orcamentos or 0
+        item['unidades'] = linha.unidades or 0
+        resultado.append(item)
+    return resultado
@@ -0,0 +1,76 @@
+"""
+Exportação de orçamentos em CSV ou NDJSON, em streaming.
+
+As linhas são lidas em lotes (``yield_per``) e cada lote é retirado da
+sessão depois de escrito, então a memória fica constante seja qual for o
+tamanho da exportação. O cabeçalho sai antes da consulta terminar.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator
+
+from sqlalchemy import Select
+
+from models import db, Orcamento
+
+FORMATOS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+TAMANHO_LOTE = 1000
+
+COLUNAS_CSV = [coluna.name for coluna in Orcamento.__table__.columns]
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+def _lotes(consulta: Select, tamanho_lote: int) -> Iterator[list]:
+    """Percorre a consulta em lotes, tirando da sessão os objetos já processados"""
+    resultado = db.session.execute(consulta.execution_options(yield_per=tamanho_lote))
+    for lote in resultado.scalars().partitions():
+        yield lote
+        for orcamento in lote:
+            db.session.expunge(orcamento)
+
+
+def exportar_csv(consulta: Select, tamanho_lote: int = TAMANHO_LOTE) -> Iterator[str]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUNAS_CSV)
+    yield buffer.getvalue()
+
+    for lote in _lotes(consulta, tamanho_lote):
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerows([_valor_csv(getattr(o, coluna)) for coluna in COLUNAS_CSV] for o in lote)
+        yield buffer.getvalue()
+
+
+def exportar_ndjson(consulta: Select, tamanho_lote: int = TAMANHO_LOTE) -> Iterator[str]:
+    for lote in _lotes(consulta, tamanho_lote):
+        yield ''.join(json.dumps(o.to_dict(), ensure_ascii=False) + '\n' for o in lote)
+
+
+def exportar(consulta: Select, formato: str, tamanho_lote: int = TAMANHO_LOTE) -> Iterator[str]:
+    """
+    Gera o conteúdo da exportação em pedaços.
+
+    Args:
+        consulta: Consulta de ``Orcamento`` (ex.: de ``admin.filtrar_orcamentos``)
+        formato: 'csv' ou 'ndjson'
+        tamanho_lote: Linhas buscadas por vez no banco
+    """
+    consulta = consulta.order_by(Orcamento.data_criacao, Orcamento.id)
+    if formato == 'csv':
+        return exportar_csv(consulta, tamanho_lote)
+    if formato == 'ndjson':
+        return exportar_ndjson(consulta, tamanho_lote)
+    raise ValueError(f"Formato de exportação inválido: {formato}")
@@ -0,0 +1,31 @@
+"""
+Configuração do gunicorn (lida automaticamente a partir da raiz do projeto).
+
+Com ``preload_app`` a aplicação é importada e aquecida uma vez no processo
+mestre; os workers nascem por fork já com os módulos importados, os templates
+de e-mail compilados e a página inicial no cache. O esquema do banco não é
+criado aqui: rode ``flask db upgrade`` antes de subir.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+
+def on_starting(server):
+    # Instantâneos de métricas de uma execução anterior não entram na soma
+    from metricas import limpar_instantaneos
+    limpar_instantaneos(os.getenv('METRICAS_PASTA', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                   'instance', 'metricas')))
+    if preload_app:
+        from app import aquecer, app
+        aquecer(app)
+
+
+def post_fork(server, worker):
+    # Conexões abertas no mestre não podem ser compartilhadas entre processos
+    from app import app
+    from models import db
+    with app.app_context():
+        db.engine.dispose(close=False)
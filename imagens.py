@@ -0,0 +1,227 @@
+"""
+Variantes responsivas das imagens de ``static/``.
+
+O comando ``flask imagens gerar`` cria versões redimensionadas de cada imagem
+em WebP e em um formato de fallback (JPEG, ou PNG quando a imagem tem
+transparência), com o hash do conteúdo original no nome do arquivo. Um
+manifesto em ``static/variantes/manifest.json`` guarda o que foi gerado;
+imagens que não mudaram (mesmo tamanho e mtime, ou mesmo hash) são puladas.
+
+Nos templates, ``imagem_responsiva()`` gera o ``<picture>`` com ``srcset`` e
+``sizes``, e ``url_variante()`` retorna a variante mais próxima de uma
+largura. Sem manifesto, ambos caem para a imagem original.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+from markupsafe import Markup, escape
+
+LARGURAS_PADRAO = (80, 160, 320, 640, 1024)
+EXTENSOES_ORIGEM = ('.png', '.jpg', '.jpeg')
+PASTA_VARIANTES = 'variantes'
+ARQUIVO_MANIFESTO = 'manifest.json'
+
+
+def _hash_arquivo(caminho: str) -> str:
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 16), b''):
+            sha.update(bloco)
+    return sha.hexdigest()[:12]
+
+
+def _tem_transparencia(imagem) -> bool:
+    if imagem.mode in ('RGBA', 'LA'):
+        return imagem.getextrema()[-1][0] < 255
+    return imagem.mode == 'P' and 'transparency' in imagem.info
+
+
+def _ler_manifesto(caminho: str) -> Dict:
+    try:
+        with open(caminho, 'r', encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _gerar_imagem(origem: str, destino: str, hash_origem: str, larguras: Iterable[int],
+                  qualidade: int) -> Dict:
+    from PIL import Image
+
+    nome_base = os.path.splitext(os.path.basename(origem))[0].replace('.', '_')
+    with Image.open(origem) as imagem:
+        imagem.load()
+        largura_original, altura_original = imagem.size
+        transparente = _tem_transparencia(imagem)
+        imagem = imagem.convert('RGBA' if transparente else 'RGB')
+        fallback = 'png' if transparente else 'jpeg'
+
+        # Nunca amplia: larguras maiores que a original viram a própria original
+        alvos = sorted({min(largura, largura_original) for largura in larguras})
+        variantes = {'webp': [], fallback: []}
+        for largura in alvos:
+            altura = max(1, round(altura_original * largura / largura_original))
+            redimensionada = imagem if largura == largura_original else imagem.resize(
+                (largura, altura), Image.LANCZOS)
+            for formato in ('webp', fallback):
+                extensao = 'jpg' if formato == 'jpeg' else formato
+                nome = f"{nome_base}-{largura}w.{hash_origem}.{extensao}"
+                opcoes = {'optimize': True}
+                if formato in ('webp', 'jpeg'):
+                    opcoes['quality'] = qualidade
+                if formato == 'jpeg':
+                    opcoes['progressive'] = True
+                redimensionada.save(os.path.join(destino, nome), formato.upper(), **opcoes)
+                variantes[formato].append({'largura': largura, 'altura': altura, 'arquivo': nome})
+
+    return {
+        'hash': hash_origem,
+        'largura': largura_original,
+        'altura': altura_original,
+        'fallback': fallback,
+        'variantes': variantes,
+    }
+
+
+def gerar_variantes(pasta_static: str, larguras: Iterable[int] = LARGURAS_PADRAO, qualidade: int = 80,
+                    forcar: bool = False, registrar=print) -> Dict:
+    """
+    Gera as variantes que faltam ou estão desatualizadas e atualiza o manifesto.
+
+    Args:
+        pasta_static: Pasta de arquivos estáticos da aplicação
+        larguras: Larguras, em pixels, das variantes
+        qualidade: Qualidade de compressão WebP/JPEG
+        forcar: Regera tudo, ignorando o manifesto
+        registrar: Função usada para reportar o progresso
+
+    Returns:
+        Dict: Manifesto atualizado
+    """
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        raise RuntimeError("Pillow não está instalado: pip install Pillow")
+
+    destino = os.path.join(pasta_static, PASTA_VARIANTES)
+    os.makedirs(destino, exist_ok=True)
+    caminho_manifesto = os.path.join(destino, ARQUIVO_MANIFESTO)
+    anterior = {} if forcar else _ler_manifesto(caminho_manifesto)
+    larguras = sorted(set(larguras))
+    manifesto = {}
+
+    for nome in sorted(os.listdir(pasta_static)):
+        origem = os.path.join(pasta_static, nome)
+        if not os.path.isfile(origem) or not nome.lower().endswith(EXTENSOES_ORIGEM):
+            continue
+
+        estado = os.stat(origem)
+        entrada = anterior.get(nome)
+        arquivos_existem = entrada is not None and all(
+            os.path.exists(os.path.join(destino, v['arquivo']))
+            for lista in entrada['variantes'].values() for v in lista
+        )
+        mesma_configuracao = entrada is not None and entrada.get('larguras') == larguras \
+            and entrada.get('qualidade') == qualidade
+
+        if arquivos_existem and mesma_configuracao:
+            # Atalho barato: tamanho e mtime iguais dispensam o hash
+            if entrada.get('tamanho') == estado.st_size and entrada.get('mtime_ns') == estado.st_mtime_ns:
+                manifesto[nome] = entrada
+                continue
+            hash_origem = _hash_arquivo(origem)
+            if entrada['hash'] == hash_origem:
+                entrada.update(tamanho=estado.st_size, mtime_ns=estado.st_mtime_ns)
+                manifesto[nome] = entrada
+                continue
+        else:
+            hash_origem = _hash_arquivo(origem)
+
+        registrar(f"Gerando variantes de {nome}")
+        entrada = _gerar_imagem(origem, destino, hash_origem, larguras, qualidade)
+        entrada.update(tamanho=estado.st_size, mtime_ns=estado.st_mtime_ns, larguras=larguras, qualidade=qualidade)
+        manifesto[nome] = entrada
+
+    # Remove variantes que nenhuma entrada do manifesto usa mais
+    em_uso = {v['arquivo'] for entrada in manifesto.values()
+              for lista in entrada['variantes'].values() for v in lista}
+    for arquivo in os.listdir(destino):
+        if arquivo != ARQUIVO_MANIFESTO and arquivo not in em_uso:
+            os.remove(os.path.join(destino, arquivo))
+            registrar(f"Removida variante obsoleta {arquivo}")
+
+    with open(caminho_manifesto, 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, indent=2, sort_keys=True)
+    return manifesto
+
+
+class ImagensResponsivas:
+    """Lê o manifesto de variantes (recarregando se mudar) e monta as tags"""
+
+    def __init__(self, pasta_static: str, url_static: str = '/static'):
+        self.pasta_static = pasta_static
+        self.url_static = url_static.rstrip('/')
+        self._caminho = os.path.join(pasta_static, PASTA_VARIANTES, ARQUIVO_MANIFESTO)
+        self._manifesto: Dict = {}
+        self._mtime: Optional[float] = None
+
+    def manifesto(self) -> Dict:
+        try:
+            mtime = os.stat(self._caminho).st_mtime
+        except FileNotFoundError:
+            self._manifesto, self._mtime = {}, None
+            return self._manifesto
+        if mtime != self._mtime:
+            self._manifesto, self._mtime = _ler_manifesto(self._caminho), mtime
+        return self._manifesto
+
+    def _url(self, arquivo: str) -> str:
+        return f"{self.url_static}/{PASTA_VARIANTES}/{arquivo}"
+
+    def _srcset(self, variantes: List[Dict]) -> str:
+        return ', '.join(f"{self._url(v['arquivo'])} {v['largura']}w" for v in variantes)
+
+    def url_variante(self, arquivo: str, largura: int, formato: Optional[str] = None) -> str:
+        """
+        URL da menor variante com pelo menos ``largura`` pixels (ou a original).
+
+        Sem ``formato``, usa o formato de fallback (JPEG ou PNG), aceito por qualquer navegador.
+        """
+        entrada = self.manifesto().get(arquivo)
+        if entrada is None:
+            return f"{self.url_static}/{arquivo}"
+        variantes = entrada['variantes'].get(formato or entrada['fallback']) \
+            or entrada['variantes'][entrada['fallback']]
+        escolhida = next((v for v in variantes if v['largura'] >= largura), variantes[-1])
+        return self._url(escolhida['arquivo'])
+
+    def imagem_responsiva(self, arquivo: str, alt: str = '', sizes: str = '100vw',
+                          largura_padrao: int = 320, **atributos) -> Markup:
+        """
+        Gera um ``<picture>`` com fontes WebP e fallback, ou um ``<img>`` simples sem manifesto.
+
+        Atributos extras viram atributos do ``<img>`` (``classe`` vira ``class``).
+        """
+        if 'classe' in atributos:
+            atributos['class'] = atributos.pop('classe')
+        atributos.setdefault('loading', 'lazy')
+        atributos.setdefault('decoding', 'async')
+        extras = ''.join(f' {escape(k.replace("_", "-"))}="{escape(v)}"' for k, v in atributos.items())
+
+        entrada = self.manifesto().get(arquivo)
+        if entrada is None:
+            return Markup(f'<img src="{escape(self.url_static)}/{escape(arquivo)}" alt="{escape(alt)}"{extras}>')
+
+        fallback = entrada['variantes'][entrada['fallback']]
+        padrao = next((v for v in fallback if v['largura'] >= largura_padrao), fallback[-1])
+        return Markup(
+            f'<picture>'
+            f'<source type="image/webp" srcset="{escape(self._srcset(entrada["variantes"]["webp"]))}" '
+            f'sizes="{escape(sizes)}">'
+            f'<img src="{escape(self._url(padrao["arquivo"]))}" '
+            f'srcset="{escape(self._srcset(fallback))}" sizes="{escape(sizes)}" '
+            f'width="{padrao["largura"]}" height="{padrao["altura"]}" alt="{escape(alt)}"{extras}>'
+            f'</picture>'
+        )
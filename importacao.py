@@ -0,0 +1,171 @@
+"""
+Importação em lote de orçamentos a partir de CSV ou JSONL.
+
+Cada linha passa por ``validacao.validar_registro``, as mesmas regras dos
+hooks do modelo, sem criar objetos do ORM, e a gravação é feita em lotes com
+``INSERT`` executemany, uma transação por lote. Se um lote for recusado pelo
+banco, só ele é regravado linha a linha para identificar as linhas com problema.
+Linhas inválidas são relatadas com o número da linha e não interrompem a
+importação. O NDJSON gerado por ``flask orcamentos exportar`` também é aceito.
+Como o ``INSERT`` do Core não passa pelos eventos do ORM, os clientes e as
+estatísticas diárias são atualizados explicitamente na transação de cada lote.
+"""
+import csv
+import json
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from banco import transacao_escrita
+from clientes import vincular_clientes
+from estatisticas import registrar_insercoes
+from models import db, Orcamento
+from validacao import validar_registro
+
+TAMANHO_LOTE = 1000
+
+# Colunas que a importação grava (o id é sempre gerado pelo banco)
+COLUNAS = [coluna.name for coluna in Orcamento.__table__.columns if not coluna.primary_key]
+INTEIROS = ('quantidade_paginas',)
+
+
+class ResultadoImportacao:
+    """Contagem de linhas importadas e falhas (número da linha, mensagem)"""
+
+    def __init__(self):
+        self.importados = 0
+        self.falhas: List[Tuple[int, str]] = []
+
+
+def ler_registros(caminho: str, formato: Optional[str] = None) -> Iterator[Tuple[int, Dict]]:
+    """
+    Lê o arquivo e gera (número da linha, registro).
+
+    O formato vem da extensão quando não é informado: ``.csv`` ou ``.jsonl``/``.ndjson``.
+    Uma linha JSON ilegível gera um registro ``None``.
+    """
+    formato = formato or ('csv' if caminho.lower().endswith('.csv') else 'jsonl')
+    with open(caminho, 'r', encoding='utf-8-sig', newline='') as arquivo:
+        if formato == 'csv':
+            leitor = csv.DictReader(arquivo)
+            for registro in leitor:
+                yield leitor.line_num, registro
+        else:
+            for numero, linha in enumerate(arquivo, 1):
+                if not linha.strip():
+                    continue
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    registro = None
+                yield numero, registro if isinstance(registro, dict) else None
+
+
+def preparar_linha(registro: Dict, verificar_dns: bool = False) -> Dict:
+    """
+    Valida o registro e retorna os valores das colunas para o INSERT.
+
+    Raises:
+        ValueError: Campo obrigatório ausente ou valor inválido
+    """
+    dados = dict(registro)
+    # Formato aninhado do NDJSON exportado
+    if isinstance(dados.get('endereco'), dict):
+        dados.update(dados.pop('endereco'))
+    dados.pop('id', None)
+    dados.pop('cliente_id', None)  # O cliente vem do e-mail, no banco de destino
+    dados.pop('email_entregavel', None)  # Definido pela validação do e-mail
+
+    dados = {campo: valor.strip() if isinstance(valor, str) else valor for campo, valor in dados.items()}
+    dados = {campo: valor for campo, valor in dados.items() if valor not in ('', None)}
+
+    for campo in INTEIROS:
+        if campo in dados:
+            try:
+                dados[campo] = int(dados[campo])
+            except (TypeError, ValueError):
+                raise ValueError(f"'{campo}' deve ser um número inteiro")
+
+    if isinstance(dados.get('data_criacao'), str):
+        try:
+            data = datetime.fromisoformat(dados['data_criacao'])
+        except ValueError:
+            raise ValueError("'data_criacao' deve estar no formato ISO 8601")
+        if data.tzinfo is not None:
+            data = data.astimezone(timezone.utc).replace(tzinfo=None)
+        dados['data_criacao'] = data
+
+    dados = validar_registro(dados, verificar_dns)
+    linha = {coluna: dados.get(coluna) for coluna in COLUNAS}
+    if linha['data_criacao'] is None:
+        linha['data_criacao'] = datetime.now(timezone.utc)
+    if linha['status'] is None:
+        linha['status'] = 'pendente'
+    return linha
+
+
+def _gravar_lote(lote: List[Tuple[int, Dict]], resultado: ResultadoImportacao) -> None:
+    try:
+        transacao_escrita(db.session)
+        linhas = [linha for _, linha in lote]
+        vincular_clientes(db.session.connection(), linhas)
+        db.session.execute(Orcamento.__table__.insert(), linhas)
+        registrar_insercoes(db.session.connection(), linhas)
+        db.session.commit()
+        resultado.importados += len(lote)
+        return
+    except IntegrityError:
+        db.session.rollback()
+
+    # Algum registro violou uma restrição do banco: regrava um a um
+    transacao_escrita(db.session)
+    gravadas = []
+    for numero, linha in lote:
+        try:
+            with db.session.begin_nested():
+                vincular_clientes(db.session.connection(), [linha])
+                db.session.execute(Orcamento.__table__.insert(), [linha])
+            gravadas.append(linha)
+        except IntegrityError as e:
+            resultado.falhas.append((numero, f"Recusado pelo banco: {e.orig}"))
+    registrar_insercoes(db.session.connection(), gravadas)
+    db.session.commit()
+    resultado.importados += len(gravadas)
+
+
+def importar(caminho: str, formato: Optional[str] = None, tamanho_lote: int = TAMANHO_LOTE,
+             verificar_dns: bool = False, progresso: Optional[Callable[[int], None]] = None
+             ) -> ResultadoImportacao:
+    """
+    Importa orçamentos do arquivo em lotes.
+
+    Args:
+        caminho: Arquivo CSV ou JSONL
+        formato: 'csv' ou 'jsonl'; deduzido da extensão se omitido
+        tamanho_lote: Linhas por transação
+        verificar_dns: Consulta o DNS dos domínios fora do cache; por padrão só o
+            cache de domínios é usado e ``email_entregavel`` fica None para os demais
+        progresso: Chamado com o total importado após cada lote
+    """
+    resultado = ResultadoImportacao()
+    lote: List[Tuple[int, Dict]] = []
+
+    for numero, registro in ler_registros(caminho, formato):
+        if registro is None:
+            resultado.falhas.append((numero, 'JSON inválido'))
+            continue
+        try:
+            lote.append((numero, preparar_linha(registro, verificar_dns)))
+        except ValueError as e:
+            resultado.falhas.append((numero, str(e)))
+            continue
+        if len(lote) >= tamanho_lote:
+            _gravar_lote(lote, resultado)
+            lote = []
+            if progresso:
+                progresso(resultado.importados)
+    if lote:
+        _gravar_lote(lote, resultado)
+
+    return resultado
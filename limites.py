@@ -0,0 +1,153 @@
+"""
+Limite de taxa por IP com baldes de tokens (token bucket).
+
+Cada IP tem um balde com ``capacidade`` tokens que se recompõe a
+``taxa`` tokens por segundo; cada requisição consome um token. O balde local
+fica em memória no worker e responde em microssegundos. Opcionalmente um
+balde compartilhado em SQLite faz o limite valer entre todos os workers do
+gunicorn; ele só é consultado quando o balde local ainda tem tokens, de modo
+que requisições já barradas nunca tocam o disco. Se o SQLite falhar (banco
+travado, disco cheio), vale a decisão do balde local.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from flask import Response, current_app, jsonify
+
+MENSAGEM_LIMITE = 'Muitas solicitações. Aguarde alguns minutos e tente novamente.'
+
+
+class BaldeTokens:
+    """Baldes de tokens em memória, com número máximo de chaves (LRU)"""
+
+    def __init__(self, capacidade: float, taxa: float, max_chaves: int = 100000):
+        self.capacidade = capacidade
+        self.taxa = taxa
+        self.max_chaves = max_chaves
+        self._baldes: 'OrderedDict[str, list]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, chave: str, agora: float = None) -> Tuple[bool, float]:
+        """
+        Tenta consumir um token.
+
+        Returns:
+            (permitido, segundos até haver um token disponível)
+        """
+        agora = time.monotonic() if agora is None else agora
+        with self._lock:
+            balde = self._baldes.get(chave)
+            if balde is None:
+                balde = [self.capacidade, agora]
+                self._baldes[chave] = balde
+                if len(self._baldes) > self.max_chaves:
+                    self._baldes.popitem(last=False)
+            else:
+                self._baldes.move_to_end(chave)
+                balde[0] = min(self.capacidade, balde[0] + (agora - balde[1]) * self.taxa)
+                balde[1] = agora
+
+            if balde[0] >= 1:
+                balde[0] -= 1
+                return True, 0.0
+            return False, (1 - balde[0]) / self.taxa
+
+    def devolver(self, chave: str) -> None:
+        """Devolve o token quando o armazenamento compartilhado negou a requisição"""
+        with self._lock:
+            balde = self._baldes.get(chave)
+            if balde is not None:
+                balde[0] = min(self.capacidade, balde[0] + 1)
+
+
+class BaldeTokensSQLite:
+    """Baldes de tokens em um arquivo SQLite compartilhado entre processos"""
+
+    def __init__(self, caminho: str, capacidade: float, taxa: float):
+        self.caminho = caminho
+        self.capacidade = capacidade
+        self.taxa = taxa
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        with self._conexao() as conexao:
+            conexao.execute(
+                'CREATE TABLE IF NOT EXISTS baldes ('
+                'chave TEXT PRIMARY KEY, tokens REAL NOT NULL, atualizado REAL NOT NULL)'
+            )
+
+    def _conexao(self) -> sqlite3.Connection:
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None or getattr(self._local, 'pid', None) != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+            # Dados descartáveis: WAL sem fsync a cada escrita
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=OFF')
+            self._local.conexao, self._local.pid = conexao, os.getpid()
+        return conexao
+
+    def consumir(self, chave: str, agora: float = None) -> Tuple[bool, float]:
+        agora = time.time() if agora is None else agora
+        conexao = self._conexao()
+        conexao.execute('BEGIN IMMEDIATE')
+        try:
+            linha = conexao.execute('SELECT tokens, atualizado FROM baldes WHERE chave = ?', (chave,)).fetchone()
+            tokens = self.capacidade if linha is None else \
+                min(self.capacidade, linha[0] + max(0.0, agora - linha[1]) * self.taxa)
+            permitido = tokens >= 1
+            if permitido:
+                tokens -= 1
+            conexao.execute(
+                'INSERT INTO baldes (chave, tokens, atualizado) VALUES (?, ?, ?) '
+                'ON CONFLICT(chave) DO UPDATE SET tokens = excluded.tokens, atualizado = excluded.atualizado',
+                (chave, tokens, agora)
+            )
+            conexao.execute('COMMIT')
+        except Exception:
+            conexao.execute('ROLLBACK')
+            raise
+        return permitido, 0.0 if permitido else (1 - tokens) / self.taxa
+
+    def limpar_antigos(self, idade: float = 86400.0) -> int:
+        """Remove baldes parados há mais de ``idade`` segundos (já estariam cheios)"""
+        cursor = self._conexao().execute('DELETE FROM baldes WHERE atualizado < ?', (time.time() - idade,))
+        return cursor.rowcount
+
+
+class LimitadorTaxa:
+    """Combina o balde local com o compartilhado opcional"""
+
+    def __init__(self, capacidade: float, taxa: float, caminho_sqlite: Optional[str] = None):
+        self.configurar(capacidade, taxa, caminho_sqlite)
+
+    def configurar(self, capacidade: float, taxa: float, caminho_sqlite: Optional[str] = None) -> None:
+        """Recria os baldes com novos parâmetros"""
+        self.local = BaldeTokens(capacidade, taxa)
+        self.compartilhado = BaldeTokensSQLite(caminho_sqlite, capacidade, taxa) if caminho_sqlite else None
+
+    def consumir(self, chave: str) -> Tuple[bool, float]:
+        permitido, espera = self.local.consumir(chave)
+        if not permitido or self.compartilhado is None:
+            return permitido, espera
+        try:
+            permitido, espera = self.compartilhado.consumir(chave)
+        except sqlite3.Error as e:
+            current_app.logger.warning(f"Limite compartilhado indisponível, usando o local: {str(e)}")
+            return True, 0.0
+        if not permitido:
+            self.local.devolver(chave)
+        return permitido, espera
+
+    def recusar(self, chave: str, mensagem: str = MENSAGEM_LIMITE) -> Optional[Response]:
+        """Consome um token da chave; retorna a resposta 429 se o balde está vazio, senão None"""
+        permitido, espera = self.consumir(chave)
+        if permitido:
+            return None
+        resposta = jsonify({'success': False, 'message': mensagem})
+        resposta.status_code = 429
+        resposta.headers['Retry-After'] = str(max(1, math.ceil(espera)))
+        return resposta
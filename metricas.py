@@ -0,0 +1,388 @@
+"""
+Métricas de latência por fase e contadores, no formato texto do Prometheus.
+
+Cada processo acumula os valores em memória. Observar uma duração só
+acrescenta o valor a uma ``deque``, sem lock nem I/O; a distribuição nos
+baldes fixos do histograma é feita quando o instantâneo é lido. Uma thread
+por processo grava de tempos em tempos um instantâneo JSON em
+``METRICAS_PASTA`` (um arquivo por processo). ``/metrics`` grava o
+instantâneo do próprio worker e soma os arquivos de todos, então a resposta
+é a mesma qualquer que seja o worker do gunicorn que atender a coleta, com
+atraso de no máximo ``METRICAS_INTERVALO`` segundos para os demais.
+
+Os arquivos de processos encerrados ficam na pasta para os contadores nunca
+diminuírem; o gunicorn limpa a pasta ao subir (ver ``gunicorn.conf.py``).
+"""
+import abc
+import atexit
+import copy
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from functools import wraps
+from time import perf_counter
+from typing import Deque, Dict, List, Optional, Tuple
+
+from flask import Blueprint, Response, current_app, jsonify, request
+
+# Segundos: de 1 ms (cache, validação local) a 10 s (DNS e SMTP lentos)
+LIMITES_PADRAO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Observações guardadas entre duas consolidações. Com a thread de gravação
+# (a cada METRICAS_INTERVALO) o limite não é atingido; sem ela (CLI) as mais
+# antigas dos histogramas são descartadas e os contadores se consolidam sozinhos.
+MAX_PENDENTES = 100000
+
+metricas_bp = Blueprint('metricas', __name__)
+
+
+class SerieHistograma:
+    """Histograma de um valor de rótulo"""
+
+    __slots__ = ('limites', 'contagens', 'soma', '_pendentes', '_lock', 'observar')
+
+    def __init__(self, limites: Tuple[float, ...]):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)  # A última posição é o +Inf
+        self.soma = 0.0
+        # deque.append é atômico: a observação não pega lock; os valores entram
+        # nos baldes quando alguém lê o instantâneo (a thread de gravação ou /metrics)
+        self._pendentes: Deque[float] = deque(maxlen=MAX_PENDENTES)
+        self._lock = threading.Lock()
+        # observar(valor) é o próprio append, sem chamada Python no meio
+        self.observar = self._pendentes.append
+
+    def cronometro(self) -> '_Cronometro':
+        """
+        ``with serie.cronometro():`` observa a duração do bloco.
+
+        O protocolo do ``with`` custa perto de 1 µs; em caminhos quentes use
+        ``inicio = perf_counter()`` e ``serie.observar(perf_counter() - inicio)``.
+        """
+        return _Cronometro(self)
+
+    def _consolidar(self) -> None:
+        with self._lock:
+            pendentes, limites, contagens = self._pendentes, self.limites, self.contagens
+            while True:
+                try:
+                    valor = pendentes.popleft()
+                except IndexError:
+                    break
+                contagens[bisect_left(limites, valor)] += 1
+                self.soma += valor
+
+    def zerar(self) -> None:
+        with self._lock:
+            self._pendentes.clear()
+            self.contagens = [0] * (len(self.limites) + 1)
+            self.soma = 0.0
+
+    def instantaneo(self) -> Dict:
+        self._consolidar()
+        with self._lock:
+            return {'contagens': list(self.contagens), 'soma': self.soma}
+
+
+class _Cronometro:
+    __slots__ = ('serie', 'inicio')
+
+    def __init__(self, serie: SerieHistograma):
+        self.serie = serie
+
+    def __enter__(self):
+        self.inicio = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.serie.observar(perf_counter() - self.inicio)
+        return False
+
+
+class SerieContador:
+    __slots__ = ('valor', '_pendentes', '_lock')
+
+    def __init__(self):
+        self.valor = 0
+        self._pendentes: Deque[int] = deque()
+        self._lock = threading.Lock()
+
+    def incrementar(self, quantidade: int = 1) -> None:
+        self._pendentes.append(quantidade)
+        if len(self._pendentes) >= MAX_PENDENTES:
+            self._consolidar()
+
+    def _consolidar(self) -> None:
+        with self._lock:
+            pendentes = self._pendentes
+            while True:
+                try:
+                    self.valor += pendentes.popleft()
+                except IndexError:
+                    break
+
+    def zerar(self) -> None:
+        with self._lock:
+            self._pendentes.clear()
+            self.valor = 0
+
+    def instantaneo(self) -> Dict:
+        self._consolidar()
+        return {'valor': self.valor}
+
+
+class _Metrica(abc.ABC):
+    tipo = ''
+
+    def __init__(self, nome: str, ajuda: str, rotulo: Optional[str] = None):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulo = rotulo
+        self._series: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        registro_metricas.adicionar(self)
+
+    @abc.abstractmethod
+    def _nova_serie(self):
+        """Série vazia do tipo da métrica"""
+
+    def com(self, valor_rotulo: str = ''):
+        """Série do valor de rótulo; guarde o retorno para evitar a busca a cada observação"""
+        serie = self._series.get(valor_rotulo)
+        if serie is None:
+            with self._lock:
+                serie = self._series.setdefault(valor_rotulo, self._nova_serie())
+        return serie
+
+    def zerar(self) -> None:
+        for serie in list(self._series.values()):
+            serie.zerar()
+
+    def instantaneo(self) -> Dict:
+        return {
+            'tipo': self.tipo,
+            'ajuda': self.ajuda,
+            'rotulo': self.rotulo,
+            'series': {valor: serie.instantaneo() for valor, serie in list(self._series.items())},
+        }
+
+
+class Histograma(_Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nome: str, ajuda: str, rotulo: Optional[str] = None,
+                 limites: Tuple[float, ...] = LIMITES_PADRAO):
+        self.limites = tuple(sorted(limites))
+        super().__init__(nome, ajuda, rotulo)
+
+    def _nova_serie(self) -> SerieHistograma:
+        return SerieHistograma(self.limites)
+
+    def instantaneo(self) -> Dict:
+        dados = super().instantaneo()
+        dados['limites'] = list(self.limites)
+        return dados
+
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def _nova_serie(self) -> SerieContador:
+        return SerieContador()
+
+    def incrementar(self, valor_rotulo: str = '', quantidade: int = 1) -> None:
+        self.com(valor_rotulo).incrementar(quantidade)
+
+
+class RegistroMetricas:
+    """Métricas do processo e gravação dos instantâneos em arquivo"""
+
+    def __init__(self):
+        self.metricas: Dict[str, _Metrica] = {}
+        self.pasta: Optional[str] = None
+        self.intervalo = 5.0
+        self.token: Optional[str] = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._arquivo = None
+        # Processo dono dos valores em memória (depois do fork, os do pai são descartados)
+        self._pid_valores = os.getpid()
+        atexit.register(self.gravar)
+
+    def adicionar(self, metrica: _Metrica) -> None:
+        if metrica.nome in self.metricas:
+            raise ValueError(f"Métrica duplicada: {metrica.nome}")
+        self.metricas[metrica.nome] = metrica
+
+    def init_app(self, app) -> None:
+        """Lê METRICAS_PASTA, METRICAS_INTERVALO e METRICAS_TOKEN e registra ``/metrics``"""
+        self.pasta = app.config['METRICAS_PASTA']
+        self.intervalo = app.config['METRICAS_INTERVALO']
+        self.token = app.config.get('METRICAS_TOKEN')
+        os.makedirs(self.pasta, exist_ok=True)
+        app.before_request(self.iniciar)
+        app.register_blueprint(metricas_bp)
+
+    def iniciar(self) -> None:
+        """Inicia a thread de gravação, uma vez por processo (seguro após o fork do gunicorn)"""
+        if self._pid == os.getpid() or self.pasta is None:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid_valores != os.getpid():
+                # Worker criado por fork: os valores copiados pertencem ao processo mestre
+                for metrica in self.metricas.values():
+                    metrica.zerar()
+                self._pid_valores = os.getpid()
+            # Pid mais instante: um pid reutilizado não sobrescreve o arquivo de um processo antigo
+            self._arquivo = os.path.join(self.pasta, f"{os.getpid()}-{time.time_ns()}.json")
+            self._thread = threading.Thread(target=self._executar, name='metricas', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _executar(self) -> None:
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                self.gravar()
+            except OSError:
+                pass  # Tenta de novo no próximo intervalo
+
+    def instantaneo(self) -> Dict:
+        return {nome: metrica.instantaneo() for nome, metrica in self.metricas.items()}
+
+    def gravar(self) -> None:
+        """Grava o instantâneo deste processo (troca atômica do arquivo)"""
+        if self._pid != os.getpid() or self._arquivo is None:
+            return
+        temporario = f"{self._arquivo}.tmp"
+        with self._lock:  # A thread e /metrics podem gravar ao mesmo tempo
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
+                json.dump(self.instantaneo(), arquivo)
+            os.replace(temporario, self._arquivo)
+
+    def agregar(self) -> Dict:
+        """Soma os instantâneos de todos os processos gravados na pasta"""
+        total: Dict[str, Dict] = {}
+        for caminho in glob.glob(os.path.join(self.pasta, '*.json')):
+            try:
+                with open(caminho, 'r', encoding='utf-8') as arquivo:
+                    dados = json.load(arquivo)
+            except (OSError, ValueError):
+                continue  # Processo gravando ou arquivo removido no meio da leitura
+            for nome, metrica in dados.items():
+                destino = total.setdefault(nome, dict(metrica, series={}))
+                for valor, serie in metrica['series'].items():
+                    if valor not in destino['series']:
+                        destino['series'][valor] = copy.deepcopy(serie)
+                    elif metrica['tipo'] == 'histogram':
+                        acumulada = destino['series'][valor]
+                        acumulada['contagens'] = [a + b for a, b in zip(acumulada['contagens'], serie['contagens'])]
+                        acumulada['soma'] += serie['soma']
+                    else:
+                        destino['series'][valor]['valor'] += serie['valor']
+        return total
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _rotulos(pares: List[Tuple[str, str]]) -> str:
+    pares = [(chave, valor) for chave, valor in pares if chave]
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{chave}="{_escapar(valor)}"' for chave, valor in pares) + '}'
+
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def formatar_prometheus(dados: Dict) -> str:
+    """Formato de exposição em texto do Prometheus (versão 0.0.4)"""
+    linhas = []
+    for nome in sorted(dados):
+        metrica = dados[nome]
+        linhas.append(f"# HELP {nome} {metrica['ajuda']}")
+        linhas.append(f"# TYPE {nome} {metrica['tipo']}")
+        rotulo = metrica['rotulo']
+        for valor in sorted(metrica['series']):
+            serie = metrica['series'][valor]
+            if metrica['tipo'] == 'histogram':
+                acumulado = 0
+                for limite, contagem in zip(metrica['limites'] + ['+Inf'], serie['contagens']):
+                    acumulado += contagem
+                    le = limite if limite == '+Inf' else repr(float(limite))
+                    linhas.append(f"{nome}_bucket{_rotulos([(rotulo, valor), ('le', le)])} {acumulado}")
+                linhas.append(f"{nome}_sum{_rotulos([(rotulo, valor)])} {_numero(serie['soma'])}")
+                linhas.append(f"{nome}_count{_rotulos([(rotulo, valor)])} {acumulado}")
+            else:
+                linhas.append(f"{nome}{_rotulos([(rotulo, valor)])} {serie['valor']}")
+    return '\n'.join(linhas) + '\n'
+
+
+registro_metricas = RegistroMetricas()
+
+
+def cronometrar(serie: SerieHistograma):
+    """Decorador que observa a duração de cada chamada"""
+    def decorador(funcao):
+        @wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            inicio = perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                serie.observar(perf_counter() - inicio)
+        return envoltorio
+    return decorador
+
+
+@metricas_bp.route('/metrics')
+def exibir_metricas():
+    """Métricas somadas de todos os workers; com METRICAS_TOKEN exige ``Authorization: Bearer``"""
+    if registro_metricas.token:
+        recebido = request.headers.get('Authorization', '')
+        if not recebido.startswith('Bearer ') or not hmac.compare_digest(recebido[7:].encode(),
+                                                                         registro_metricas.token.encode()):
+            return jsonify({'success': False, 'message': 'Não autorizado'}), 401
+    try:
+        registro_metricas.gravar()
+    except OSError as e:
+        current_app.logger.warning(f"Não foi possível gravar as métricas do worker: {str(e)}")
+    return Response(formatar_prometheus(registro_metricas.agregar()), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+def limpar_instantaneos(pasta: str) -> None:
+    """Remove os instantâneos de execuções anteriores (chamado ao subir o servidor)"""
+    for caminho in glob.glob(os.path.join(pasta, '*.json*')):
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+
+# Métricas da aplicação
+FASES = Histograma('orcamentos_fase_segundos', 'Duração de cada fase do envio de orçamentos e e-mails', 'fase')
+FASE_REQUISICAO = FASES.com('requisicao')
+FASE_VALIDACAO = FASES.com('validacao')
+FASE_DNS = FASES.com('dns')
+FASE_BANCO = FASES.com('banco')
+FASE_EMAILS = FASES.com('emails')
+FASE_SMTP_CONEXAO = FASES.com('smtp_conexao')
+FASE_SMTP_ENVIO = FASES.com('smtp_envio')
+FASE_SMTP_VERIFICACAO = FASES.com('smtp_verificacao')
+
+ORCAMENTOS = Contador('orcamentos_envios_total', 'Envios do formulário de orçamento por resultado', 'resultado')
+FALHAS_VALIDACAO = Contador('orcamentos_validacao_falhas_total', 'Envios recusados por campo inválido', 'campo')
+EMAILS_ENVIADOS = Contador('emails_enviados_total', 'E-mails entregues ao servidor SMTP')
+EMAILS_FALHAS = Contador('emails_falhas_total', 'Falhas de envio de e-mail por tipo de erro', 'tipo')
+VERIFICACOES_SMTP = Contador('smtp_verificacoes_total', 'Verificações de saúde do servidor SMTP por resultado',
+                             'resultado')
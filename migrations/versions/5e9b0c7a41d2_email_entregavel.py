@@ -0,0 +1,26 @@
+"""marca de entregabilidade do e-mail no orçamento
+
+Revision ID: 5e9b0c7a41d2
+Revises: c3d81f5a2e47
+Create Date: 2026-10-17 10:03:55.417230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e9b0c7a41d2'
+down_revision = 'c3d81f5a2e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orcamentos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('email_entregavel', sa.Boolean(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('orcamentos', schema=None) as batch_op:
+        batch_op.drop_column('email_entregavel')
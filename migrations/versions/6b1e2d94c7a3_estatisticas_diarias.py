@@ -0,0 +1,42 @@
+"""estatísticas diárias de orçamentos
+
+Revision ID: 6b1e2d94c7a3
+Revises: f41c7e92ab58
+Create Date: 2026-10-17 15:41:08.512203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b1e2d94c7a3'
+down_revision = 'f41c7e92ab58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('estatisticas_diarias',
+    sa.Column('dia', sa.Date(), nullable=False),
+    sa.Column('produto', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('uf', sa.String(length=2), nullable=False),
+    sa.Column('cor', sa.String(length=50), nullable=False),
+    sa.Column('orcamentos', sa.Integer(), nullable=False),
+    sa.Column('unidades', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('dia', 'produto', 'status', 'uf', 'cor')
+    )
+
+    # Carrega os orçamentos já existentes; os antigos sem data_criacao ficam de fora
+    dia = 'date(data_criacao)' if op.get_bind().dialect.name == 'sqlite' else 'CAST(data_criacao AS DATE)'
+    op.execute(
+        "INSERT INTO estatisticas_diarias (dia, produto, status, uf, cor, orcamentos, unidades) "
+        f"SELECT {dia}, produto, status, uf, COALESCE(cor, ''), COUNT(*), SUM(quantidade) "
+        "FROM orcamentos WHERE data_criacao IS NOT NULL "
+        f"GROUP BY {dia}, produto, status, uf, COALESCE(cor, '')"
+    )
+
+
+def downgrade():
+    op.drop_table('estatisticas_diarias')
@@ -0,0 +1,35 @@
+"""chaves de idempotência do envio de orçamentos
+
+Revision ID: 8a2f6d3c90b1
+Revises: 5e9b0c7a41d2
+Create Date: 2026-10-17 11:20:08.553921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a2f6d3c90b1'
+down_revision = '5e9b0c7a41d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('chaves_idempotencia',
+    sa.Column('chave', sa.String(length=64), nullable=False),
+    sa.Column('orcamento_id', sa.Integer(), nullable=False),
+    sa.Column('data_criacao', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['orcamento_id'], ['orcamentos.id'], ),
+    sa.PrimaryKeyConstraint('chave')
+    )
+    with op.batch_alter_table('chaves_idempotencia', schema=None) as batch_op:
+        batch_op.create_index('idx_idempotencia_data', ['data_criacao'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('chaves_idempotencia', schema=None) as batch_op:
+        batch_op.drop_index('idx_idempotencia_data')
+
+    op.drop_table('chaves_idempotencia')
@@ -0,0 +1,68 @@
+"""data_criacao obrigatória nos orçamentos
+
+Revision ID: 9fd2e7a91cc1
+Revises: e2b7f9046c1d
+Create Date: 2026-10-17 21:05:37.618420
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9fd2e7a91cc1'
+down_revision = 'e2b7f9046c1d'
+branch_labels = None
+depends_on = None
+
+# Gatilhos da busca textual (d7c40a1e5f86), refeitos porque o batch do SQLite recria a tabela
+COLUNAS_BUSCA = 'nome, email, cidade, estampa, observacoes'
+NOVOS = 'new.nome, new.email, new.cidade, new.estampa, new.observacoes'
+ANTIGOS = 'old.nome, old.email, old.cidade, old.estampa, old.observacoes'
+GATILHOS_BUSCA = (
+    "CREATE TRIGGER orcamentos_busca_ai AFTER INSERT ON orcamentos BEGIN "
+    f"INSERT INTO orcamentos_busca(rowid, {COLUNAS_BUSCA}) VALUES (new.id, {NOVOS}); END",
+    "CREATE TRIGGER orcamentos_busca_ad AFTER DELETE ON orcamentos BEGIN "
+    f"INSERT INTO orcamentos_busca(orcamentos_busca, rowid, {COLUNAS_BUSCA}) VALUES ('delete', old.id, {ANTIGOS}); END",
+    f"CREATE TRIGGER orcamentos_busca_au AFTER UPDATE OF {COLUNAS_BUSCA} ON orcamentos BEGIN "
+    f"INSERT INTO orcamentos_busca(orcamentos_busca, rowid, {COLUNAS_BUSCA}) VALUES ('delete', old.id, {ANTIGOS}); "
+    f"INSERT INTO orcamentos_busca(rowid, {COLUNAS_BUSCA}) VALUES (new.id, {NOVOS}); END",
+)
+
+
+def _alterar_nulidade(nullable):
+    with op.batch_alter_table('orcamentos', schema=None) as batch_op:
+        batch_op.alter_column('data_criacao', existing_type=sa.DateTime(), nullable=nullable)
+    if op.get_bind().dialect.name == 'sqlite':
+        for gatilho in GATILHOS_BUSCA:
+            op.execute(gatilho)
+        op.execute("INSERT INTO orcamentos_busca(orcamentos_busca) VALUES ('rebuild')")
+
+
+def upgrade():
+    # Orçamentos antigos sem data: os ids são sequenciais, então recebem a data do
+    # próximo orçamento datado (ou a do anterior, ou a de agora, se não houver)
+    op.execute(
+        "UPDATE orcamentos SET data_criacao = COALESCE("
+        "(SELECT MIN(o.data_criacao) FROM orcamentos o WHERE o.id > orcamentos.id), "
+        "(SELECT MAX(o.data_criacao) FROM orcamentos o WHERE o.id < orcamentos.id), "
+        "CURRENT_TIMESTAMP) "
+        "WHERE data_criacao IS NULL"
+    )
+
+    # Agora datados, entram nas estatísticas diárias (6b1e2d94c7a3 os deixou de fora)
+    dia = 'date(data_criacao)' if op.get_bind().dialect.name == 'sqlite' else 'CAST(data_criacao AS DATE)'
+    op.execute("DELETE FROM estatisticas_diarias")
+    op.execute(
+        "INSERT INTO estatisticas_diarias (dia, produto, status, uf, cor, orcamentos, unidades) "
+        f"SELECT {dia}, produto, status, uf, COALESCE(cor, ''), COUNT(*), SUM(quantidade) "
+        "FROM (SELECT data_criacao, produto, status, uf, cor, quantidade FROM orcamentos "
+        "UNION ALL SELECT data_criacao, produto, status, uf, cor, quantidade FROM orcamentos_arquivados) AS todos "
+        f"GROUP BY {dia}, produto, status, uf, COALESCE(cor, '')"
+    )
+
+    _alterar_nulidade(False)
+
+
+def downgrade():
+    _alterar_nulidade(True)
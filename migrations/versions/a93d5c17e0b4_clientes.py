@@ -0,0 +1,84 @@
+"""clientes normalizados pelo e-mail
+
+Revision ID: a93d5c17e0b4
+Revises: d7c40a1e5f86
+Create Date: 2026-10-17 18:22:45.190377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a93d5c17e0b4'
+down_revision = 'd7c40a1e5f86'
+branch_labels = None
+depends_on = None
+
+# Gatilhos da busca textual (d7c40a1e5f86), refeitos se a tabela for recriada
+COLUNAS_BUSCA = 'nome, email, cidade, estampa, observacoes'
+NOVOS = 'new.nome, new.email, new.cidade, new.estampa, new.observacoes'
+ANTIGOS = 'old.nome, old.email, old.cidade, old.estampa, old.observacoes'
+GATILHOS_BUSCA = (
+    "CREATE TRIGGER orcamentos_busca_ai AFTER INSERT ON orcamentos BEGIN "
+    f"INSERT INTO orcamentos_busca(rowid, {COLUNAS_BUSCA}) VALUES (new.id, {NOVOS}); END",
+    "CREATE TRIGGER orcamentos_busca_ad AFTER DELETE ON orcamentos BEGIN "
+    f"INSERT INTO orcamentos_busca(orcamentos_busca, rowid, {COLUNAS_BUSCA}) VALUES ('delete', old.id, {ANTIGOS}); END",
+    f"CREATE TRIGGER orcamentos_busca_au AFTER UPDATE OF {COLUNAS_BUSCA} ON orcamentos BEGIN "
+    f"INSERT INTO orcamentos_busca(orcamentos_busca, rowid, {COLUNAS_BUSCA}) VALUES ('delete', old.id, {ANTIGOS}); "
+    f"INSERT INTO orcamentos_busca(rowid, {COLUNAS_BUSCA}) VALUES (new.id, {NOVOS}); END",
+)
+
+
+def upgrade():
+    op.create_table('clientes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('nome', sa.String(length=100), nullable=False),
+    sa.Column('telefone', sa.String(length=20), nullable=False),
+    sa.Column('rua', sa.String(length=100), nullable=False),
+    sa.Column('numero', sa.String(length=10), nullable=False),
+    sa.Column('complemento', sa.String(length=100), nullable=True),
+    sa.Column('bairro', sa.String(length=100), nullable=False),
+    sa.Column('cidade', sa.String(length=100), nullable=False),
+    sa.Column('uf', sa.String(length=2), nullable=False),
+    sa.Column('cep', sa.String(length=10), nullable=False),
+    sa.Column('data_criacao', sa.DateTime(), nullable=False),
+    sa.Column('data_atualizacao', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email')
+    )
+    # No SQLite o batch recriaria a tabela (e perderia os gatilhos da busca); o
+    # ADD COLUMN com REFERENCES é aceito quando a coluna começa nula
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('ALTER TABLE orcamentos ADD COLUMN cliente_id INTEGER REFERENCES clientes (id)')
+    else:
+        op.add_column('orcamentos', sa.Column('cliente_id', sa.Integer(), sa.ForeignKey('clientes.id'), nullable=True))
+    op.create_index('idx_orcamento_cliente_data_id', 'orcamentos', ['cliente_id', 'data_criacao', 'id'], unique=False)
+
+    # Um cliente por e-mail em minúsculas, com os dados do orçamento mais recente
+    op.execute(
+        "INSERT INTO clientes (email, nome, telefone, rua, numero, complemento, bairro, cidade, uf, cep, "
+        "data_criacao, data_atualizacao) "
+        "SELECT email, nome, telefone, rua, numero, complemento, bairro, cidade, uf, cep, primeiro, data_criacao "
+        "FROM (SELECT lower(email) AS email, nome, telefone, rua, numero, complemento, bairro, cidade, uf, cep, "
+        "data_criacao, "
+        "MIN(data_criacao) OVER (PARTITION BY lower(email)) AS primeiro, "
+        "ROW_NUMBER() OVER (PARTITION BY lower(email) ORDER BY data_criacao DESC, id DESC) AS ordem "
+        "FROM orcamentos) AS recentes "
+        "WHERE ordem = 1"
+    )
+    op.execute(
+        "UPDATE orcamentos SET cliente_id = "
+        "(SELECT clientes.id FROM clientes WHERE clientes.email = lower(orcamentos.email))"
+    )
+
+
+def downgrade():
+    op.drop_index('idx_orcamento_cliente_data_id', table_name='orcamentos')
+    with op.batch_alter_table('orcamentos', schema=None) as batch_op:
+        batch_op.drop_column('cliente_id')
+    if op.get_bind().dialect.name == 'sqlite':
+        for gatilho in GATILHOS_BUSCA:
+            op.execute(gatilho)
+    op.drop_table('clientes')
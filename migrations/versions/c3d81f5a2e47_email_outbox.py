@@ -0,0 +1,45 @@
+"""fila de saída de e-mails
+
+Revision ID: c3d81f5a2e47
+Revises: 91f3a9bfdf0b
+Create Date: 2026-10-17 09:12:41.208514
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d81f5a2e47'
+down_revision = '91f3a9bfdf0b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('email_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('orcamento_id', sa.Integer(), nullable=True),
+    sa.Column('destinatarios', sa.Text(), nullable=False),
+    sa.Column('assunto', sa.String(length=200), nullable=False),
+    sa.Column('template', sa.String(length=50), nullable=False),
+    sa.Column('contexto', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('tentativas', sa.Integer(), nullable=False),
+    sa.Column('proxima_tentativa', sa.DateTime(), nullable=False),
+    sa.Column('ultimo_erro', sa.Text(), nullable=True),
+    sa.Column('data_criacao', sa.DateTime(), nullable=False),
+    sa.Column('data_envio', sa.DateTime(), nullable=True),
+    sa.CheckConstraint("status IN ('pendente', 'enviando', 'enviado', 'falhou')", name='check_outbox_status_valido'),
+    sa.ForeignKeyConstraint(['orcamento_id'], ['orcamentos.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('email_outbox', schema=None) as batch_op:
+        batch_op.create_index('idx_outbox_status_proxima', ['status', 'proxima_tentativa'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('email_outbox', schema=None) as batch_op:
+        batch_op.drop_index('idx_outbox_status_proxima')
+
+    op.drop_table('email_outbox')
@@ -0,0 +1,52 @@
+"""busca textual de orçamentos (FTS5)
+
+Revision ID: d7c40a1e5f86
+Revises: 6b1e2d94c7a3
+Create Date: 2026-10-17 16:58:21.734019
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7c40a1e5f86'
+down_revision = '6b1e2d94c7a3'
+branch_labels = None
+depends_on = None
+
+COLUNAS = 'nome, email, cidade, estampa, observacoes'
+NOVOS = 'new.nome, new.email, new.cidade, new.estampa, new.observacoes'
+ANTIGOS = 'old.nome, old.email, old.cidade, old.estampa, old.observacoes'
+
+
+def upgrade():
+    # FTS5 só existe no SQLite
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        f"CREATE VIRTUAL TABLE orcamentos_busca USING fts5({COLUNAS}, content='orcamentos', "
+        "content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    op.execute(
+        "CREATE TRIGGER orcamentos_busca_ai AFTER INSERT ON orcamentos BEGIN "
+        f"INSERT INTO orcamentos_busca(rowid, {COLUNAS}) VALUES (new.id, {NOVOS}); END"
+    )
+    op.execute(
+        "CREATE TRIGGER orcamentos_busca_ad AFTER DELETE ON orcamentos BEGIN "
+        f"INSERT INTO orcamentos_busca(orcamentos_busca, rowid, {COLUNAS}) VALUES ('delete', old.id, {ANTIGOS}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER orcamentos_busca_au AFTER UPDATE OF {COLUNAS} ON orcamentos BEGIN "
+        f"INSERT INTO orcamentos_busca(orcamentos_busca, rowid, {COLUNAS}) VALUES ('delete', old.id, {ANTIGOS}); "
+        f"INSERT INTO orcamentos_busca(rowid, {COLUNAS}) VALUES (new.id, {NOVOS}); END"
+    )
+    op.execute("INSERT INTO orcamentos_busca(orcamentos_busca) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute('DROP TRIGGER orcamentos_busca_au')
+    op.execute('DROP TRIGGER orcamentos_busca_ad')
+    op.execute('DROP TRIGGER orcamentos_busca_ai')
+    op.execute('DROP TABLE orcamentos_busca')
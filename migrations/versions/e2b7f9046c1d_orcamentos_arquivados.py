@@ -0,0 +1,42 @@
+"""índice dos orçamentos arquivados
+
+Revision ID: e2b7f9046c1d
+Revises: a93d5c17e0b4
+Create Date: 2026-10-17 19:12:44.207815
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7f9046c1d'
+down_revision = 'a93d5c17e0b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('orcamentos_arquivados',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cliente_id', sa.Integer(), nullable=True),
+    sa.Column('data_criacao', sa.DateTime(), nullable=False),
+    sa.Column('produto', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('uf', sa.String(length=2), nullable=False),
+    sa.Column('cor', sa.String(length=50), nullable=True),
+    sa.Column('quantidade', sa.Integer(), nullable=False),
+    sa.Column('arquivo', sa.String(length=30), nullable=False),
+    sa.Column('deslocamento', sa.BigInteger(), nullable=False),
+    sa.Column('data_arquivamento', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('orcamentos_arquivados', schema=None) as batch_op:
+        batch_op.create_index('idx_arquivado_cliente', ['cliente_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('orcamentos_arquivados', schema=None) as batch_op:
+        batch_op.drop_index('idx_arquivado_cliente')
+
+    op.drop_table('orcamentos_arquivados')
@@ -0,0 +1,31 @@
+"""índices da listagem administrativa de orçamentos
+
+Revision ID: f41c7e92ab58
+Revises: 8a2f6d3c90b1
+Create Date: 2026-10-17 12:02:47.301166
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f41c7e92ab58'
+down_revision = '8a2f6d3c90b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orcamentos', schema=None) as batch_op:
+        batch_op.create_index('idx_orcamento_data_id', ['data_criacao', 'id'], unique=False)
+        batch_op.create_index('idx_orcamento_status_data_id', ['status', 'data_criacao', 'id'], unique=False)
+        batch_op.create_index('idx_orcamento_produto_data_id', ['produto', 'data_criacao', 'id'], unique=False)
+        batch_op.create_index('idx_orcamento_uf_data_id', ['uf', 'data_criacao', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('orcamentos', schema=None) as batch_op:
+        batch_op.drop_index('idx_orcamento_uf_data_id')
+        batch_op.drop_index('idx_orcamento_produto_data_id')
+        batch_op.drop_index('idx_orcamento_status_data_id')
+        batch_op.drop_index('idx_orcamento_data_id')
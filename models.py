@@ -1,12 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import CheckConstraint, func
+from sqlalchemy import CheckConstraint
 from sqlalchemy.orm import validates
-import re
 from datetime import datetime, timezone
-import phonenumbers
-from email_validator import validate_email, EmailNotValidError
 from flask import current_app
 
+from validacao import validar_cep, validar_email, validar_quantidade, validar_telefone, validar_uf
+
 db = SQLAlchemy()
 
 
@@ -14,6 +13,7 @@ class Orcamento(db.Model):
     __tablename__ = 'orcamentos'
 
     id = db.Column(db.Integer, primary_key=True)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id'))  # Preenchido na gravação (ver clientes.py)
     nome = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), nullable=False)
     telefone = db.Column(db.String(20), nullable=False)
@@ -34,6 +34,7 @@ class Orcamento(db.Model):
     data_criacao = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     ip_cliente = db.Column(db.String(45))
     status = db.Column(db.String(20), nullable=False, default='pendente')
+    email_entregavel = db.Column(db.Boolean)  # None enquanto a verificação DNS não terminou
 
     __table_args__ = (
         CheckConstraint('quantidade > 0', name='check_quantidade_positiva'),
@@ -44,79 +45,44 @@ class Orcamento(db.Model):
             "status IN ('pendente', 'processando', 'concluido', 'cancelado')",
             name='check_status_valido'),
         db.Index('idx_orcamento_email_produto', 'email', 'produto'),
+        # Listagem administrativa: filtro opcional + ordem por (data_criacao, id)
+        db.Index('idx_orcamento_data_id', 'data_criacao', 'id'),
+        db.Index('idx_orcamento_status_data_id', 'status', 'data_criacao', 'id'),
+        db.Index('idx_orcamento_produto_data_id', 'produto', 'data_criacao', 'id'),
+        db.Index('idx_orcamento_uf_data_id', 'uf', 'data_criacao', 'id'),
+        # Histórico do cliente, na mesma ordem da listagem
+        db.Index('idx_orcamento_cliente_data_id', 'cliente_id', 'data_criacao', 'id'),
     )
 
+    # Normalização compartilhada com a rota e a importação (ver validacao.py)
     @validates('email')
     def validate_email(self, key, email):
-        current_app.logger.info(f"Validando e-mail: {email}")
-        try:
-            v = validate_email(email)
-            current_app.logger.info(f"E-mail validado: {v.email}")
-            return v.email
-        except EmailNotValidError as e:
-            current_app.logger.error(f"Email inválido: {email} - Erro: {str(e)}")
-            raise ValueError("Por favor, insira um endereço de email válido")
+        # No modo assíncrono só a sintaxe (e o cache de domínios) é verificada aqui
+        verificar_dns = current_app.config.get('EMAIL_VERIFICACAO_DNS', 'sincrona') == 'sincrona'
+        normalizado, self.email_entregavel = validar_email(email, verificar_dns)
+        return normalizado
 
     @validates('telefone')
     def validate_telefone(self, key, telefone):
-        try:
-            # Remove caracteres não numéricos
-            telefone_limpo = re.sub(r'[^\d]', '', telefone)
-
-            # Verifica se tem o número mínimo de dígitos (10 para fixo, 11 para celular)
-            if len(telefone_limpo) not in [10, 11]:
-                raise ValueError("Número de telefone deve ter 10 ou 11 dígitos")
-
-            # Formata o telefone
-            if len(telefone_limpo) == 10:
-                return f"({telefone_limpo[:2]}) {telefone_limpo[2:6]}-{telefone_limpo[6:]}"
-            else:
-                return f"({telefone_limpo[:2]}) {telefone_limpo[2:7]}-{telefone_limpo[7:]}"
-
-        except Exception as e:
-            current_app.logger.error(f"Telefone inválido: {telefone} - Erro: {str(e)}")
-            raise ValueError("Por favor, insira um número de telefone válido (XX) XXXX-XXXX ou (XX) XXXXX-XXXX")
+        return validar_telefone(telefone)
 
     @validates('cep')
     def validate_cep(self, key, cep):
-        try:
-            # Remove caracteres não numéricos
-            cep_limpo = re.sub(r'[^\d]', '', cep)
-
-            if len(cep_limpo) != 8:
-                raise ValueError("CEP deve conter 8 dígitos")
-
-            return f"{cep_limpo[:5]}-{cep_limpo[5:]}"
-
-        except Exception as e:
-            current_app.logger.error(f"CEP inválido: {cep} - Erro: {str(e)}")
-            raise ValueError("Por favor, insira um CEP válido no formato XXXXX-XXX")
+        return validar_cep(cep)
 
     @validates('quantidade')
     def validate_quantidade(self, key, quantidade):
-        try:
-            qtd = int(quantidade)
-            if qtd <= 0:
-                raise ValueError("Quantidade deve ser maior que zero")
-            return qtd
-        except ValueError as e:
-            current_app.logger.error(f"Quantidade inválida: {quantidade} - Erro: {str(e)}")
-            raise ValueError("Por favor, insira uma quantidade válida (número inteiro positivo)")
+        return validar_quantidade(quantidade)
 
     @validates('uf')
     def validate_uf(self, key, uf):
-        ufs_validas = ['AC', 'AL', 'AP', 'AM', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MT',
-                       'MS', 'MG', 'PA', 'PB', 'PR', 'PE', 'PI', 'RJ', 'RN', 'RS', 'RO',
-                       'RR', 'SC', 'SP', 'SE', 'TO']
-        if uf.upper() not in ufs_validas:
-            current_app.logger.error(f"UF inválida: {uf}")
-            raise ValueError("Por favor, selecione uma UF válida")
-        return uf.upper()
+        return validar_uf(uf)
 
     def to_dict(self):
         """Converte o objeto para dicionário"""
         return {
             'id': self.id,
+            'cliente_id': self.cliente_id,
             'nome': self.nome,
             'email': self.email,
             'telefone': self.telefone,
@@ -149,4 +115,153 @@ class Orcamento(db.Model):
 
     def __repr__(self):
         return (f'<Orcamento(id={self.id}, nome={self.nome}, produto={self.produto}, '
-                f'quantidade={self.quantidade}, status={self.status})>')
\ No newline at end of file
+                f'quantidade={self.quantidade}, status={self.status})>')
+
+
+class Cliente(db.Model):
+    """
+    Cliente identificado pelo e-mail normalizado (minúsculas). Nome, telefone e
+    endereço são os do orçamento mais recente; cada orçamento guarda os seus
+    como endereço de entrega.
+    """
+    __tablename__ = 'clientes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(100), nullable=False, unique=True)
+    nome = db.Column(db.String(100), nullable=False)
+    telefone = db.Column(db.String(20), nullable=False)
+    rua = db.Column(db.String(100), nullable=False)
+    numero = db.Column(db.String(10), nullable=False)
+    complemento = db.Column(db.String(100))
+    bairro = db.Column(db.String(100), nullable=False)
+    cidade = db.Column(db.String(100), nullable=False)
+    uf = db.Column(db.String(2), nullable=False)
+    cep = db.Column(db.String(10), nullable=False)
+    data_criacao = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    data_atualizacao = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'email': self.email,
+            'nome': self.nome,
+            'telefone': self.telefone,
+            'endereco': {
+                'rua': self.rua,
+                'numero': self.numero,
+                'complemento': self.complemento,
+                'bairro': self.bairro,
+                'cidade': self.cidade,
+                'uf': self.uf,
+                'cep': self.cep
+            },
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None,
+            'data_atualizacao': self.data_atualizacao.isoformat() if self.data_atualizacao else None
+        }
+
+    def __repr__(self):
+        return f'<Cliente(id={self.id}, email={self.email}, nome={self.nome})>'
+
+
+class OrcamentoArquivado(db.Model):
+    """
+    Índice dos orçamentos movidos para o arquivo compactado (ver arquivo.py).
+    Guarda onde está a linha e as dimensões das estatísticas diárias.
+    """
+    __tablename__ = 'orcamentos_arquivados'
+
+    id = db.Column(db.Integer, primary_key=True)  # id original do orçamento
+    cliente_id = db.Column(db.Integer)
+    data_criacao = db.Column(db.DateTime, nullable=False)
+    produto = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    uf = db.Column(db.String(2), nullable=False)
+    cor = db.Column(db.String(50))
+    quantidade = db.Column(db.Integer, nullable=False)
+    arquivo = db.Column(db.String(30), nullable=False)  # 'AAAA-MM.ndjson.gz'
+    deslocamento = db.Column(db.BigInteger, nullable=False)  # Início do bloco gzip com a linha
+    data_arquivamento = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        db.Index('idx_arquivado_cliente', 'cliente_id'),
+    )
+
+    def __repr__(self):
+        return f'<OrcamentoArquivado(id={self.id}, arquivo={self.arquivo}, deslocamento={self.deslocamento})>'
+
+
+class EmailPendente(db.Model):
+    """Mensagem de e-mail aguardando envio pela fila de saída (outbox)"""
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    orcamento_id = db.Column(db.Integer, db.ForeignKey('orcamentos.id'))
+    destinatarios = db.Column(db.Text, nullable=False)  # Lista JSON de e-mails
+    assunto = db.Column(db.String(200), nullable=False)
+    template = db.Column(db.String(50), nullable=False)  # Nome do template ('cliente', 'admin')
+    contexto = db.Column(db.Text, nullable=False, default='{}')  # Variáveis do template em JSON
+    status = db.Column(db.String(20), nullable=False, default='pendente')
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    proxima_tentativa = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    ultimo_erro = db.Column(db.Text)
+    data_criacao = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    data_envio = db.Column(db.DateTime)
+
+    __table_args__ = (
+        CheckConstraint(
+            "status IN ('pendente', 'enviando', 'enviado', 'falhou')",
+            name='check_outbox_status_valido'),
+        db.Index('idx_outbox_status_proxima', 'status', 'proxima_tentativa'),
+    )
+
+    def __repr__(self):
+        return (f'<EmailPendente(id={self.id}, template={self.template}, '
+                f'status={self.status}, tentativas={self.tentativas})>')
+
+
+class ChaveIdempotencia(db.Model):
+    """Chave enviada pelo formulário para que reenvios não criem orçamentos duplicados"""
+    __tablename__ = 'chaves_idempotencia'
+
+    chave = db.Column(db.String(64), primary_key=True)
+    orcamento_id = db.Column(db.Integer, db.ForeignKey('orcamentos.id'), nullable=False)
+    data_criacao = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        db.Index('idx_idempotencia_data', 'data_criacao'),
+    )
+
+    def __repr__(self):
+        return f'<ChaveIdempotencia(chave={self.chave}, orcamento_id={self.orcamento_id})>'
+
+
+class EstatisticaDiaria(db.Model):
+    """
+    Contagem de orçamentos e unidades por dia e dimensão, mantida a cada
+    inserção ou mudança de status (ver estatisticas.py). ``cor`` vazia
+    representa orçamentos sem cor.
+    """
+    __tablename__ = 'estatisticas_diarias'
+
+    dia = db.Column(db.Date, primary_key=True)
+    produto = db.Column(db.String(50), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    uf = db.Column(db.String(2), primary_key=True)
+    cor = db.Column(db.String(50), primary_key=True, default='')
+    orcamentos = db.Column(db.Integer, nullable=False, default=0)
+    unidades = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'dia': self.dia.isoformat(),
+            'produto': self.produto,
+            'status': self.status,
+            'uf': self.uf,
+            'cor': self.cor or None,
+            'orcamentos': self.orcamentos,
+            'unidades': self.unidades,
+        }
+
+    def __repr__(self):
+        return (f'<EstatisticaDiaria(dia={self.dia}, produto={self.produto}, status={self.status}, '
+                f'uf={self.uf}, cor={self.cor}, orcamentos={self.orcamentos})>')
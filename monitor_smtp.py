@@ -0,0 +1,199 @@
+"""
+Verificação de saúde do servidor SMTP em segundo plano.
+
+Uma thread por processo (worker do gunicorn) verifica o SMTP a cada
+``SMTP_MONITOR_INTERVALO`` segundos, com variação aleatória de
+±``SMTP_MONITOR_JITTER`` para que os workers não batam no servidor juntos, e
+guarda o resultado em memória: disponibilidade, instantes da última
+verificação, do último sucesso e da última falha, latência e erro.
+
+``/test_smtp`` só lê esse estado, então o monitor de uptime pode chamá-lo
+com a frequência que quiser sem abrir sessões SMTP nem esperar por elas.
+Sem a thread (``SMTP_MONITOR=false``) a leitura dispara no máximo uma
+verificação por intervalo, também em segundo plano, e responde com o estado
+que já houver.
+
+O servidor fica indisponível na primeira falha se nunca respondeu, ou após
+``FALHAS_PARA_INDISPONIVEL`` falhas seguidas se já esteve disponível. O envio
+de e-mails consulta ``exigir_disponivel()`` e falha na hora, sem esperar o
+timeout do socket; estado antigo demais (thread parada) ou desconhecido não
+bloqueia o envio. Depois de uma falha a próxima verificação vem em um quarto
+do intervalo.
+
+A verificação em si é uma função recebida no construtor (em ``app.py``, uma
+sessão SMTP à parte do pool, com timeout curto).
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, NamedTuple, Optional
+
+from metricas import FASE_SMTP_VERIFICACAO, VERIFICACOES_SMTP
+
+FALHAS_PARA_INDISPONIVEL = 2
+
+
+class SMTPIndisponivel(Exception):
+    """O monitor indica que o servidor SMTP está fora do ar"""
+
+
+class EstadoSMTP(NamedTuple):
+    disponivel: Optional[bool] = None  # None antes da primeira verificação
+    verificado_em: Optional[datetime] = None
+    ultimo_sucesso: Optional[datetime] = None
+    ultima_falha: Optional[datetime] = None
+    latencia: Optional[float] = None  # Segundos da última verificação
+    erro: Optional[str] = None
+    falhas_seguidas: int = 0
+
+    def to_dict(self) -> Dict:
+        def data(valor: Optional[datetime]) -> Optional[str]:
+            return valor.isoformat() if valor else None
+        return {
+            'disponivel': self.disponivel,
+            'verificado_em': data(self.verificado_em),
+            'ultimo_sucesso': data(self.ultimo_sucesso),
+            'ultima_falha': data(self.ultima_falha),
+            'latencia_ms': round(self.latencia * 1000, 1) if self.latencia is not None else None,
+            'erro': self.erro,
+            'falhas_seguidas': self.falhas_seguidas,
+        }
+
+
+class MonitorSMTP:
+    """Thread de fundo que verifica o SMTP e guarda o último estado"""
+
+    def __init__(self, app=None, verificar: Callable[[], None] = None, intervalo: float = 60.0,
+                 jitter: float = 0.2):
+        """
+        Args:
+            app: Aplicação Flask
+            verificar: Função que levanta exceção se o SMTP não responder
+            intervalo: Segundos entre verificações
+            jitter: Variação relativa do intervalo (0.2 = ±20%)
+        """
+        self.app = app
+        self.verificar_smtp = verificar
+        self.intervalo = intervalo
+        self.jitter = jitter
+        self._estado = EstadoSMTP()
+        self._verificado_monotonic: Optional[float] = None
+        self._lock = threading.Lock()
+        self._avulsa = threading.Lock()  # Verificação disparada por consultar()
+        self._thread = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Liga o monitor à aplicação, lendo SMTP_MONITOR_INTERVALO e SMTP_MONITOR_JITTER"""
+        self.app = app
+        self.intervalo = app.config.get('SMTP_MONITOR_INTERVALO', self.intervalo)
+        self.jitter = app.config.get('SMTP_MONITOR_JITTER', self.jitter)
+
+    @property
+    def estado(self) -> EstadoSMTP:
+        return self._estado
+
+    def ativo(self) -> bool:
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def iniciar(self) -> None:
+        """Inicia a thread, uma vez por processo (seguro após o fork do gunicorn)"""
+        if self.ativo():
+            return
+        with self._lock:
+            if self.ativo():
+                return
+            # O estado herdado do processo mestre não vale para este processo
+            self._estado, self._verificado_monotonic = EstadoSMTP(), None
+            self._thread = threading.Thread(target=self._executar, name='monitor-smtp', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _proxima_espera(self) -> float:
+        base = self.intervalo / 4 if self._estado.falhas_seguidas else self.intervalo
+        return base * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _verificar_no_contexto(self) -> None:
+        try:
+            with self.app.app_context():
+                self.verificar()
+        except Exception as e:
+            self.app.logger.error(f"Erro no monitor SMTP: {str(e)}", exc_info=True)
+
+    def _executar(self) -> None:
+        # Primeira verificação logo após subir, espalhada entre os workers
+        time.sleep(random.uniform(0, min(2.0, self.intervalo * self.jitter)))
+        while True:
+            self._verificar_no_contexto()
+            time.sleep(self._proxima_espera())
+
+    def _executar_avulsa(self) -> None:
+        try:
+            self._verificar_no_contexto()
+        finally:
+            self._avulsa.release()
+
+    def verificar(self) -> EstadoSMTP:
+        """Executa uma verificação agora e atualiza o estado"""
+        inicio = time.perf_counter()
+        erro = None
+        try:
+            self.verificar_smtp()
+        except Exception as e:
+            erro = f"{type(e).__name__}: {e}"
+        latencia = time.perf_counter() - inicio
+        FASE_SMTP_VERIFICACAO.observar(latencia)
+        VERIFICACOES_SMTP.incrementar('falha' if erro else 'sucesso')
+
+        agora = datetime.now(timezone.utc)
+        anterior = self._estado
+        if erro is None:
+            estado = anterior._replace(disponivel=True, verificado_em=agora, ultimo_sucesso=agora,
+                                       latencia=latencia, erro=None, falhas_seguidas=0)
+        else:
+            falhas = anterior.falhas_seguidas + 1
+            # Só um servidor que já respondeu tem direito a falhas isoladas
+            disponivel = bool(anterior.disponivel) and falhas < FALHAS_PARA_INDISPONIVEL
+            estado = anterior._replace(disponivel=disponivel, verificado_em=agora, ultima_falha=agora,
+                                       latencia=latencia, erro=erro, falhas_seguidas=falhas)
+        self._estado, self._verificado_monotonic = estado, time.monotonic()
+
+        if anterior.disponivel is not False and estado.disponivel is False:
+            self.app.logger.warning(f"SMTP indisponível após {estado.falhas_seguidas} verificação(ões): {erro}")
+        elif anterior.disponivel is False and estado.disponivel:
+            self.app.logger.info(f"SMTP disponível novamente ({latencia * 1000:.0f} ms)")
+        return estado
+
+    def atual(self) -> bool:
+        """O estado é de uma verificação recente (até três intervalos atrás)"""
+        verificado = self._verificado_monotonic
+        return verificado is not None and time.monotonic() - verificado <= 3 * self.intervalo
+
+    def consultar(self) -> EstadoSMTP:
+        """
+        Estado para o endpoint de saúde, sem nunca esperar pelo SMTP.
+
+        Sem a thread (SMTP_MONITOR=false, ou antes de ela subir no worker) e
+        com o estado vencido, dispara uma verificação em segundo plano, uma
+        de cada vez; a resposta é o estado atual, que pode ser o desconhecido.
+        """
+        if not self.ativo():
+            verificado = self._verificado_monotonic
+            vencido = verificado is None or time.monotonic() - verificado > self.intervalo
+            if vencido and self._avulsa.acquire(blocking=False):
+                threading.Thread(target=self._executar_avulsa, name='monitor-smtp-avulsa', daemon=True).start()
+        return self._estado
+
+    def permite_envio(self) -> bool:
+        """False só quando as últimas verificações, recentes, falharam"""
+        return not (self._estado.disponivel is False and self.atual())
+
+    def exigir_disponivel(self) -> None:
+        """Levanta ``SMTPIndisponivel`` em vez de esperar o timeout de um servidor fora do ar"""
+        if not self.permite_envio():
+            estado = self._estado
+            raise SMTPIndisponivel(f"SMTP indisponível desde {estado.ultima_falha:%H:%M:%S} UTC: {estado.erro}")
@@ -0,0 +1,298 @@
+"""
+Fila de saída (outbox) de e-mails.
+
+As mensagens são gravadas na tabela ``email_outbox`` na mesma transação do
+orçamento e entregues depois por uma thread de fundo, com novas tentativas,
+backoff exponencial e marcação das que esgotaram as tentativas (``falhou``).
+Assim a resposta HTTP volta assim que o commit no banco termina.
+
+No modo de envio direto (``EMAIL_ENVIO=direto``) as mensagens continuam
+sendo gravadas na fila, já reservadas, e a própria requisição as envia ao
+mesmo tempo por um pool de threads (``OutboxWorker.enviar_agora``); as que
+falham ficam na fila para as novas tentativas do worker.
+"""
+import json
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import and_, or_, update
+
+from banco import transacao_escrita
+from metricas import EMAILS_ENVIADOS, EMAILS_FALHAS
+from models import db, EmailPendente
+
+MODOS_ENVIO = ('fila', 'direto')
+
+# Assinatura: enviar(destinatarios, assunto, template, contexto) -> None (levanta exceção em falha)
+FuncaoEnvio = Callable[[List[str], str, str, Dict[str, str]], None]
+# Assinatura: enviar_lote([(destinatarios, assunto, template, contexto), ...]) -> [erro ou None, ...]
+FuncaoEnvioLote = Callable[[List[Tuple[List[str], str, str, Dict[str, str]]]], List[Optional[Exception]]]
+
+
+def enfileirar_email(destinatario: Union[str, List[str]], assunto: str, template: str,
+                     orcamento_id: int = None, reservar_por: Optional[float] = None, **kwargs) -> EmailPendente:
+    """
+    Adiciona um e-mail à fila de saída na sessão atual, sem fazer commit.
+
+    Args:
+        destinatario: E-mail ou lista de e-mails
+        assunto: Assunto do e-mail
+        template: Nome do template registrado ('cliente', 'admin')
+        orcamento_id: Orçamento que originou a mensagem
+        reservar_por: Segundos em que a mensagem fica reservada ('enviando') para
+            ``OutboxWorker.enviar_agora``; o worker só a pega se a reserva vencer
+        **kwargs: Variáveis para substituição no template
+
+    Returns:
+        EmailPendente: Mensagem adicionada à sessão
+    """
+    destinatarios = [destinatario] if isinstance(destinatario, str) else list(destinatario)
+    agora = datetime.now(timezone.utc)
+    mensagem = EmailPendente(
+        orcamento_id=orcamento_id,
+        destinatarios=json.dumps(destinatarios),
+        assunto=assunto,
+        template=template,
+        # O template converte tudo para texto, então guardamos os valores já prontos
+        contexto=json.dumps({k: '' if v is None else str(v) for k, v in kwargs.items()}, ensure_ascii=False),
+        status='pendente' if reservar_por is None else 'enviando',
+        tentativas=0,
+        proxima_tentativa=agora if reservar_por is None else agora + timedelta(seconds=reservar_por)
+    )
+    db.session.add(mensagem)
+    return mensagem
+
+
+def calcular_backoff(tentativas: int, base: float = 30.0, maximo: float = 3600.0) -> float:
+    """Segundos até a próxima tentativa: exponencial com jitter de ±20%"""
+    atraso = min(maximo, base * (2 ** max(0, tentativas - 1)))
+    return atraso * random.uniform(0.8, 1.2)
+
+
+class OutboxWorker:
+    """Thread de fundo que drena a fila de saída de e-mails"""
+
+    def __init__(self, app=None, enviar: FuncaoEnvio = None, intervalo: float = 15.0, lote: int = 20,
+                 max_tentativas: int = 6, backoff_base: float = 30.0, backoff_max: float = 3600.0,
+                 tempo_trava: float = 300.0, enviar_lote: Optional[FuncaoEnvioLote] = None,
+                 threads_envio: int = 4, smtp_disponivel: Optional[Callable[[], bool]] = None):
+        self.app = app
+        self.enviar = enviar
+        self.enviar_lote = enviar_lote
+        # Consultada antes de cada rodada da thread (ver monitor_smtp.py)
+        self.smtp_disponivel = smtp_disponivel
+        self.intervalo = intervalo
+        self.lote = lote
+        self.max_tentativas = max_tentativas
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.tempo_trava = tempo_trava
+        self.threads_envio = threads_envio
+        self._executor = None
+        self._pid_executor = None
+        self._evento = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Liga o worker à aplicação, lendo EMAIL_OUTBOX_INTERVALO, EMAIL_OUTBOX_MAX_TENTATIVAS e EMAIL_ENVIO_THREADS"""
+        self.app = app
+        self.intervalo = app.config.get('EMAIL_OUTBOX_INTERVALO', self.intervalo)
+        self.max_tentativas = app.config.get('EMAIL_OUTBOX_MAX_TENTATIVAS', self.max_tentativas)
+        self.threads_envio = app.config.get('EMAIL_ENVIO_THREADS', self.threads_envio)
+
+    def iniciar(self) -> None:
+        """Inicia a thread, uma vez por processo (seguro após o fork do gunicorn)"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._evento = threading.Event()
+            self._thread = threading.Thread(target=self._executar, name='outbox-email', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+            self.app.logger.info('Worker da fila de e-mails iniciado')
+
+    def acordar(self) -> None:
+        """Pede à thread que processe a fila imediatamente"""
+        self._evento.set()
+
+    def _executar(self) -> None:
+        while True:
+            self._evento.wait(self.intervalo)
+            self._evento.clear()
+            if self.smtp_disponivel is not None and not self.smtp_disponivel():
+                # SMTP fora do ar: as mensagens esperam sem gastar tentativas
+                continue
+            try:
+                while self.processar_pendentes() >= self.lote:
+                    pass
+            except Exception as e:
+                self.app.logger.error(f"Erro no worker da fila de e-mails: {str(e)}", exc_info=True)
+
+    def _reservar(self) -> List[EmailPendente]:
+        """
+        Reserva um lote de mensagens prontas para envio.
+
+        A reserva é um UPDATE condicional: com vários workers do gunicorn só um
+        consegue mudar a mensagem para 'enviando'. Mensagens presas em 'enviando'
+        (worker morto no meio do envio) voltam a ser elegíveis após ``tempo_trava``.
+        """
+        transacao_escrita(db.session)
+        agora = datetime.now(timezone.utc)
+        elegivel = or_(
+            and_(EmailPendente.status == 'pendente', EmailPendente.proxima_tentativa <= agora),
+            and_(EmailPendente.status == 'enviando', EmailPendente.proxima_tentativa <= agora),
+        )
+        candidatos = db.session.scalars(
+            db.select(EmailPendente.id)
+            .where(elegivel)
+            .order_by(EmailPendente.proxima_tentativa, EmailPendente.id)
+            .limit(self.lote)
+        ).all()
+
+        reservados = []
+        trava_ate = agora + timedelta(seconds=self.tempo_trava)
+        for mensagem_id in candidatos:
+            resultado = db.session.execute(
+                update(EmailPendente)
+                .where(EmailPendente.id == mensagem_id, elegivel)
+                .values(status='enviando', proxima_tentativa=trava_ate)
+            )
+            if resultado.rowcount == 1:
+                reservados.append(mensagem_id)
+        db.session.commit()
+
+        if not reservados:
+            return []
+        return db.session.scalars(
+            db.select(EmailPendente).where(EmailPendente.id.in_(reservados))
+        ).all()
+
+    def processar_pendentes(self) -> int:
+        """
+        Envia um lote de mensagens pendentes.
+
+        Returns:
+            int: Quantidade de mensagens processadas (enviadas ou não)
+        """
+        with self.app.app_context():
+            mensagens = self._reservar()
+            if not mensagens:
+                return 0
+
+            itens = [
+                (json.loads(m.destinatarios), m.assunto, m.template, json.loads(m.contexto or '{}'))
+                for m in mensagens
+            ]
+            # Nenhuma transação aberta durante o SMTP: no SQLite uma leitura longa
+            # impede o checkpoint do WAL
+            db.session.commit()
+            if self.enviar_lote is not None:
+                # Todo o lote sai pela mesma sessão SMTP
+                erros = self.enviar_lote(itens)
+            else:
+                erros = []
+                for item in itens:
+                    try:
+                        self.enviar(*item)
+                        erros.append(None)
+                    except Exception as e:
+                        erros.append(e)
+
+            transacao_escrita(db.session)
+            for mensagem, erro in zip(mensagens, erros):
+                self._registrar_resultado(mensagem, erro)
+            db.session.commit()
+            return len(mensagens)
+
+    def _obter_executor(self) -> ThreadPoolExecutor:
+        """Pool de threads do envio imediato, um por processo (as threads não sobrevivem ao fork)"""
+        if self._pid_executor != os.getpid():
+            with self._lock:
+                if self._pid_executor != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.threads_envio,
+                                                        thread_name_prefix='envio-email')
+                    self._pid_executor = os.getpid()
+        return self._executor
+
+    def enviar_agora(self, mensagem_ids: List[int], timeout: float) -> List[Optional[Exception]]:
+        """
+        Envia mensagens reservadas (``enfileirar_email(..., reservar_por=...)``)
+        ao mesmo tempo, cada uma em uma thread com a sua sessão SMTP do pool.
+
+        Espera no máximo ``timeout`` segundos. O resultado de cada envio é
+        gravado na fila pela própria thread, mesmo depois do timeout: as que
+        falharem voltam como 'pendente' e o worker tenta de novo com backoff.
+
+        Returns:
+            Erro de cada mensagem (None se enviada; ``TimeoutError`` se ainda não terminou)
+        """
+        executor = self._obter_executor()
+        futuros = [executor.submit(self._entregar_reservada, mensagem_id) for mensagem_id in mensagem_ids]
+        wait(futuros, timeout=timeout)
+        erros: List[Optional[Exception]] = []
+        for futuro in futuros:
+            if not futuro.done():
+                erros.append(TimeoutError(f"Envio não terminou em {timeout:.0f}s"))
+            else:
+                erros.append(futuro.exception() or futuro.result())
+        return erros
+
+    def _entregar_reservada(self, mensagem_id: int) -> Optional[Exception]:
+        with self.app.app_context():
+            mensagem = db.session.get(EmailPendente, mensagem_id)
+            item = (json.loads(mensagem.destinatarios), mensagem.assunto, mensagem.template,
+                    json.loads(mensagem.contexto or '{}'))
+            db.session.commit()  # Sem transação aberta durante o SMTP (ver processar_pendentes)
+            try:
+                self.enviar(*item)
+                erro = None
+            except Exception as e:
+                erro = e
+            transacao_escrita(db.session)
+            self._registrar_resultado(mensagem, erro)
+            db.session.commit()
+            return erro
+
+    def _registrar_resultado(self, mensagem: EmailPendente, erro: Optional[Exception]) -> None:
+        mensagem.tentativas += 1
+        if erro is None:
+            EMAILS_ENVIADOS.incrementar()
+            mensagem.status = 'enviado'
+            mensagem.ultimo_erro = None
+            mensagem.data_envio = datetime.now(timezone.utc)
+            return
+
+        mensagem.ultimo_erro = f"{type(erro).__name__}: {str(erro)}"
+        EMAILS_FALHAS.incrementar(type(erro).__name__)
+        if mensagem.tentativas >= self.max_tentativas:
+            mensagem.status = 'falhou'
+            self.app.logger.error(
+                f"E-mail {mensagem.id} descartado após {mensagem.tentativas} tentativas: {str(erro)}")
+        else:
+            atraso = calcular_backoff(mensagem.tentativas, self.backoff_base, self.backoff_max)
+            mensagem.status = 'pendente'
+            mensagem.proxima_tentativa = datetime.now(timezone.utc) + timedelta(seconds=atraso)
+            self.app.logger.warning(
+                f"Falha ao enviar e-mail {mensagem.id} (tentativa {mensagem.tentativas}), "
+                f"nova tentativa em {atraso:.0f}s: {str(erro)}")
+
+
+def reenfileirar_falhas() -> int:
+    """Devolve à fila as mensagens marcadas como 'falhou'. Retorna a quantidade."""
+    resultado = db.session.execute(
+        update(EmailPendente)
+        .where(EmailPendente.status == 'falhou')
+        .values(status='pendente', tentativas=0, proxima_tentativa=datetime.now(timezone.utc))
+    )
+    db.session.commit()
+    return resultado.rowcount
@@ -0,0 +1,160 @@
+"""
+Logging da aplicação fora do caminho das requisições.
+
+O ``app.logger`` recebe um ``HandlerFila``: a requisição só junta a mensagem
+e põe o registro numa fila em memória. Uma thread (``QueueListener``) formata
+e grava no arquivo rotativo, e também no console quando o handler padrão do
+Flask está ativo. Uma escrita lenta em disco ou uma rotação não seguram a
+resposta.
+
+- ``LOG_FORMATO``: ``texto`` (o formato de sempre) ou ``json`` (uma linha por
+  registro, com os campos passados em ``extra=``);
+- ``LOG_MAX_MB`` / ``LOG_ARQUIVOS``: tamanho de cada arquivo e quantos guardar;
+- registros marcados com ``extra={'amostra': 'validacao'}`` são amostrados:
+  passa 1 a cada ``LOG_AMOSTRA_VALIDACAO`` e os descartados nem entram na fila.
+"""
+import atexit
+import copy
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List
+
+from flask.logging import default_handler
+
+FORMATOS_LOG = ('texto', 'json')
+FORMATO_TEXTO = '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+
+# Atributos de todo LogRecord; o que sobrar veio de extra=
+_ATRIBUTOS_PADRAO = frozenset(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {
+    'message', 'asctime', 'amostra', 'amostra_de', 'taskName',
+}
+
+
+class FiltroAmostragem(logging.Filter):
+    """Deixa passar 1 de cada ``taxa`` registros de um grupo (``extra={'amostra': grupo}``)"""
+
+    def __init__(self, taxas: Dict[str, int]):
+        super().__init__()
+        self.taxas = taxas
+        self._contadores = {grupo: itertools.count() for grupo in taxas}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        grupo = getattr(record, 'amostra', None)
+        taxa = self.taxas.get(grupo, 1)
+        if taxa <= 1:
+            return True
+        if next(self._contadores[grupo]) % taxa:
+            return False
+        record.amostra_de = taxa
+        return True
+
+
+class FormatadorTexto(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        texto = super().format(record)
+        if getattr(record, 'amostra_de', None):
+            texto += f" (amostra: 1 a cada {record.amostra_de})"
+        return texto
+
+
+class FormatadorJSON(logging.Formatter):
+    """Uma linha JSON por registro"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        dados = {
+            'momento': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensagem': record.getMessage(),
+            'arquivo': record.pathname,
+            'linha': record.lineno,
+            'processo': record.process,
+        }
+        if getattr(record, 'amostra_de', None):
+            dados['amostra_de'] = record.amostra_de
+        for chave, valor in record.__dict__.items():
+            if chave not in _ATRIBUTOS_PADRAO:
+                dados[chave] = valor
+        if record.exc_info:
+            dados['excecao'] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class HandlerFila(QueueHandler):
+    """
+    ``QueueHandler`` com a thread de escrita própria de cada processo.
+
+    Depois do fork do gunicorn (``--preload``) a thread do processo mestre não
+    existe no worker; o primeiro registro do worker cria fila e thread novas.
+    """
+
+    def __init__(self, destinos: List[logging.Handler]):
+        super().__init__(queue.SimpleQueue())
+        self.destinos = destinos
+        self.listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _iniciar_listener(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.SimpleQueue()
+            self.listener = QueueListener(self.queue, *self.destinos, respect_handler_level=True)
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Só junta a mensagem; formatação e traceback ficam para a thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self._pid != os.getpid():
+            self._iniciar_listener()
+        self.queue.put_nowait(record)
+
+    def parar(self) -> None:
+        """Esvazia a fila e para a thread deste processo"""
+        if self._pid == os.getpid() and self.listener is not None:
+            self.listener.stop()
+            self._pid = None
+
+
+def configurar_registro(app) -> None:
+    """Liga o ``app.logger`` à fila; sem efeito se já estiver ligado"""
+    if any(isinstance(handler, HandlerFila) for handler in app.logger.handlers):
+        return
+
+    pasta = app.config['LOG_PASTA']
+    os.makedirs(pasta, exist_ok=True)
+    arquivo = RotatingFileHandler(
+        os.path.join(pasta, 'orcamentos.log'),
+        maxBytes=int(app.config['LOG_MAX_MB'] * 1024 * 1024),
+        backupCount=app.config['LOG_ARQUIVOS'],
+        encoding='utf-8',
+        delay=True
+    )
+    arquivo.setFormatter(FormatadorJSON() if app.config['LOG_FORMATO'] == 'json' else FormatadorTexto(FORMATO_TEXTO))
+    arquivo.setLevel(logging.INFO)
+
+    destinos: List[logging.Handler] = [arquivo]
+    # O console do Flask (stderr) também passa a ser escrito pela thread
+    if default_handler in app.logger.handlers:
+        app.logger.removeHandler(default_handler)
+        destinos.append(default_handler)
+
+    handler = HandlerFila(destinos)
+    handler.addFilter(FiltroAmostragem({'validacao': app.config['LOG_AMOSTRA_VALIDACAO']}))
+    app.logger.addHandler(handler)
+    app.logger.setLevel(logging.INFO)
+    atexit.register(handler.parar)
+    app.logger.info('Aplicação de orçamentos iniciada')
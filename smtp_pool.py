@@ -0,0 +1,236 @@
+"""
+Pool de conexões SMTP persistentes.
+
+Cada conexão já passou por STARTTLS e login e é reaproveitada entre envios,
+sendo verificada com NOOP antes do uso. Conexões ociosas demais ou que não
+respondem são descartadas e refeitas. Um semáforo limita quantas sessões o
+processo (worker do gunicorn) mantém abertas ao mesmo tempo.
+"""
+import os
+import smtplib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from email.message import Message
+from typing import Deque, Iterator, List, Optional, Tuple
+
+from metricas import FASE_SMTP_CONEXAO, cronometrar
+
+
+class PoolSMTP:
+    """Mantém sessões SMTP autenticadas para reuso"""
+
+    def __init__(self, host: str, porta: int, usuario: Optional[str] = None, senha: Optional[str] = None,
+                 usar_tls: bool = True, max_conexoes: int = 2, timeout: float = 30.0,
+                 max_ociosidade: float = 240.0, max_mensagens: int = 100):
+        """
+        Args:
+            host: Servidor SMTP
+            porta: Porta do servidor
+            usuario: Usuário para login (sem login se None)
+            senha: Senha para login
+            usar_tls: Executa STARTTLS ao conectar
+            max_conexoes: Máximo de sessões simultâneas por processo
+            timeout: Timeout de socket em segundos
+            max_ociosidade: Segundos parada após os quais a sessão é refeita sem testar
+            max_mensagens: Mensagens por sessão antes de reconectar
+        """
+        self.host = host
+        self.porta = porta
+        self.usuario = usuario
+        self.senha = senha
+        self.usar_tls = usar_tls
+        self.max_conexoes = max_conexoes
+        self.timeout = timeout
+        self.max_ociosidade = max_ociosidade
+        self.max_mensagens = max_mensagens
+
+        self._semaforo = threading.BoundedSemaphore(max_conexoes)
+        self._lock = threading.Lock()
+        # Sessões livres: (conexão, instante do último uso, mensagens enviadas)
+        self._livres: Deque[Tuple[smtplib.SMTP, float, int]] = deque()
+        self._pid = os.getpid()
+
+        # Contadores para diagnóstico
+        self.conexoes_abertas = 0
+        self.logins = 0
+        self.mensagens_enviadas = 0
+
+    def _abrir(self, timeout: float) -> smtplib.SMTP:
+        """Conexão, STARTTLS e login"""
+        conexao = smtplib.SMTP(self.host, self.porta, timeout=timeout)
+        try:
+            conexao.ehlo()
+            if self.usar_tls:
+                conexao.starttls()
+                conexao.ehlo()
+            if self.usuario:
+                conexao.login(self.usuario, self.senha)
+        except Exception:
+            self._descartar(conexao)
+            raise
+        return conexao
+
+    @cronometrar(FASE_SMTP_CONEXAO)
+    def _conectar(self) -> smtplib.SMTP:
+        """Abre uma nova sessão para o pool"""
+        conexao = self._abrir(self.timeout)
+        if self.usuario:
+            self.logins += 1
+        self.conexoes_abertas += 1
+        return conexao
+
+    @staticmethod
+    def _descartar(conexao: smtplib.SMTP, educado: bool = True) -> None:
+        """Fecha a sessão, ignorando erros de uma conexão já quebrada"""
+        try:
+            if educado:
+                conexao.quit()
+            else:
+                conexao.close()
+        except Exception:
+            try:
+                conexao.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _saudavel(conexao: smtplib.SMTP) -> bool:
+        """Verifica com NOOP se a sessão continua aberta"""
+        try:
+            return conexao.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _verificar_fork(self) -> None:
+        """Após um fork, as sessões herdadas pertencem ao processo pai"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._livres.clear()
+                    self._semaforo = threading.BoundedSemaphore(self.max_conexoes)
+                    self._pid = os.getpid()
+
+    def _obter(self) -> Tuple[smtplib.SMTP, int]:
+        """Retira uma sessão livre e saudável ou abre uma nova"""
+        while True:
+            with self._lock:
+                if not self._livres:
+                    break
+                conexao, ultimo_uso, enviadas = self._livres.pop()
+            if time.monotonic() - ultimo_uso > self.max_ociosidade or not self._saudavel(conexao):
+                self._descartar(conexao)
+                continue
+            return conexao, enviadas
+        return self._conectar(), 0
+
+    def _devolver(self, conexao: smtplib.SMTP, enviadas: int) -> None:
+        if enviadas >= self.max_mensagens:
+            self._descartar(conexao)
+            return
+        with self._lock:
+            self._livres.append((conexao, time.monotonic(), enviadas))
+
+    @contextmanager
+    def conexao(self) -> Iterator[smtplib.SMTP]:
+        """
+        Empresta uma sessão autenticada do pool.
+
+        Em caso de erro dentro do bloco a sessão é descartada em vez de devolvida.
+        """
+        self._verificar_fork()
+        semaforo = self._semaforo
+        semaforo.acquire()
+        try:
+            conexao, enviadas = self._obter()
+            try:
+                yield conexao
+            except Exception:
+                self._descartar(conexao, educado=False)
+                raise
+            self._devolver(conexao, enviadas + 1)
+        finally:
+            semaforo.release()
+
+    def enviar(self, mensagem: Message) -> None:
+        """Envia uma mensagem, refazendo a sessão uma vez se o servidor a derrubou"""
+        for tentativa in range(2):
+            try:
+                with self.conexao() as conexao:
+                    conexao.send_message(mensagem)
+                self.mensagens_enviadas += 1
+                return
+            except smtplib.SMTPServerDisconnected:
+                if tentativa:
+                    raise
+
+    def enviar_lote(self, mensagens: List[Message]) -> List[Optional[Exception]]:
+        """
+        Envia várias mensagens na mesma sessão.
+
+        Returns:
+            List[Optional[Exception]]: Para cada mensagem, None se enviada ou o erro ocorrido
+        """
+        resultados: List[Optional[Exception]] = [None] * len(mensagens)
+        self._verificar_fork()
+        semaforo = self._semaforo
+        semaforo.acquire()
+        try:
+            conexao, enviadas = None, 0
+            for i, mensagem in enumerate(mensagens):
+                try:
+                    if conexao is None:
+                        conexao, enviadas = self._obter()
+                    try:
+                        conexao.send_message(mensagem)
+                    except smtplib.SMTPServerDisconnected:
+                        # Sessão caiu no meio do lote: reconecta e tenta de novo
+                        self._descartar(conexao, educado=False)
+                        conexao, enviadas = None, 0
+                        conexao = self._conectar()
+                        conexao.send_message(mensagem)
+                    enviadas += 1
+                    self.mensagens_enviadas += 1
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                    # Erro da mensagem; a sessão continua utilizável
+                    resultados[i] = e
+                    if conexao is not None:
+                        try:
+                            conexao.rset()
+                        except Exception:
+                            self._descartar(conexao, educado=False)
+                            conexao = None
+                except Exception as e:
+                    resultados[i] = e
+                    if conexao is not None:
+                        self._descartar(conexao, educado=False)
+                        conexao = None
+            if conexao is not None:
+                self._devolver(conexao, enviadas)
+        finally:
+            semaforo.release()
+        return resultados
+
+    def verificar(self, timeout: float) -> None:
+        """
+        Abre uma sessão à parte, responde NOOP e fecha (verificação de saúde).
+
+        Não passa pelo semáforo nem pelas sessões livres: não espera envios em
+        andamento e não mexe na contagem de mensagens nem na ociosidade do pool.
+        """
+        conexao = self._abrir(timeout)
+        try:
+            codigo, resposta = conexao.noop()
+            if codigo != 250:
+                raise smtplib.SMTPResponseException(codigo, resposta)
+        finally:
+            self._descartar(conexao)
+
+    def fechar(self) -> None:
+        """Encerra todas as sessões livres"""
+        with self._lock:
+            livres = list(self._livres)
+            self._livres.clear()
+        for conexao, _, _ in livres:
+            self._descartar(conexao)
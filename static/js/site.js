@@ -0,0 +1,364 @@
+// Variável para controlar o loading do SweetAlert
+let loadingAlert = null;
+
+// Função para mostrar seções
+function mostrarSecao(secao) {
+    // Oculta todas as seções
+    document.querySelector('.sobre-section').style.display = 'none';
+    document.getElementById('conteudo-principal').style.display = 'block';
+    document.getElementById('contato').style.display = 'flex';
+
+    // Mostra a seção solicitada
+    if (secao === 'sobre') {
+        document.querySelector('.sobre-section').style.display = 'block';
+        document.getElementById('conteudo-principal').style.display = 'none';
+        window.scrollTo({
+            top: document.querySelector('.sobre-section').offsetTop,
+            behavior: 'smooth'
+        });
+    } else if (secao === 'inicio') {
+        document.getElementById('conteudo-principal').style.display = 'block';
+        window.scrollTo({
+            top: 0,
+            behavior: 'smooth'
+        });
+    } else if (secao === 'contato') {
+        window.scrollTo({
+            top: document.getElementById('contato').offsetTop,
+            behavior: 'smooth'
+        });
+    }
+}
+
+// Variável para armazenar a estampa selecionada
+let estampaSelecionada = null;
+
+function atualizarCamposProduto() {
+    const produto = document.getElementById('produto').value;
+    document.getElementById('grupo-caneca').style.display = produto === 'caneca' ? 'block' : 'none';
+    document.getElementById('grupo-caderno').style.display = produto === 'caderno' ? 'block' : 'none';
+
+    // URLs das imagens de cada produto nos atributos data-* (geradas pelo template)
+    const imagem = document.getElementById('produto-principal');
+    if (produto === 'caneca') {
+        imagem.src = imagem.dataset.caneca;
+        imagem.alt = "Caneca personalizada";
+    } else if (produto === 'caderno') {
+        imagem.src = imagem.dataset.caderno;
+        imagem.alt = "Caderno personalizado";
+    } else {
+        imagem.src = imagem.dataset.padrao;
+        imagem.alt = "Produto selecionado";
+    }
+
+    // Esconde a estampa ampliada se mudar de produto
+    document.getElementById('estampa-ampliada').style.display = 'none';
+    document.getElementById('estampa').value = '';
+    document.querySelectorAll('.miniaturas img').forEach(img => {
+        img.classList.remove('selecionado');
+    });
+}
+
+function selecionarEstampa(img, src) {
+    const imagens = document.querySelectorAll('.miniaturas img');
+    imagens.forEach(i => i.classList.remove('selecionado'));
+    img.classList.add('selecionado');
+    document.getElementById('estampa').value = img.alt;
+
+    // Atualiza a estampa ampliada
+    const estampaAmpliada = document.getElementById('estampa-ampliada');
+    estampaAmpliada.src = src;
+    estampaAmpliada.alt = img.alt;
+    estampaAmpliada.style.display = 'block';
+
+    // Armazena a estampa selecionada para o modal
+    estampaSelecionada = src;
+
+    // Mostra a visualização ampliada no modal
+    abrirModal(src, img.alt);
+}
+
+function abrirModal(src, alt) {
+    const modal = document.getElementById('modal-estampa');
+    const modalImg = document.getElementById('modal-image');
+    modal.style.display = "block";
+    modalImg.src = src;
+    modalImg.alt = alt;
+    document.body.style.overflow = 'hidden';
+}
+
+function fecharModal() {
+    document.getElementById('modal-estampa').style.display = "none";
+    document.body.style.overflow = 'auto';
+}
+
+// Fecha o modal se clicar fora da imagem
+window.onclick = function(event) {
+    const modal = document.getElementById('modal-estampa');
+    if (event.target == modal) {
+        fecharModal();
+    }
+}
+
+// Fecha o modal com tecla ESC
+document.addEventListener('keydown', function(event) {
+    if (event.key === 'Escape') {
+        fecharModal();
+    }
+});
+
+// Máscara para CEP
+document.getElementById('cep').addEventListener('input', function(e) {
+    let value = e.target.value.replace(/\D/g, '');
+    if (value.length > 5) {
+        value = value.substring(0, 5) + '-' + value.substring(5, 8);
+    }
+    e.target.value = value;
+    preencherEndereco(value.replace(/\D/g, ''));
+});
+
+// Preenche cidade e UF pelo índice local de CEP
+const consultasCep = new Map();
+let consultaCepAtual = null;
+
+async function preencherEndereco(digitos) {
+    if (digitos.length !== 8) {
+        return;
+    }
+    if (consultaCepAtual) {
+        consultaCepAtual.abort();
+    }
+    consultaCepAtual = new AbortController();
+    try {
+        if (!consultasCep.has(digitos)) {
+            const response = await fetch(`/cep/${digitos}`, {
+                headers: { 'Accept': 'application/json' },
+                signal: consultaCepAtual.signal
+            });
+            // CEP fora do índice ou consulta indisponível: o cliente preenche à mão
+            consultasCep.set(digitos, response.ok ? await response.json() : null);
+        }
+        const endereco = consultasCep.get(digitos);
+        if (!endereco) {
+            return;
+        }
+        const cidade = document.getElementById('cidade');
+        const uf = document.getElementById('uf');
+        cidade.value = endereco.cidade;
+        uf.value = endereco.uf;
+        validarCampo(cidade);
+        validarCampo(uf);
+    } catch (error) {
+        if (error.name !== 'AbortError') {
+            console.error('Erro ao consultar CEP:', error);
+        }
+    }
+}
+
+// Máscara para telefone
+document.getElementById('telefone').addEventListener('input', function(e) {
+    let value = e.target.value.replace(/\D/g, '');
+    if (value.length > 0) {
+        value = '(' + value.substring(0, 2) + ') ' + value.substring(2);
+    }
+    if (value.length > 10) {
+        value = value.substring(0, 10) + '-' + value.substring(10, 14);
+    }
+    e.target.value = value;
+});
+
+// Validação em tempo real dos campos
+function validarCampo(campo) {
+    const errorElement = document.getElementById(`${campo.id}-error`);
+
+    if (campo.validity.valid) {
+        errorElement.textContent = '';
+        errorElement.style.display = 'none';
+        campo.setAttribute('aria-invalid', 'false');
+    } else {
+        campo.setAttribute('aria-invalid', 'true');
+        if (campo.validity.valueMissing) {
+            errorElement.textContent = 'Este campo é obrigatório';
+        } else if (campo.validity.typeMismatch) {
+            errorElement.textContent = 'Formato inválido';
+        } else if (campo.validity.patternMismatch) {
+            if (campo.id === 'cep') {
+                errorElement.textContent = 'Formato de CEP inválido (XXXXX-XXX)';
+            } else if (campo.id === 'telefone') {
+                errorElement.textContent = 'Formato de telefone inválido (XX) XXXX-XXXX';
+            } else if (campo.id === 'email') {
+                errorElement.textContent = 'Formato de email inválido';
+            }
+        } else if (campo.validity.rangeUnderflow) {
+            errorElement.textContent = `Valor mínimo: ${campo.min}`;
+        }
+        errorElement.style.display = 'block';
+    }
+}
+
+// Adiciona validação em tempo real para todos os campos obrigatórios
+document.querySelectorAll('[required]').forEach(campo => {
+    campo.addEventListener('input', () => validarCampo(campo));
+    campo.addEventListener('blur', () => validarCampo(campo));
+});
+
+// Mostra mensagem usando SweetAlert2
+function showMessage(message, isError = false) {
+    if (isError) {
+        Swal.fire({
+            icon: 'error',
+            title: 'Erro',
+            text: message,
+            confirmButtonColor: '#1d3c2d'
+        });
+    } else {
+        Swal.fire({
+            icon: 'success',
+            title: 'Sucesso',
+            text: message,
+            confirmButtonColor: '#1d3c2d',
+            timer: 3000,
+            timerProgressBar: true
+        });
+    }
+}
+
+// Mostra/oculta loading usando SweetAlert2
+function toggleLoading(show) {
+    if (show) {
+        loadingAlert = Swal.fire({
+            title: 'Enviando seu orçamento...',
+            allowOutsideClick: false,
+            didOpen: () => {
+                Swal.showLoading();
+            }
+        });
+    } else if (loadingAlert) {
+        loadingAlert.close();
+        loadingAlert = null;
+    }
+}
+
+// Envio do formulário via AJAX
+// Chave de idempotência: a mesma em reenvios do mesmo formulário, nova após o sucesso
+let chaveIdempotencia = null;
+let enviando = false;
+
+function novaChaveIdempotencia() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+}
+
+document.getElementById('form-orcamento').addEventListener('submit', async function(e) {
+    e.preventDefault();
+
+    // Ignora cliques repetidos enquanto o envio anterior não terminou
+    if (enviando) {
+        return;
+    }
+
+    let formValido = true;
+
+    // Valida todos os campos obrigatórios
+    document.querySelectorAll('[required]').forEach(campo => {
+        validarCampo(campo);
+        if (!campo.validity.valid) {
+            formValido = false;
+        }
+    });
+
+    // Validação específica para estampa quando produto é caneca
+    const produto = document.getElementById('produto').value;
+    const estampa = document.getElementById('estampa').value;
+
+    if (produto === 'caneca' && !estampa) {
+        document.getElementById('estampa-error').textContent = 'Por favor, selecione uma estampa';
+        document.getElementById('estampa-error').style.display = 'block';
+        formValido = false;
+    }
+
+    if (!formValido) {
+        // Mostra SweetAlert para erros de formulário
+        Swal.fire({
+            icon: 'error',
+            title: 'Formulário incompleto',
+            text: 'Por favor, preencha todos os campos obrigatórios corretamente.',
+            confirmButtonColor: '#1d3c2d'
+        });
+
+        // Rola até o primeiro erro
+        const primeiroErro = document.querySelector('[aria-invalid="true"]');
+        if (primeiroErro) {
+            primeiroErro.scrollIntoView({
+                behavior: 'smooth',
+                block: 'center'
+            });
+            primeiroErro.focus();
+        }
+        return;
+    }
+
+    // Se o formulário estiver válido, envia
+    enviando = true;
+    toggleLoading(true);
+    if (!chaveIdempotencia) {
+        chaveIdempotencia = novaChaveIdempotencia();
+    }
+
+    try {
+        const formData = new FormData(this);
+
+        const response = await fetch(this.action, {
+            method: 'POST',
+            body: formData,
+            headers: {
+                'Accept': 'application/json',
+                'Idempotency-Key': chaveIdempotencia
+            }
+        });
+
+        const result = await response.json();
+
+        if (result.success) {
+            chaveIdempotencia = null;
+            showMessage('Orçamento enviado com sucesso! Em breve entraremos em contato.');
+            this.reset();
+            atualizarCamposProduto();
+        } else {
+            showMessage('Erro ao enviar orçamento: ' + (result.message || 'Tente novamente mais tarde.'), true);
+        }
+    } catch (error) {
+        console.error('Erro:', error);
+        showMessage('Erro na comunicação com o servidor. Por favor, tente novamente.', true);
+    } finally {
+        enviando = false;
+        toggleLoading(false);
+    }
+});
+
+// Inicializa o formulário
+document.addEventListener('DOMContentLoaded', function() {
+    // Simula o token CSRF (em produção, isso deve vir do servidor)
+    document.getElementById('csrf_token').value = 'simulated-csrf-token-' + Math.random().toString(36).substr(2);
+
+    atualizarCamposProduto();
+
+    // Classe para elementos visualmente ocultos mas acessíveis
+    const style = document.createElement('style');
+    style.textContent = `
+        .sr-only {
+            position: absolute;
+            width: 1px;
+            height: 1px;
+            padding: 0;
+            margin: -1px;
+            overflow: hidden;
+            clip: rect(0, 0, 0, 0);
+            white-space: nowrap;
+            border-width: 0;
+        }
+    `;
+    document.head.appendChild(style);
+});
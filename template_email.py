@@ -0,0 +1,145 @@
+"""
+Templates de e-mail compilados.
+
+O template é analisado uma única vez e guardado como uma lista de trechos
+literais intercalados com nomes de variáveis. A renderização é uma junção em
+uma passada, com escape de HTML nos valores. Os blocos ``<style>`` e
+``<script>`` nunca são interpretados, então as chaves do CSS ficam intactas.
+
+A partir do mesmo HTML é gerada a versão em texto simples do e-mail.
+"""
+import html
+import re
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Tuple
+
+# {{var}} ou {var}, sem espaços dentro de chaves simples (como em "body {")
+_PADRAO_VARIAVEL = re.compile(r'\{\{\s*([A-Za-z_]\w*)\s*\}\}|\{([A-Za-z_]\w*)\}')
+_PADRAO_BLOCO_LITERAL = re.compile(r'<(style|script)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+
+_TAGS_BLOCO = {'div', 'tr', 'br', 'li', 'hr'}
+_TAGS_PARAGRAFO = {'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'table'}
+_QUEBRA_PARAGRAFO = '\x00'
+_TAGS_CELULA = {'th', 'td'}
+_TAGS_IGNORADAS = {'style', 'script', 'head', 'title'}
+
+
+def _compilar(fonte: str, proteger_blocos: bool) -> Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]:
+    """
+    Divide a fonte em literais e variáveis.
+
+    Returns:
+        (literais, variaveis, originais): ``len(literais) == len(variaveis) + 1``;
+        ``originais`` guarda o texto de cada marcador, usado quando a variável não é informada.
+    """
+    literais: List[str] = []
+    variaveis: List[str] = []
+    originais: List[str] = []
+    atual: List[str] = []
+
+    def processar(trecho: str) -> None:
+        posicao = 0
+        for m in _PADRAO_VARIAVEL.finditer(trecho):
+            atual.append(trecho[posicao:m.start()])
+            literais.append(''.join(atual))
+            atual.clear()
+            variaveis.append(m.group(1) or m.group(2))
+            originais.append(m.group(0))
+            posicao = m.end()
+        atual.append(trecho[posicao:])
+
+    posicao = 0
+    if proteger_blocos:
+        for m in _PADRAO_BLOCO_LITERAL.finditer(fonte):
+            processar(fonte[posicao:m.start()])
+            atual.append(m.group(0))
+            posicao = m.end()
+    processar(fonte[posicao:])
+    literais.append(''.join(atual))
+    return tuple(literais), tuple(variaveis), tuple(originais)
+
+
+class _ConversorTexto(HTMLParser):
+    """Extrai o texto visível do HTML, com quebras de linha nos blocos"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.partes: List[str] = []
+        self._ignorando = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _TAGS_IGNORADAS:
+            self._ignorando += 1
+        elif tag in _TAGS_BLOCO:
+            self.partes.append('\n')
+        elif tag in _TAGS_PARAGRAFO:
+            self.partes.append(_QUEBRA_PARAGRAFO)
+        elif tag in _TAGS_CELULA:
+            self.partes.append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in _TAGS_IGNORADAS:
+            self._ignorando = max(0, self._ignorando - 1)
+        elif tag in _TAGS_BLOCO:
+            self.partes.append('\n')
+        elif tag in _TAGS_PARAGRAFO:
+            self.partes.append(_QUEBRA_PARAGRAFO)
+
+    def handle_data(self, data):
+        if not self._ignorando:
+            self.partes.append(re.sub(r'\s+', ' ', data))
+
+    def texto(self) -> str:
+        paragrafos = []
+        for bloco in ''.join(self.partes).split(_QUEBRA_PARAGRAFO):
+            linhas = [re.sub(r' {2,}', ' ', linha).strip() for linha in bloco.split('\n')]
+            linhas = [linha for linha in linhas if linha]
+            if linhas:
+                paragrafos.append('\n'.join(linhas))
+        return '\n\n'.join(paragrafos) + '\n'
+
+
+def html_para_texto(fonte: str) -> str:
+    """Converte HTML em texto simples, mantendo os marcadores de variáveis"""
+    conversor = _ConversorTexto()
+    conversor.feed(fonte)
+    conversor.close()
+    return conversor.texto()
+
+
+class TemplateEmail:
+    """Template HTML compilado, com a versão em texto simples derivada dele"""
+
+    def __init__(self, fonte: str):
+        self.fonte = fonte
+        self._html = _compilar(fonte, proteger_blocos=True)
+        self._texto = _compilar(html_para_texto(fonte), proteger_blocos=False)
+
+    @staticmethod
+    def _renderizar(compilado, contexto: Dict[str, Any], escapar: bool) -> str:
+        literais, variaveis, originais = compilado
+        partes = [literais[0]]
+        for i, nome in enumerate(variaveis):
+            if nome in contexto:
+                valor = contexto[nome]
+                valor = '' if valor is None else str(valor)
+                partes.append(html.escape(valor) if escapar else valor)
+            else:
+                partes.append(originais[i])
+            partes.append(literais[i + 1])
+        return ''.join(partes)
+
+    def renderizar(self, **contexto) -> str:
+        """Renderiza o HTML com os valores escapados"""
+        return self._renderizar(self._html, contexto, escapar=True)
+
+    def renderizar_texto(self, **contexto) -> str:
+        """Renderiza a versão em texto simples"""
+        return self._renderizar(self._texto, contexto, escapar=False)
+
+
+@lru_cache(maxsize=32)
+def compilar_template(fonte: str) -> TemplateEmail:
+    """Compila o template uma vez por processo e reaproveita nas chamadas seguintes"""
+    return TemplateEmail(fonte)
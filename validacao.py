@@ -0,0 +1,198 @@
+"""
+Validação e normalização dos campos de ``Orcamento``.
+
+Usada pelos hooks ``@validates`` do modelo, pela rota ``/enviar_orcamento`` e
+pela importação em lote. As expressões regulares são compiladas uma vez, a UF
+é conferida em um ``frozenset`` e nada é registrado em log: quem chama decide
+o que fazer com o ``ErroValidacao``.
+
+Funciona com um valor, um registro (dict) ou um lote, tanto em registros
+(``validar_lote``) quanto em colunas de valores (``validar_coluna``).
+"""
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from email_validator import EmailNotValidError
+
+from validacao_email import normalizar_email
+
+UFS_VALIDAS = frozenset({
+    'AC', 'AL', 'AP', 'AM', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MT', 'MS', 'MG', 'PA',
+    'PB', 'PR', 'PE', 'PI', 'RJ', 'RN', 'RS', 'RO', 'RR', 'SC', 'SP', 'SE', 'TO',
+})
+
+STATUS_VALIDOS = frozenset({'pendente', 'processando', 'concluido', 'cancelado'})
+
+CAMPOS_OBRIGATORIOS = {
+    'nome': 'Nome completo',
+    'email': 'Email',
+    'telefone': 'Telefone',
+    'rua': 'Rua',
+    'numero': 'Número',
+    'bairro': 'Bairro',
+    'cidade': 'Cidade',
+    'uf': 'UF',
+    'cep': 'CEP',
+    'produto': 'Produto',
+    'quantidade': 'Quantidade',
+    'estampa': 'Estampa',
+}
+
+_NAO_DIGITOS = re.compile(r'\D')
+
+MENSAGEM_EMAIL = "Por favor, insira um endereço de email válido"
+MENSAGEM_TELEFONE = "Por favor, insira um número de telefone válido (XX) XXXX-XXXX ou (XX) XXXXX-XXXX"
+MENSAGEM_CEP = "Por favor, insira um CEP válido no formato XXXXX-XXX"
+MENSAGEM_QUANTIDADE = "Por favor, insira uma quantidade válida (número inteiro positivo)"
+MENSAGEM_UF = "Por favor, selecione uma UF válida"
+MENSAGEM_STATUS = "Status inválido"
+
+
+class ErroValidacao(ValueError):
+    """Valor inválido; a mensagem é a exibida ao cliente"""
+
+    def __init__(self, campo: str, mensagem: str, valor=None):
+        super().__init__(mensagem)
+        self.campo = campo
+        self.valor = valor
+
+
+def validar_email(email: str, verificar_dns: bool = False) -> Tuple[str, Optional[bool]]:
+    """Retorna (email normalizado, entregavel); ver ``validacao_email.normalizar_email``"""
+    try:
+        return normalizar_email(email, verificar_dns=verificar_dns)
+    except (EmailNotValidError, TypeError, AttributeError):
+        raise ErroValidacao('email', MENSAGEM_EMAIL, email)
+
+
+def validar_telefone(telefone: str) -> str:
+    """Formata como (XX) XXXX-XXXX ou (XX) XXXXX-XXXX"""
+    try:
+        digitos = _NAO_DIGITOS.sub('', telefone)
+    except TypeError:
+        raise ErroValidacao('telefone', MENSAGEM_TELEFONE, telefone)
+    if len(digitos) == 10:
+        return f"({digitos[:2]}) {digitos[2:6]}-{digitos[6:]}"
+    if len(digitos) == 11:
+        return f"({digitos[:2]}) {digitos[2:7]}-{digitos[7:]}"
+    raise ErroValidacao('telefone', MENSAGEM_TELEFONE, telefone)
+
+
+def validar_cep(cep: str) -> str:
+    """Formata como XXXXX-XXX"""
+    try:
+        digitos = _NAO_DIGITOS.sub('', cep)
+    except TypeError:
+        raise ErroValidacao('cep', MENSAGEM_CEP, cep)
+    if len(digitos) != 8:
+        raise ErroValidacao('cep', MENSAGEM_CEP, cep)
+    return f"{digitos[:5]}-{digitos[5:]}"
+
+
+def validar_quantidade(quantidade) -> int:
+    try:
+        valor = int(quantidade)
+    except (TypeError, ValueError):
+        raise ErroValidacao('quantidade', MENSAGEM_QUANTIDADE, quantidade)
+    if valor <= 0:
+        raise ErroValidacao('quantidade', MENSAGEM_QUANTIDADE, quantidade)
+    return valor
+
+
+def validar_uf(uf: str) -> str:
+    try:
+        valor = uf.upper()
+    except AttributeError:
+        raise ErroValidacao('uf', MENSAGEM_UF, uf)
+    if valor not in UFS_VALIDAS:
+        raise ErroValidacao('uf', MENSAGEM_UF, uf)
+    return valor
+
+
+def validar_status(status: str) -> str:
+    if status not in STATUS_VALIDOS:
+        raise ErroValidacao('status', MENSAGEM_STATUS, status)
+    return status
+
+
+# Campos com normalização própria (o e-mail é tratado à parte por devolver também a entregabilidade)
+VALIDADORES: Dict[str, Callable] = {
+    'telefone': validar_telefone,
+    'cep': validar_cep,
+    'quantidade': validar_quantidade,
+    'uf': validar_uf,
+}
+
+
+def campos_faltantes(dados: Dict) -> List[str]:
+    """Nomes amigáveis dos campos obrigatórios ausentes ou em branco"""
+    return [
+        nome_amigavel for campo, nome_amigavel in CAMPOS_OBRIGATORIOS.items()
+        if dados.get(campo) is None or (isinstance(dados[campo], str) and not dados[campo].strip())
+    ]
+
+
+def validar_registro(dados: Dict, verificar_dns: bool = False) -> Dict:
+    """
+    Valida e normaliza um registro completo.
+
+    Returns:
+        Cópia do registro com os campos normalizados e ``email_entregavel``
+
+    Raises:
+        ErroValidacao: No primeiro campo inválido (campo ``'*'`` para obrigatórios ausentes)
+    """
+    faltantes = campos_faltantes(dados)
+    if faltantes:
+        raise ErroValidacao('*', 'Preencha todos os campos obrigatórios: ' + ', '.join(faltantes))
+
+    resultado = dict(dados)
+    resultado['email'], resultado['email_entregavel'] = validar_email(dados['email'], verificar_dns)
+    for campo, validador in VALIDADORES.items():
+        resultado[campo] = validador(dados[campo])
+    if dados.get('status') is not None:
+        resultado['status'] = validar_status(dados['status'])
+    return resultado
+
+
+def validar_lote(registros: Iterable[Dict], verificar_dns: bool = False
+                 ) -> Tuple[List[Tuple[int, Dict]], List[Tuple[int, ErroValidacao]]]:
+    """
+    Valida vários registros sem parar no primeiro erro.
+
+    Returns:
+        (válidos como (índice, registro normalizado), erros como (índice, ErroValidacao))
+    """
+    validos, erros = [], []
+    for indice, dados in enumerate(registros):
+        try:
+            validos.append((indice, validar_registro(dados, verificar_dns)))
+        except ErroValidacao as e:
+            erros.append((indice, e))
+    return validos, erros
+
+
+def validar_coluna(campo: str, valores: Sequence, verificar_dns: bool = False
+                   ) -> Tuple[List, Dict[int, ErroValidacao]]:
+    """
+    Valida uma coluna de valores de um mesmo campo.
+
+    Returns:
+        (valores normalizados, com None nas posições inválidas; {índice: erro})
+        Para ``email`` cada valor normalizado é o par (email, entregavel).
+    """
+    if campo == 'email':
+        validador = lambda valor: validar_email(valor, verificar_dns)  # noqa: E731
+    elif campo == 'status':
+        validador = validar_status
+    else:
+        validador = VALIDADORES[campo]
+    normalizados, erros = [], {}
+    anexar = normalizados.append
+    for indice, valor in enumerate(valores):
+        try:
+            anexar(validador(valor))
+        except ErroValidacao as e:
+            anexar(None)
+            erros[indice] = e
+    return normalizados, erros
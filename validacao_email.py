@@ -0,0 +1,220 @@
+"""
+Validação de e-mails com cache de entregabilidade por domínio.
+
+A verificação de sintaxe é local e barata. A de entregabilidade (consulta DNS
+por MX/A/AAAA) chega a levar mais de um segundo, então o resultado é guardado
+por domínio em um cache LRU com TTL, incluindo os resultados negativos.
+Domínios de provedores conhecidos já partem como entregáveis e nunca geram
+consulta DNS.
+
+No modo assíncrono a requisição valida só a sintaxe e a consulta DNS roda
+depois em uma thread, marcando o orçamento em ``email_entregavel``.
+
+A checagem de sintaxe do domínio (IDNA) é a parte cara da validação local e
+se repete a cada e-mail do mesmo domínio; por isso os domínios já aceitos são
+memorizados e, para partes locais ASCII simples, o endereço é normalizado
+sem passar de novo pelo ``email_validator``.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from email_validator import validate_email, EmailNotValidError, EmailUndeliverableError
+from email_validator.deliverability import validate_email_deliverability
+
+from metricas import FASE_DNS
+
+# Provedores com MX estável: tratados como entregáveis sem consulta DNS
+DOMINIOS_CONHECIDOS = frozenset({
+    'gmail.com', 'googlemail.com', 'hotmail.com', 'hotmail.com.br', 'outlook.com', 'outlook.com.br',
+    'live.com', 'msn.com', 'yahoo.com', 'yahoo.com.br', 'icloud.com', 'me.com', 'uol.com.br',
+    'bol.com.br', 'terra.com.br', 'ig.com.br', 'globo.com', 'globomail.com', 'protonmail.com',
+})
+
+MODOS_VERIFICACAO = ('sincrona', 'assincrona', 'desligada')
+
+# Parte local "dot-atom" ASCII (RFC 5322), a forma de quase todos os endereços
+_PARTE_LOCAL_SIMPLES = re.compile(r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*\Z")
+_MAX_PARTE_LOCAL = 64
+_MAX_ENDERECO = 254
+_MAX_DOMINIOS_MEMORIZADOS = 10000
+
+# Domínio como digitado -> (domínio ASCII, domínio normalizado), só para domínios já aceitos
+_dominios_validos: Dict[str, Tuple[str, str]] = {}
+
+
+class CacheDominios:
+    """Cache LRU com TTL do resultado de entregabilidade por domínio"""
+
+    def __init__(self, tamanho: int = 10000, ttl: float = 86400.0, ttl_negativo: float = 3600.0):
+        self.tamanho = tamanho
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self._dados: 'OrderedDict[str, Tuple[bool, str, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def configurar(self, tamanho: int = None, ttl: float = None, ttl_negativo: float = None) -> None:
+        if tamanho is not None:
+            self.tamanho = tamanho
+        if ttl is not None:
+            self.ttl = ttl
+        if ttl_negativo is not None:
+            self.ttl_negativo = ttl_negativo
+
+    def obter(self, dominio: str) -> Optional[Tuple[bool, str]]:
+        """Retorna (entregavel, mensagem de erro) ou None se ausente/expirado"""
+        if dominio in DOMINIOS_CONHECIDOS:
+            self.acertos += 1
+            return True, ''
+        with self._lock:
+            item = self._dados.get(dominio)
+            if item is None or item[2] < time.monotonic():
+                if item is not None:
+                    del self._dados[dominio]
+                self.faltas += 1
+                return None
+            self._dados.move_to_end(dominio)
+            self.acertos += 1
+            return item[0], item[1]
+
+    def guardar(self, dominio: str, entregavel: bool, mensagem: str = '') -> None:
+        ttl = self.ttl if entregavel else self.ttl_negativo
+        with self._lock:
+            self._dados[dominio] = (entregavel, mensagem, time.monotonic() + ttl)
+            self._dados.move_to_end(dominio)
+            while len(self._dados) > self.tamanho:
+                self._dados.popitem(last=False)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._dados.clear()
+
+    def __len__(self) -> int:
+        return len(self._dados)
+
+
+cache_dominios = CacheDominios()
+
+
+def verificar_dominio(dominio: str, dominio_i18n: str = None, timeout: int = 5) -> Tuple[bool, str]:
+    """
+    Verifica a entregabilidade de um domínio, consultando o DNS só quando preciso.
+
+    Returns:
+        (entregavel, mensagem de erro)
+    """
+    resultado = cache_dominios.obter(dominio)
+    if resultado is not None:
+        return resultado
+
+    try:
+        with FASE_DNS.cronometro():
+            info = validate_email_deliverability(dominio, dominio_i18n or dominio, timeout=timeout)
+    except EmailUndeliverableError as e:
+        cache_dominios.guardar(dominio, False, str(e))
+        return False, str(e)
+
+    # Timeout ou falha do resolvedor: aceita, mas não guarda para tentar de novo depois
+    if 'unknown-deliverability' not in info:
+        cache_dominios.guardar(dominio, True)
+    return True, ''
+
+
+def normalizar_email(email: str, verificar_dns: bool = True) -> Tuple[str, Optional[bool]]:
+    """
+    Valida a sintaxe do e-mail e, opcionalmente, a entregabilidade do domínio.
+
+    Args:
+        email: Endereço informado
+        verificar_dns: Consulta o domínio (pelo cache) antes de retornar
+
+    Returns:
+        (email normalizado, entregavel): ``entregavel`` é None quando a
+        verificação foi adiada e o domínio ainda não está no cache
+
+    Raises:
+        EmailNotValidError: Sintaxe inválida ou domínio que não recebe e-mails
+    """
+    normalizado, dominio_ascii, dominio = validar_sintaxe(email)
+    if verificar_dns:
+        entregavel, erro = verificar_dominio(dominio_ascii, dominio)
+    else:
+        # Mesmo sem DNS, um resultado já conhecido vale na hora
+        resultado = cache_dominios.obter(dominio_ascii)
+        entregavel, erro = resultado if resultado is not None else (None, '')
+    if entregavel is False:
+        raise EmailUndeliverableError(erro)
+    return normalizado, entregavel
+
+
+def validar_sintaxe(email: str) -> Tuple[str, str, str]:
+    """
+    Valida só a sintaxe, com atalho para domínios já aceitos.
+
+    Returns:
+        (email normalizado, domínio ASCII, domínio normalizado)
+
+    Raises:
+        EmailNotValidError: Sintaxe inválida
+    """
+    local, arroba, dominio_digitado = email.partition('@')
+    memorizado = _dominios_validos.get(dominio_digitado) if arroba else None
+    if memorizado is not None and len(local) <= _MAX_PARTE_LOCAL and _PARTE_LOCAL_SIMPLES.match(local):
+        normalizado = f"{local}@{memorizado[1]}"
+        if len(normalizado) <= _MAX_ENDERECO:
+            return normalizado, memorizado[0], memorizado[1]
+
+    v = validate_email(email, check_deliverability=False)
+    if len(_dominios_validos) >= _MAX_DOMINIOS_MEMORIZADOS:
+        _dominios_validos.clear()
+    _dominios_validos[dominio_digitado] = (v.ascii_domain, v.domain)
+    return v.normalized, v.ascii_domain, v.domain
+
+
+class VerificadorAssincrono:
+    """Executa a verificação DNS fora da requisição e marca o orçamento depois"""
+
+    def __init__(self, max_threads: int = 2):
+        self.max_threads = max_threads
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _obter_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_threads, thread_name_prefix='verifica-email')
+        return self._executor
+
+    def agendar(self, app, orcamento_id: int, email: str) -> None:
+        """Agenda a verificação do domínio e a marcação do orçamento"""
+        self._obter_executor().submit(self._verificar, app, orcamento_id, email)
+
+    @staticmethod
+    def _verificar(app, orcamento_id: int, email: str) -> None:
+        from models import db, Orcamento
+
+        with app.app_context():
+            try:
+                v = validate_email(email, check_deliverability=False)
+                entregavel, erro = verificar_dominio(v.ascii_domain, v.domain)
+            except EmailNotValidError as e:
+                entregavel, erro = False, str(e)
+            except Exception as e:
+                app.logger.error(f"Erro ao verificar e-mail do orçamento {orcamento_id}: {str(e)}")
+                return
+
+            db.session.execute(
+                db.update(Orcamento).where(Orcamento.id == orcamento_id).values(email_entregavel=entregavel)
+            )
+            db.session.commit()
+            if not entregavel:
+                app.logger.warning(f"E-mail do orçamento {orcamento_id} não recebe mensagens: {erro}")
+
+
+verificador_assincrono = VerificadorAssincrono()